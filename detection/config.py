@@ -39,9 +39,21 @@ _SCHEMA = {
     "MEMORY_BACKEND": {"type": "str", "default": "shm"},
     "SHM_NAME": {"type": "str", "default": "ivis_shm_data"},
     "SHM_META_NAME": {"type": "str", "default": "ivis_shm_meta"},
+    "MMAP_DIR": {"type": "str", "default": "/dev/shm/ivis"},
     "SHM_BUFFER_BYTES": {"type": "int", "default": 50000000},
     "SHM_CACHE_SECONDS": {"type": "float", "default": 0},
     "SHM_CACHE_FPS": {"type": "float", "default": 0},
+    "SHM_ZERO_COPY": {"type": "bool", "default": False},
+    "SHM_LEASES": {"type": "bool", "default": False},
+    "SHM_LEASE_TTL_MS": {"type": "int", "default": 2000},
+    "SHM_CONSUMER_NAME": {"type": "str", "default": "detection"},
+    "SHM_LOSSLESS": {"type": "bool", "default": False},
+    "SHM_DIRECTORY": {"type": "str", "default": "ivis_shm_directory"},
+    "SHM_STREAM_ID": {"type": "str", "default": None},
+    "SHM_PIXEL_FORMAT": {"type": "str", "default": "bgr"},
+    "SHM_RENDITION_MODEL_SIZE": {"type": "int", "default": 0},
+    "SHM_RENDITION_PREVIEW_WIDTH": {"type": "int", "default": 0},
+    "SHM_USE_MODEL_RENDITION": {"type": "bool", "default": True},
     "MAX_FRAME_AGE_MS": {"type": "int", "default": 1000},
     "DEBUG": {"type": "bool", "default": False},
 }
@@ -104,9 +116,28 @@ class Config:
     MEMORY_BACKEND = _VALUES["MEMORY_BACKEND"]
     SHM_NAME = _VALUES["SHM_NAME"]
     SHM_META_NAME = _VALUES["SHM_META_NAME"]
+    # MEMORY_BACKEND=mmap: the ring files live in MMAP_DIR
+    MMAP_DIR = _VALUES["MMAP_DIR"]
     SHM_BUFFER_BYTES = _VALUES["SHM_BUFFER_BYTES"]
     SHM_CACHE_SECONDS = _VALUES["SHM_CACHE_SECONDS"]
     SHM_CACHE_FPS = _VALUES["SHM_CACHE_FPS"]
+    # Zero-copy: infer directly on the SHM slot and validate the generation afterwards.
+    SHM_ZERO_COPY = _VALUES["SHM_ZERO_COPY"]
+    # Leases: pin the slot for the duration of inference so the writer skips it.
+    SHM_LEASES = _VALUES["SHM_LEASES"]
+    SHM_LEASE_TTL_MS = _VALUES["SHM_LEASE_TTL_MS"]
+    SHM_CONSUMER_NAME = _VALUES["SHM_CONSUMER_NAME"]
+    # Hold back an ingestion writer running SHM_WRITE_POLICY=blocking
+    SHM_LOSSLESS = _VALUES["SHM_LOSSLESS"]
+    # Resolve the ring from the SHM directory by stream id (falls back to SHM_NAME/geometry)
+    SHM_DIRECTORY = _VALUES["SHM_DIRECTORY"]
+    SHM_STREAM_ID = _VALUES["SHM_STREAM_ID"]
+    # Ring slot layout when not resolved through the directory (bgr/nv12/i420)
+    SHM_PIXEL_FORMAT = _VALUES["SHM_PIXEL_FORMAT"].lower()
+    SHM_RENDITION_MODEL_SIZE = _VALUES["SHM_RENDITION_MODEL_SIZE"]
+    SHM_RENDITION_PREVIEW_WIDTH = _VALUES["SHM_RENDITION_PREVIEW_WIDTH"]
+    # Infer on ingestion's letterboxed "model" rendition when the contract has one
+    SHM_USE_MODEL_RENDITION = _VALUES["SHM_USE_MODEL_RENDITION"]
     MAX_FRAME_AGE_MS = _VALUES["MAX_FRAME_AGE_MS"]
 
     DEBUG = _VALUES["DEBUG"]
@@ -7,6 +7,7 @@ import numpy as np
 
 from detection.config import Config
 from detection.errors.fatal import NonFatalError
+from ivis.common.pixel_format import YUV420_FORMATS, frame_nbytes, to_bgr
 
 class FrameDecoder:
     """
@@ -15,6 +16,8 @@ class FrameDecoder:
     """
     def __init__(self):
         self._logger = logging.getLogger("detection")
+        # Reused BGR output for NV12/I420 payloads (valid until the next decode)
+        self._bgr_buf = None
 
     def _resolve_metadata(self, contract: Dict[str, Any]) -> Tuple[int, int, int, str, bool]:
         width = contract.get("frame_width")
@@ -46,12 +49,15 @@ class FrameDecoder:
             contract = {}
 
         width, height, channels, dtype, _ = self._resolve_metadata(contract)
+        color = str(contract.get("frame_color_space") or "bgr").lower()
 
         if int(channels) != 3:
             raise NonFatalError(f"Unsupported channels={channels}. Expected 3 (BGR).")
 
         bytes_per_pixel = self._dtype_bytes(dtype)
-        expected_size = int(width) * int(height) * 3 * bytes_per_pixel
+        if color in YUV420_FORMATS and bytes_per_pixel != 1:
+            raise NonFatalError(f"Unsupported dtype {dtype} for {color}")
+        expected_size = frame_nbytes(int(width), int(height), color, bytes_per_pixel)
 
         mem = contract.get("memory") if isinstance(contract, dict) else None
         if isinstance(mem, dict) and mem.get("size") is not None:
@@ -71,7 +77,27 @@ class FrameDecoder:
             )
 
         try:
+            if color in YUV420_FORMATS:
+                # Compact 4:2:0 payload: convert to the BGR the model/tracker expect.
+                shape = (int(height), int(width), 3)
+                if self._bgr_buf is None or self._bgr_buf.shape != shape:
+                    self._bgr_buf = np.empty(shape, dtype=np.uint8)
+                return to_bgr(data_bytes, int(width), int(height), color, dst=self._bgr_buf)
             arr = np.frombuffer(data_bytes, dtype=dtype)
             return arr.reshape((int(height), int(width), 3))
         except Exception as e:
             raise NonFatalError(f"Failed to decode frame bytes: {e}")
+
+    def decode_rendition(self, data_bytes, rendition: Dict[str, Any]) -> np.ndarray:
+        """(height, width, 3) BGR view of a rendition read via MemoryReader.read(..., rendition)."""
+        try:
+            width, height = int(rendition["width"]), int(rendition["height"])
+        except (KeyError, TypeError, ValueError):
+            raise NonFatalError("Invalid rendition descriptor")
+        if str(rendition.get("color_space") or "bgr").lower() != "bgr":
+            raise NonFatalError(f"Unsupported rendition color space: {rendition.get('color_space')}")
+        if len(data_bytes) != width * height * 3:
+            raise NonFatalError(
+                f"Rendition size mismatch. Expected {width * height * 3}, got {len(data_bytes)}."
+            )
+        return np.frombuffer(data_bytes, dtype=np.uint8).reshape((height, width, 3))
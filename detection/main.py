@@ -23,6 +23,7 @@ from detection.publish.results import ResultPublisher
 from detection.runtime import Runtime
 from detection.metrics.counters import metrics
 from ivis.common.contracts.validators import validate_frame_contract_v1, ContractValidationError
+from ivis.common.renditions import MODEL, find_rendition
 
 
 _warned = set()
@@ -149,11 +150,16 @@ def main():
                         logger.debug("Dropped frame due to contract validation: %s", getattr(exc, "message", str(exc)))
                         continue
 
+                    # Shared bus (multi-camera ingestion host): only this ring's stream is ours.
+                    if Config.SHM_STREAM_ID and frame_contract.get("stream_id") != Config.SHM_STREAM_ID:
+                        continue
+
                     # stale frame
                     if Config.MAX_FRAME_AGE_MS > 0:
                         now_ms = wall_clock_ms()
                         age_ms = latency_ms(now_ms, int(frame_contract.get("timestamp_ms", now_ms)))
                         if age_ms > Config.MAX_FRAME_AGE_MS:
+                            reader.advance(frame_contract.get("memory"))
                             metrics.inc_dropped()
                             _safe_metric(
                                 "metrics_frames_dropped_failed",
@@ -162,16 +168,24 @@ def main():
                             logger.debug("Dropped stale frame (age=%sms)", age_ms)
                             continue
 
+                    # Letterboxed model-size copy from ingestion: read only those bytes, skip the resize.
+                    rendition = None
+                    if Config.SHM_USE_MODEL_RENDITION:
+                        rendition = find_rendition(frame_contract["memory"], MODEL)
+                        if rendition is not None and rendition.get("width") != Config.MODEL_IMG_SIZE:
+                            _log_once("model_rendition_size", "Model rendition size differs from MODEL_IMG_SIZE; using full frames")
+                            rendition = None
+
                     # SHM read (observe)
                     try:
                         rr_start = time.time()
                         # trace SHM read
                         try:
                             with ivis_tracing.start_span("detection.shm_read", {"frame_id": frame_contract.get("frame_id"), "stream_id": frame_contract.get("stream_id")}):
-                                raw_bytes = reader.read(frame_contract["memory"])
+                                raw_bytes = reader.read(frame_contract["memory"], rendition)
                         except Exception as exc:
                             _record_issue("tracing_span_shm_read_failed", "Tracing span failed (shm_read)", exc)
-                            raw_bytes = reader.read(frame_contract["memory"])
+                            raw_bytes = reader.read(frame_contract["memory"], rendition)
                         rr_ms = (time.time() - rr_start) * 1000.0
                         _safe_metric("metrics_shm_read_latency_failed", lambda: ivis_metrics.shm_read_latency_ms.observe(rr_ms))
                     except Exception as e:
@@ -179,6 +193,9 @@ def main():
                         raw_bytes = None
 
                     if raw_bytes is None:
+                        # read() may have pinned the slot before failing
+                        reader.release()
+                        reader.advance(frame_contract["memory"])
                         metrics.inc_dropped()
                         _safe_metric(
                             "metrics_frames_dropped_failed",
@@ -187,7 +204,10 @@ def main():
                         continue
 
                     # decode + inference
-                    frame = decoder.decode(raw_bytes, frame_contract)
+                    if rendition is not None:
+                        frame = decoder.decode_rendition(raw_bytes, rendition)
+                    else:
+                        frame = decoder.decode(raw_bytes, frame_contract)
                     frame_id = frame_contract.get("frame_id")
                     stream_id = frame_contract.get("stream_id")
                     try:
@@ -195,17 +215,30 @@ def main():
                         # inference span
                         try:
                             with ivis_tracing.start_span("detection.inference", {"frame_id": frame_id, "stream_id": stream_id}):
-                                raw_results = runner.infer(frame)
+                                raw_results = runner.infer(frame, rendition)
                             state.set_meta("last_infer_ts", time.time())
                             state.inc("frames_inferred", 1)
                         except Exception as exc:
                             _record_issue("tracing_span_inference_failed", "Tracing span failed (inference)", exc)
-                            raw_results = runner.infer(frame)
+                            raw_results = runner.infer(frame, rendition)
                         inf_ms = (time.time() - inf_start) * 1000.0
                         _safe_metric("metrics_inference_latency_failed", lambda: ivis_metrics.inference_latency_ms.observe(inf_ms))
                     except Exception:
                         raise
 
+                    # zero-copy frames: discard results if the writer lapped us mid-inference
+                    frame_valid = reader.still_valid(frame_contract["memory"])
+                    reader.release()
+                    reader.advance(frame_contract["memory"])
+                    if not frame_valid:
+                        metrics.inc_dropped()
+                        _safe_metric(
+                            "metrics_frames_dropped_failed",
+                            lambda: ivis_metrics.frames_dropped_total.labels(reason="shm_lapped").inc(),
+                        )
+                        logger.debug("Dropped frame %s: SHM slot overwritten during inference", frame_id)
+                        continue
+
                     # publish
                     result = parse_output(frame_contract, raw_results)
                     # publish span
@@ -237,6 +270,8 @@ def main():
                     metrics.inc_processed()
 
                 except NonFatalError as e:
+                    reader.release()
+                    reader.advance(frame_contract.get("memory"))
                     metrics.inc_dropped()
                     _safe_metric(
                         "metrics_frames_dropped_failed",
@@ -253,6 +288,7 @@ def main():
                     raise e
 
                 except Exception as e:
+                    reader.release()
                     state.set_error("unhandled_exception", e, context={"frame_id": frame_contract.get("frame_id")})
                     _safe_metric(
                         "metrics_frames_dropped_failed",
@@ -1,40 +1,88 @@
+import logging
+from typing import Optional
+
+import numpy as np
+
 from detection.config import Config
 from detection.errors.fatal import NonFatalError
-from memory.shm_ring import ShmRing
+from ivis.common.renditions import slot_nbytes
+from memory.shm_directory import ShmDirectory
+from memory.shm_ring import ShmRing, file_ring_names
 
 class MemoryReader:
     """
     Stage 3: Reads Raw Bytes Only.
     No decoding, no reshaping here. Just bytes.
+
+    In copy mode frames are copied into one reusable buffer (valid until the
+    next read). In zero-copy mode (SHM_ZERO_COPY) a read-only view of the slot
+    is returned and callers must confirm still_valid() once they are done.
+    With renditions in the slot, only the requested rendition (or the primary
+    frame) is read.
     """
     def __init__(self, host="localhost", port=6000):
         self._ring = None
         self._ring_info = {}
+        self._frame_buf = None
+        self._consumer = None
+        self.zero_copy = Config.SHM_ZERO_COPY
+        self.leases = Config.SHM_LEASES
+
+    def _resolve_layout(self):
+        """(data_name, meta_name, slot_size, slot_count) from the SHM directory or env."""
+        if Config.SHM_STREAM_ID and Config.SHM_DIRECTORY:
+            try:
+                directory = ShmDirectory(Config.SHM_DIRECTORY, create=False)
+                try:
+                    entry = directory.lookup(Config.SHM_STREAM_ID)
+                finally:
+                    directory.close()
+                if entry is not None:
+                    return entry["data_name"], entry["meta_name"], entry["slot_size"], entry["slot_count"]
+            except Exception as exc:
+                logging.getLogger("detection").debug("SHM directory lookup failed, using env layout: %s", exc)
+        slot_size = slot_nbytes(
+            Config.FRAME_WIDTH,
+            Config.FRAME_HEIGHT,
+            Config.SHM_PIXEL_FORMAT,
+            Config.SHM_RENDITION_MODEL_SIZE,
+            Config.SHM_RENDITION_PREVIEW_WIDTH,
+        )
+        if Config.SHM_CACHE_SECONDS > 0 and Config.SHM_CACHE_FPS > 0:
+            slot_count = max(1, int(Config.SHM_CACHE_SECONDS * Config.SHM_CACHE_FPS))
+        else:
+            slot_count = max(1, Config.SHM_BUFFER_BYTES // slot_size)
+        if Config.MEMORY_BACKEND == "mmap":
+            return (*file_ring_names(Config.MMAP_DIR, Config.SHM_NAME, Config.SHM_META_NAME), slot_size, slot_count)
+        return Config.SHM_NAME, Config.SHM_META_NAME, slot_size, slot_count
 
     def ensure_ring(self):
         if self._ring is not None:
             return True, dict(self._ring_info), None
 
-        if Config.MEMORY_BACKEND != "shm":
+        if Config.MEMORY_BACKEND not in ("shm", "mmap"):
             return False, {}, f"Unsupported memory backend: {Config.MEMORY_BACKEND}"
 
-        slot_size = Config.FRAME_WIDTH * Config.FRAME_HEIGHT * 3
-        if Config.SHM_CACHE_SECONDS > 0 and Config.SHM_CACHE_FPS > 0:
-            slot_count = max(1, int(Config.SHM_CACHE_SECONDS * Config.SHM_CACHE_FPS))
-        else:
-            slot_count = max(1, Config.SHM_BUFFER_BYTES // slot_size)
+        data_name, meta_name, slot_size, slot_count = self._resolve_layout()
 
         try:
             self._ring = ShmRing(
-                Config.SHM_NAME,
-                Config.SHM_META_NAME,
+                data_name,
+                meta_name,
                 slot_size,
                 slot_count,
                 create=False,
+                lease_ttl_ms=Config.SHM_LEASE_TTL_MS,
             )
+            try:
+                self._consumer = self._ring.register_consumer(Config.SHM_CONSUMER_NAME, lossless=Config.SHM_LOSSLESS)
+            except Exception as exc:
+                logging.getLogger("detection").warning("SHM consumer registration failed (no cursor/leases): %s", exc)
+                self._consumer = None
+            self._frame_buf = np.empty(slot_size, dtype=np.uint8)
             self._ring_info = {
-                "shm_name": Config.SHM_NAME,
-                "shm_meta_name": Config.SHM_META_NAME,
+                "shm_name": data_name,
+                "shm_meta_name": meta_name,
                 "slot_size": slot_size,
                 "slot_count": slot_count,
             }
@@ -42,8 +90,8 @@ class MemoryReader:
         except FileNotFoundError:
             self._ring = None
             return False, {
-                "shm_name": Config.SHM_NAME,
-                "shm_meta_name": Config.SHM_META_NAME,
+                "shm_name": data_name,
+                "shm_meta_name": meta_name,
                 "slot_size": slot_size,
                 "slot_count": slot_count,
             }, "Shared memory not available yet"
@@ -51,17 +99,89 @@ class MemoryReader:
             self._ring = None
             return False, {}, str(exc)
 
+    def _follow_successor(self, segment: str) -> bool:
+        """
+        Online resize: the frame lives in a ring that replaced ours, possibly
+        after several resizes. Attach to it (geometry from the successor
+        record) and leave the old one.
+        """
+        found = self._ring.follow_successors(segment, lease_ttl_ms=Config.SHM_LEASE_TTL_MS)
+        if found is None:
+            return False
+        ring, successor = found
+        self.close()
+        self._ring = ring
+        try:
+            self._consumer = ring.register_consumer(Config.SHM_CONSUMER_NAME, lossless=Config.SHM_LOSSLESS)
+        except Exception as exc:
+            logging.getLogger("detection").warning("SHM consumer registration failed (no cursor/leases): %s", exc)
+            self._consumer = None
+        self._frame_buf = np.empty(successor["slot_size"], dtype=np.uint8)
+        self._ring_info = {
+            "shm_name": successor["data_name"],
+            "shm_meta_name": successor["meta_name"],
+            "slot_size": successor["slot_size"],
+            "slot_count": successor["slot_count"],
+        }
+        logging.getLogger("detection").info("Followed SHM ring handover to %s", successor["data_name"])
+        return True
+
     def close(self):
         if self._ring is None:
             return
         try:
+            if self._consumer is not None:
+                self._ring.unregister_consumer(self._consumer)
             self._ring.close()
-        except Exception:
-            pass
+        except Exception as exc:
+            logging.getLogger("detection").debug("Error closing SHM ring: %s", exc)
         self._ring = None
         self._ring_info = {}
+        self._frame_buf = None
+        self._consumer = None
+
+    def _slot_ref(self, memory_ref: dict):
+        try:
+            return int(memory_ref.get("key")), memory_ref.get("generation", 0)
+        except (TypeError, ValueError):
+            raise NonFatalError("Invalid shared memory key")
 
-    def read(self, memory_ref: dict) -> bytes:
+    def still_valid(self, memory_ref: dict) -> bool:
+        """False if a zero-copy frame was overwritten while it was in use."""
+        if not self.zero_copy:
+            return True
+        if self._ring is None:
+            return False
+        slot, gen = self._slot_ref(memory_ref)
+        return self._ring.is_valid(slot, gen)
+
+    def release(self) -> None:
+        """Drops the lease taken by read() (no-op when SHM_LEASES is off)."""
+        if self.leases and self._ring is not None and self._consumer is not None:
+            self._ring.unpin(self._consumer)
+
+    def advance(self, memory_ref: dict) -> None:
+        """Moves this consumer's cursor in the ring meta (lag/lapped accounting)."""
+        if self._ring is None or self._consumer is None or not isinstance(memory_ref, dict):
+            return
+        if memory_ref.get("segment") not in (None, self._ring.data_name):
+            return
+        try:
+            slot, gen = self._slot_ref(memory_ref)
+        except NonFatalError:
+            return
+        self._ring.advance(self._consumer, slot, gen)
+
+    @staticmethod
+    def _span(memory_ref: dict, rendition: Optional[dict]):
+        """(offset, length) to read: one rendition, or the primary frame when renditions share the slot."""
+        if rendition is not None:
+            return int(rendition["offset"]), int(rendition["size"])
+        if memory_ref.get("renditions") and isinstance(memory_ref.get("size"), int):
+            return 0, memory_ref["size"]
+        return 0, None
+
+    def read(self, memory_ref: dict, rendition: Optional[dict] = None):
         key = memory_ref.get("key")
         if not key:
             raise NonFatalError("Invalid memory reference: missing key")
@@ -71,13 +191,19 @@ class MemoryReader:
             if not ok:
                 raise NonFatalError(err or "Shared memory not ready")
 
-            try:
-                slot = int(key)
-            except ValueError:
-                raise NonFatalError("Invalid shared memory key")
+            segment = memory_ref.get("segment")
+            if segment and segment != self._ring.data_name and not self._follow_successor(segment):
+                raise NonFatalError(f"Frame is in an unknown shared memory segment: {segment}")
 
-            gen = memory_ref.get("generation", 0)
-            data = self._ring.read(slot, gen)
+            slot, gen = self._slot_ref(memory_ref)
+            offset, length = self._span(memory_ref, rendition)
+            if self.leases and self._consumer is not None and not self._ring.pin(self._consumer, slot, gen):
+                raise NonFatalError("Shared memory miss (evicted or overwritten)")
+            if self.zero_copy:
+                data = self._ring.read_view(slot, gen, offset=offset, length=length)
+            else:
+                copied = self._ring.read_into(slot, gen, self._frame_buf, offset=offset, length=length)
+                data = None if copied is None else self._frame_buf[:copied]
             if data is None:
                 raise NonFatalError("Shared memory miss (evicted or overwritten)")
             if len(data) == 0:
@@ -1,7 +1,7 @@
 # FILE: detection/model/runner.py
 # ------------------------------------------------------------------------------
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 import cv2
 import numpy as np
@@ -10,6 +10,7 @@ from detection.metrics.counters import metrics
 from detection.errors.fatal import FatalError
 from detection.config import Config
 from detection.tracking.reid_tracker import ReIDTracker
+from ivis.common.renditions import to_source_box
 
 
 class ModelRunner:
@@ -35,7 +36,11 @@ class ModelRunner:
         dummy = np.zeros(self.model.input_shape(), dtype="uint8")
         self.model.predict(dummy)
 
-    def infer(self, frame_bgr: np.ndarray) -> Dict[str, Any]:
+    def infer(self, frame_bgr: np.ndarray, rendition: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Detect + track on `frame_bgr`. When it is ingestion's letterboxed model
+        rendition, pass its descriptor so boxes come back in full-frame pixels.
+        """
         start = time.perf_counter()
         try:
             # Frames are expected to be in the contract color space (bgr) from ingestion.
@@ -48,6 +53,8 @@ class ModelRunner:
             track_start = time.perf_counter()
             tracks = self.tracker.update(detections, frame_bgr)
             track_end = time.perf_counter()
+            if rendition is not None:
+                detections, tracks = self._to_source(detections, tracks, rendition)
             timing = {
                 "inference_ms": (track_end - model_start) * 1000.0,
                 "model_ms": (model_end - model_start) * 1000.0,
@@ -59,6 +66,19 @@ class ModelRunner:
         finally:
             metrics.log_latency((time.perf_counter() - start) * 1000)
 
+    @staticmethod
+    def _to_source(detections: List[list], tracks: List[Dict[str, Any]], rendition: Dict[str, Any]):
+        mapped_dets = [[to_source_box(box, rendition), conf, cls] for box, conf, cls in detections]
+        mapped_tracks = []
+        for track in tracks:
+            track = dict(track)
+            if track.get("bbox_xyxy") is not None:
+                x1, y1, x2, y2 = to_source_box(track["bbox_xyxy"], rendition)
+                track["bbox_xyxy"] = [x1, y1, x2, y2]
+                track["bbox"] = [x1, y1, x2 - x1, y2 - y1]
+            mapped_tracks.append(track)
+        return mapped_dets, mapped_tracks
+
     def _parse_detections(self, raw_results) -> List[list]:
         detections = []
         try:
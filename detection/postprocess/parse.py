@@ -55,6 +55,19 @@ def _track_is_recent(track: dict) -> bool:
         return False
 
 
+def _crop_offset(frame_contract: dict):
+    """(x, y) of the ring frame inside the camera frame (ROI_MODE=crop), else None."""
+    roi = frame_contract.get("roi")
+    crop = roi.get("crop") if isinstance(roi, dict) else None
+    if not isinstance(crop, dict):
+        return None
+    try:
+        x, y = float(crop.get("x", 0)), float(crop.get("y", 0))
+    except (TypeError, ValueError):
+        return None
+    return (x, y) if x or y else None
+
+
 def parse_output(frame_contract: dict, raw_results: dict):
     """Construct ResultContractV1 from frame contract and raw model/tracker outputs.
 
@@ -121,6 +134,14 @@ def parse_output(frame_contract: dict, raw_results: dict):
         used_tracks.add(track_id)
         used_dets.add(d_idx)
 
+    # Cropped frames: boxes (and the tracker) live in crop pixels; results are in full-frame pixels.
+    offset = _crop_offset(frame_contract)
+    if offset is not None:
+        ox, oy = offset
+        for det_entry in dets:
+            x1, y1, x2, y2 = det_entry["bbox"]
+            det_entry["bbox"] = [x1 + ox, y1 + oy, x2 + ox, y2 + oy]
+
     result = {
         "contract_version": 1,
         "frame_id": frame_contract["frame_id"],
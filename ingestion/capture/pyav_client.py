@@ -0,0 +1,181 @@
+# FILE: ingestion/capture/pyav_client.py
+# ------------------------------------------------------------------------------
+import collections
+import logging
+import os
+
+from ivis.common.time_utils import monotonic_ms, wall_clock_ms
+from ingestion.capture.reader import FramePacket
+from ingestion.errors.fatal import FatalError
+
+try:
+    import av
+except ImportError:  # optional: only CAPTURE_BACKEND=pyav needs PyAV
+    av = None
+
+logger = logging.getLogger("ingestion")
+
+# Low-latency demuxing for live sources; files are read as fast as they decode.
+_LIVE_OPTIONS = {"rtsp_transport": "tcp", "fflags": "nobuffer", "flags": "low_delay"}
+
+
+class PyAVClient:
+    """
+    FFmpeg capture through PyAV (CAPTURE_BACKEND=pyav), in place of RTSPClient.
+    The decoder runs `decode_threads` threads (0 lets FFmpeg choose) and, with
+    `keyframes_only`, discards every non-key frame.
+    """
+
+    def __init__(self, url, decode_threads=0, keyframes_only=False):
+        self.url = url
+        self.decode_threads = decode_threads
+        self.keyframes_only = keyframes_only
+        self.container = None
+        self.stream = None
+        self.is_file = False
+        self.last_error = None
+        self._demux = None
+
+    def connect(self):
+        if av is None:
+            self.last_error = "pyav_missing"
+            raise FatalError("CAPTURE_BACKEND=pyav needs PyAV (pip install av)")
+        self.is_file = os.path.isfile(self.url)
+        try:
+            self.container = av.open(self.url, options={} if self.is_file else dict(_LIVE_OPTIONS), timeout=10.0)
+            self.stream = self.container.streams.video[0]
+        except Exception as exc:
+            self.close()
+            self.last_error = "open_failed"
+            raise FatalError("Failed to open RTSP stream", context={"url": self.url, "error": str(exc)}) from exc
+        codec = self.stream.codec_context
+        # Frame + slice threading; frame threads add up to thread_count frames of decode delay.
+        codec.thread_type = "AUTO"
+        codec.thread_count = self.decode_threads
+        if self.keyframes_only:
+            codec.skip_frame = "NONKEY"
+        self._demux = self.container.demux(self.stream)
+        self.last_error = None
+
+    def get_raw_handle(self):
+        if self.container is None:
+            raise FatalError("Client not connected")
+        return self.container
+
+    def read_packet(self):
+        """Next demuxed video packet (the final flush packet has size 0), or None at end of stream."""
+        if self._demux is None:
+            raise FatalError("Client not connected")
+        try:
+            return next(self._demux)
+        except StopIteration:
+            return None
+        except Exception as exc:
+            self.last_error = "read_failed"
+            logger.debug("PyAV demux failed: %s", exc)
+            return None
+
+    def decode(self, packet):
+        return self.stream.codec_context.decode(packet)
+
+    def close(self):
+        self._demux = None
+        if self.container is not None:
+            try:
+                self.container.close()
+            except Exception as exc:
+                logger.debug("Error closing PyAV container: %s", exc)
+            self.container = None
+            self.stream = None
+
+    def reconnect(self) -> bool:
+        self.close()
+        try:
+            self.connect()
+            return True
+        except FatalError:
+            return False
+
+    def rewind(self):
+        if self.container is not None and self.is_file:
+            self.container.seek(0, stream=self.stream)
+            self.stream.codec_context.flush_buffers()
+            self._demux = self.container.demux(self.stream)
+
+
+class PyAVReader:
+    """
+    Reader for PyAVClient. Packets carry the stream's own PTS in ms. Frames
+    the selector drops are decoded (later frames reference them) but never
+    scaled or converted; in keyframes-only mode non-key packets are not even
+    decoded. `output_size` (w, h) has FFmpeg scale while converting to BGR.
+    `packet_sink(packet, wall_clock_ms)` sees every demuxed packet first
+    (recording remux).
+    """
+
+    def __init__(self, client, selector=None, output_size=None, packet_sink=None):
+        self.client = client
+        self.selector = selector
+        self.output_size = output_size
+        self.packet_sink = packet_sink
+        self._frames = collections.deque()
+        self._last_pts = 0.0
+        # Source frames dropped before a kept one (non-key packets, selector drops)
+        self._pending_skipped = 0
+
+    @property
+    def selects(self) -> bool:
+        return self.selector is not None
+
+    def _pts(self, frame, wall_clock):
+        pts_ms = 0.0
+        if frame.pts is not None and frame.time_base is not None:
+            pts_ms = float(frame.pts * frame.time_base) * 1000.0
+        # Same fallbacks as the OpenCV reader: files start at 0 ms, live sources may lack timestamps.
+        if pts_ms <= 0 and not self.client.is_file:
+            pts_ms = wall_clock
+        if pts_ms <= 0:
+            pts_ms = self._last_pts + 1.0
+        self._last_pts = pts_ms
+        return pts_ms
+
+    def _next_frame(self):
+        while not self._frames:
+            packet = self.client.read_packet()
+            if packet is None:
+                return None
+            if self.packet_sink is not None:
+                self.packet_sink(packet, wall_clock_ms())
+            if self.client.keyframes_only and packet.size and not packet.is_keyframe:
+                self._pending_skipped += 1
+                continue
+            try:
+                self._frames.extend(self.client.decode(packet))
+            except Exception as exc:
+                # A corrupt packet costs its frame; the decoder resyncs on the next keyframe.
+                logger.debug("PyAV decode error: %s", exc)
+                self._pending_skipped += 1
+        return self._frames.popleft()
+
+    def _to_bgr(self, frame):
+        width, height = self.output_size or (frame.width, frame.height)
+        return frame.reformat(width=width, height=height, format="bgr24").to_ndarray()
+
+    def next_packet(self):
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                return None
+            wall_clock = wall_clock_ms()
+            mono_clock = monotonic_ms()
+            pts_ms = self._pts(frame, wall_clock)
+            if self.selector is None or self.selector.allow(pts_ms):
+                break
+            self._pending_skipped += 1
+        skipped, self._pending_skipped = self._pending_skipped, 0
+        try:
+            payload = self._to_bgr(frame)
+        except Exception as exc:
+            logger.debug("PyAV frame conversion failed: %s", exc)
+            payload = None
+        return FramePacket(payload=payload, pts=pts_ms, timestamp_ms=wall_clock, mono_ms=mono_clock, skipped=skipped)
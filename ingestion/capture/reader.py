@@ -1,38 +1,108 @@
 # FILE: ingestion/capture/reader.py
 # ------------------------------------------------------------------------------
+import math
+
 import cv2
 
 from ivis.common.time_utils import monotonic_ms, wall_clock_ms
 
 class FramePacket:
-    def __init__(self, payload, pts, timestamp_ms, mono_ms):
+    def __init__(self, payload, pts, timestamp_ms, mono_ms, skipped=0):
         self.payload = payload
         self.pts = pts
         self.timestamp_ms = timestamp_ms
         self.mono_ms = mono_ms
+        # Frames grabbed (not decoded) and dropped by the selector before this one
+        self.skipped = skipped
 
 class Reader:
-    def __init__(self, rtsp_client):
+    """
+    With a selector, frames are selected before decoding: dropped frames are
+    only grab()bed, and retrieve() decodes the ones that are kept. File
+    sources in pts selection mode seek ahead instead of grabbing when the next
+    due frame is at least `seek_min_frames` away (0 disables seeking).
+    """
+    def __init__(self, rtsp_client, selector=None, seek_min_frames=0):
         self.client = rtsp_client
+        self.selector = selector
+        self.seek_min_frames = max(0, int(seek_min_frames))
         self._last_pts = 0.0
+        # Skipped frames not yet reported (the source ended before a frame was kept)
+        self._pending_skipped = 0
 
-    def next_packet(self):
-        cap = self.client.get_raw_handle()
-        try:
-            ret, raw_data = cap.read()
-        except Exception:
-            return None
-        
-        if not ret:
-            return None
+    @property
+    def selects(self) -> bool:
+        return self.selector is not None
 
-        wall_clock = wall_clock_ms()
-        mono_clock = monotonic_ms()
+    def _pts(self, cap, wall_clock):
         pts_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
-        if pts_ms <= 0:
+        # A file's first frame sits at 0 ms; wall clock would put it ahead of every later pts.
+        if pts_ms <= 0 and not self.client.is_file:
             pts_ms = wall_clock
         if pts_ms <= 0:
             pts_ms = self._last_pts + 1.0
         self._last_pts = pts_ms
-        
-        return FramePacket(payload=raw_data, pts=pts_ms, timestamp_ms=wall_clock, mono_ms=mono_clock)
+        return pts_ms
+
+    def _seek_ahead(self, cap) -> int:
+        """Jumps a file source to the next frame the selector will keep. Returns frames skipped."""
+        due_pts = self.selector.next_due_pts()
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if due_pts is None or fps <= 0:
+            return 0
+        position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        target = int(math.ceil(due_pts * fps / 1000.0))
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total > 0:
+            target = min(target, total - 1)
+        if target - position < self.seek_min_frames:
+            return 0
+        if not cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+            return 0
+        return target - position
+
+    def next_packet(self):
+        cap = self.client.get_raw_handle()
+        if self.selector is None:
+            try:
+                ret, raw_data = cap.read()
+            except Exception:
+                return None
+
+            if not ret:
+                return None
+
+            wall_clock = wall_clock_ms()
+            mono_clock = monotonic_ms()
+            pts_ms = self._pts(cap, wall_clock)
+            return FramePacket(payload=raw_data, pts=pts_ms, timestamp_ms=wall_clock, mono_ms=mono_clock)
+
+        skipped, self._pending_skipped = self._pending_skipped, 0
+        if self.seek_min_frames and self.client.is_file and self.selector.mode == "pts":
+            skipped += self._seek_ahead(cap)
+        while True:
+            try:
+                ret = cap.grab()
+            except Exception:
+                ret = False
+            if not ret:
+                self._pending_skipped = skipped
+                return None
+            wall_clock = wall_clock_ms()
+            mono_clock = monotonic_ms()
+            pts_ms = self._pts(cap, wall_clock)
+            if self.selector.allow(pts_ms):
+                break
+            skipped += 1
+        try:
+            ret, raw_data = cap.retrieve()
+        except Exception:
+            ret, raw_data = False, None
+        # A failed retrieve() is a corrupt frame (empty payload), not end of stream.
+        return FramePacket(
+            payload=raw_data if ret else None,
+            pts=pts_ms,
+            timestamp_ms=wall_clock,
+            mono_ms=mono_clock,
+            skipped=skipped,
+        )
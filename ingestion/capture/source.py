@@ -0,0 +1,17 @@
+# FILE: ingestion/capture/source.py
+# ------------------------------------------------------------------------------
+from ingestion.capture.pyav_client import PyAVClient, PyAVReader
+from ingestion.capture.reader import Reader
+from ingestion.capture.rtsp_client import RTSPClient
+
+
+def open_capture(conf, url, selector=None, output_size=None):
+    """
+    (client, reader) for `url` on CAPTURE_BACKEND. A selector is applied
+    before decoding; `output_size` lets the PyAV backend scale inside FFmpeg.
+    """
+    if conf.capture_backend == "pyav":
+        client = PyAVClient(url, conf.capture_decode_threads, conf.keyframes_only)
+        return client, PyAVReader(client, selector, output_size)
+    client = RTSPClient(url)
+    return client, Reader(client, selector, conf.capture_seek_min_frames)
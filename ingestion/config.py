@@ -1,16 +1,21 @@
 # ------------------------------------------------------------------------------
 # FILE: ingestion/config.py
 # ------------------------------------------------------------------------------
-import os
 
 from ivis.common.config.base import ConfigLoadError, EnvLoader, redact_config
+from ivis.common.renditions import slot_nbytes
 from ingestion.errors.fatal import ConfigError
+from ingestion.frame.roi import crop_rect, parse_boxes, parse_polygons
+from memory.shm_ring import file_ring_names
 
 
 class Config:
-    def __init__(self):
+    def __init__(self, env=None):
+        # `env` replaces the process environment (one camera of a multi-camera host).
         schema = {
             "RTSP_URL": {"type": "str", "required": True},
+            # Dual-stream cameras: RTSP_URL is the detection substream, RTSP_MAIN_URL feeds recording.
+            "RTSP_MAIN_URL": {"type": "str", "default": None},
             "STREAM_ID": {"type": "str", "required": True},
             "CAMERA_ID": {"type": "str", "required": True},
             "TARGET_FPS": {"type": "int", "required": True},
@@ -28,7 +33,31 @@ class Config:
             "SHM_META_NAME": {"type": "str", "default": "ivis_shm_meta"},
             "SHM_BUFFER_BYTES": {"type": "int", "default": 50000000},
             "SHM_CACHE_SECONDS": {"type": "float", "default": 30.0},
+            "SHM_LEASE_STALL_MS": {"type": "float", "default": 0.0},
+            "SHM_WRITE_IN_PLACE": {"type": "bool", "default": True},
+            "SHM_WRITE_POLICY": {"type": "str", "default": "overwrite"},
+            "SHM_BLOCK_TIMEOUT_MS": {"type": "float", "default": 0.0},
+            "SHM_ARENA": {"type": "bool", "default": False},
+            "MMAP_DIR": {"type": "str", "default": "/dev/shm/ivis"},
+            "MMAP_KEEP_FILES": {"type": "bool", "default": True},
+            "SHM_MULTI_WRITER": {"type": "bool", "default": False},
+            "SHM_DIRECTORY": {"type": "str", "default": "ivis_shm_directory"},
+            "SHM_PREFAULT": {"type": "bool", "default": False},
+            "SHM_PIXEL_FORMAT": {"type": "str", "default": "bgr"},
+            "SHM_RENDITION_MODEL_SIZE": {"type": "int", "default": 0},
+            "SHM_RENDITION_PREVIEW_WIDTH": {"type": "int", "default": 0},
+            "SHM_RESIZE_FILE": {"type": "str", "default": None},
+            "SHM_HANDOVER_GRACE_SEC": {"type": "float", "default": 30.0},
+            "SHM_HUGEPAGES": {"type": "bool", "default": False},
+            "SHM_HUGEPAGE_DIR": {"type": "str", "default": "/dev/hugepages"},
             "SELECTOR_MODE": {"type": "str", "default": "clock"},
+            "INGEST_PIPELINE": {"type": "bool", "default": False},
+            "CAPTURE_GRAB_SKIP": {"type": "bool", "default": True},
+            "CAPTURE_SEEK_MIN_FRAMES": {"type": "int", "default": 15},
+            "CAPTURE_BACKEND": {"type": "str", "default": "opencv"},
+            "CAPTURE_DECODE_THREADS": {"type": "int", "default": 0},
+            "CAPTURE_KEYFRAME_FPS": {"type": "float", "default": 1.0},
+            "INGEST_QUEUE_SIZE": {"type": "int", "default": 2},
             "ADAPTIVE_FPS": {"type": "bool", "default": False},
             "ADAPTIVE_MIN_FPS": {"type": "float", "default": 5},
             "ADAPTIVE_MAX_FPS": {"type": "float", "default": None},
@@ -49,11 +78,31 @@ class Config:
             "ADAPTIVE_LAG_HYSTERESIS": {"type": "float", "default": 0.2},
             "ROI_BOXES": {"type": "str", "default": None},
             "ROI_POLYGONS": {"type": "str", "default": None},
+            # mask: full frame with everything outside the ROI blacked out; crop: only the ROI's bounding rectangle.
+            "ROI_MODE": {"type": "str", "default": "mask"},
             "RECORD_BUFFER_SECONDS": {"type": "float", "default": 0},
             "RECORD_JPEG_QUALITY": {"type": "int", "default": 85},
             "RECORD_BUFFER_MAX_FRAMES": {"type": "int", "default": None},
+            "RECORD_MAIN_FPS": {"type": "float", "default": None},
+            # JPEG encoding off the ingestion loop (0 encodes inline) and its bounded queue
+            "RECORD_ENCODE_WORKERS": {"type": "int", "default": 1},
+            "RECORD_ENCODE_QUEUE": {"type": "int", "default": 8},
+            # Frames leaving the in-memory buffer spill to a segment ring under RECORD_SPILL_DIR/<STREAM_ID>
+            "RECORD_SPILL_DIR": {"type": "str", "default": None},
+            "RECORD_SPILL_SECONDS": {"type": "float", "default": 600.0},
+            "RECORD_SPILL_SEGMENT_SEC": {"type": "float", "default": 10.0},
+            # jpeg: per-frame JPEGs in memory; mjpeg/h264: encoded video segments; remux: source packets (pyav)
+            "RECORD_FORMAT": {"type": "str", "default": "jpeg"},
+            "RECORD_VIDEO_DIR": {"type": "str", "default": None},
+            "RECORD_SEGMENT_SEC": {"type": "float", "default": 10.0},
+            "MOTION_GATE": {"type": "str", "default": "off"},
+            "MOTION_KEEPALIVE_FPS": {"type": "float", "default": 1.0},
+            "MOTION_HOLD_SEC": {"type": "float", "default": 2.0},
+            "MOTION_PIXEL_THRESHOLD": {"type": "int", "default": 25},
+            "MOTION_MIN_AREA": {"type": "float", "default": 0.005},
+            "MOTION_HASH_BITS": {"type": "int", "default": 6},
         }
-        loader = EnvLoader()
+        loader = EnvLoader(env)
         try:
             values = loader.load(schema)
         except ConfigLoadError as exc:
@@ -61,6 +110,7 @@ class Config:
         self._values = values
 
         self.rtsp_url = values["RTSP_URL"]
+        self.rtsp_main_url = values["RTSP_MAIN_URL"]
         self.stream_id = values["STREAM_ID"]
         self.camera_id = values["CAMERA_ID"]
         self.target_fps = values["TARGET_FPS"]
@@ -79,7 +129,7 @@ class Config:
         else:
             # migration from legacy FRAME_COLOR
             src = values["FRAME_COLOR"].lower() if values.get("FRAME_COLOR") else "bgr"
-            if os.getenv("FRAME_COLOR"):
+            if loader.env.get("FRAME_COLOR"):
                 import warnings
 
                 warnings.warn(
@@ -94,11 +144,55 @@ class Config:
         self.shm_meta_name = values["SHM_META_NAME"]
         self.shm_buffer_bytes = values["SHM_BUFFER_BYTES"]
         self.shm_cache_seconds = values["SHM_CACHE_SECONDS"]
-        if os.getenv("SHM_BUFFER_BYTES") is None and self.shm_cache_seconds > 0:
-            slot_size = self.frame_width * self.frame_height * 3
+        self.shm_lease_stall_ms = values["SHM_LEASE_STALL_MS"]
+        self.shm_write_in_place = values["SHM_WRITE_IN_PLACE"]
+        self.shm_write_policy = values["SHM_WRITE_POLICY"].lower()
+        self.shm_block_timeout_ms = values["SHM_BLOCK_TIMEOUT_MS"]
+        self.shm_arena = values["SHM_ARENA"]
+        self.mmap_dir = values["MMAP_DIR"]
+        self.mmap_keep_files = values["MMAP_KEEP_FILES"]
+        # MEMORY_BACKEND=mmap: the same ring over files in MMAP_DIR (names become paths)
+        if self.memory_backend == "mmap":
+            self.ring_data_name, self.ring_meta_name = file_ring_names(self.mmap_dir, self.shm_name, self.shm_meta_name)
+        else:
+            self.ring_data_name, self.ring_meta_name = self.shm_name, self.shm_meta_name
+        self.shm_multi_writer = values["SHM_MULTI_WRITER"]
+        self.shm_directory = values["SHM_DIRECTORY"]
+        self.shm_prefault = values["SHM_PREFAULT"]
+        self.shm_pixel_format = values["SHM_PIXEL_FORMAT"].lower()
+        self.shm_rendition_model_size = values["SHM_RENDITION_MODEL_SIZE"]
+        self.shm_rendition_preview_width = values["SHM_RENDITION_PREVIEW_WIDTH"]
+        self.shm_resize_file = values["SHM_RESIZE_FILE"]
+        self.shm_handover_grace_sec = values["SHM_HANDOVER_GRACE_SEC"]
+        self.shm_hugepages = values["SHM_HUGEPAGES"]
+        self.shm_hugepage_dir = values["SHM_HUGEPAGE_DIR"]
+        self.roi_mode = values["ROI_MODE"].lower()
+        # ROI_MODE=crop: (x, y, w, h) of the ROI in frame coordinates; the ring holds only that region.
+        self.roi_crop = None
+        if self.roi_mode == "crop":
+            self.roi_crop = crop_rect(
+                self.frame_width,
+                self.frame_height,
+                parse_boxes(values["ROI_BOXES"]),
+                parse_polygons(values["ROI_POLYGONS"]),
+            )
+        if loader.env.get("SHM_BUFFER_BYTES") is None and self.shm_cache_seconds > 0:
+            slot_size = slot_nbytes(
+                *self.output_resolution,
+                self.shm_pixel_format,
+                self.shm_rendition_model_size,
+                self.shm_rendition_preview_width,
+            )
             slots = max(1, int(self.target_fps * self.shm_cache_seconds))
             self.shm_buffer_bytes = slot_size * slots
         self.selector_mode = values["SELECTOR_MODE"].lower()
+        self.ingest_pipeline = values["INGEST_PIPELINE"]
+        self.ingest_queue_size = values["INGEST_QUEUE_SIZE"]
+        self.capture_grab_skip = values["CAPTURE_GRAB_SKIP"]
+        self.capture_seek_min_frames = values["CAPTURE_SEEK_MIN_FRAMES"]
+        self.capture_backend = values["CAPTURE_BACKEND"].lower()
+        self.capture_decode_threads = values["CAPTURE_DECODE_THREADS"]
+        self.capture_keyframe_fps = values["CAPTURE_KEYFRAME_FPS"]
         self.adaptive_fps = values["ADAPTIVE_FPS"]
         self.adaptive_min_fps = values["ADAPTIVE_MIN_FPS"]
         self.adaptive_max_fps = values["ADAPTIVE_MAX_FPS"] or float(self.target_fps)
@@ -106,11 +200,11 @@ class Config:
         self.video_loop = values["VIDEO_LOOP"]
         self.rtsp_max_retries = values["RTSP_MAX_RETRIES"]
         self.rtsp_retry_backoff_sec = values["RTSP_RETRY_BACKOFF_SEC"]
-        if os.getenv("RTSP_RECONNECT_MIN_SEC") is None:
+        if loader.env.get("RTSP_RECONNECT_MIN_SEC") is None:
             self.rtsp_reconnect_min_sec = self.rtsp_retry_backoff_sec
         else:
             self.rtsp_reconnect_min_sec = values["RTSP_RECONNECT_MIN_SEC"]
-        if os.getenv("RTSP_RECONNECT_MAX_SEC") is None:
+        if loader.env.get("RTSP_RECONNECT_MAX_SEC") is None:
             self.rtsp_reconnect_max_sec = max(self.rtsp_reconnect_min_sec, self.rtsp_retry_backoff_sec * 10.0)
         else:
             self.rtsp_reconnect_max_sec = values["RTSP_RECONNECT_MAX_SEC"]
@@ -128,6 +222,21 @@ class Config:
         self.record_buffer_seconds = values["RECORD_BUFFER_SECONDS"]
         self.record_jpeg_quality = values["RECORD_JPEG_QUALITY"]
         self.record_buffer_max_frames = values["RECORD_BUFFER_MAX_FRAMES"]
+        self.record_main_fps = values["RECORD_MAIN_FPS"] or self.adaptive_max_fps
+        self.record_encode_workers = values["RECORD_ENCODE_WORKERS"]
+        self.record_encode_queue = values["RECORD_ENCODE_QUEUE"]
+        self.record_spill_dir = values["RECORD_SPILL_DIR"]
+        self.record_spill_seconds = values["RECORD_SPILL_SECONDS"]
+        self.record_spill_segment_sec = values["RECORD_SPILL_SEGMENT_SEC"]
+        self.record_format = values["RECORD_FORMAT"].lower()
+        self.record_video_dir = values["RECORD_VIDEO_DIR"]
+        self.record_segment_sec = values["RECORD_SEGMENT_SEC"]
+        self.motion_gate = values["MOTION_GATE"].lower()
+        self.motion_keepalive_fps = values["MOTION_KEEPALIVE_FPS"]
+        self.motion_hold_sec = values["MOTION_HOLD_SEC"]
+        self.motion_pixel_threshold = values["MOTION_PIXEL_THRESHOLD"]
+        self.motion_min_area = values["MOTION_MIN_AREA"]
+        self.motion_hash_bits = values["MOTION_HASH_BITS"]
 
         self._validate()
 
@@ -136,14 +245,54 @@ class Config:
             raise ConfigError("Invalid TARGET_FPS", context={"value": self.target_fps})
         if self.frame_width <= 0 or self.frame_height <= 0:
             raise ConfigError("Invalid resolution", context={"w": self.frame_width, "h": self.frame_height})
-        if self.memory_backend not in ("shm",):
+        if self.roi_mode not in ("mask", "crop"):
+            raise ConfigError("Invalid ROI_MODE", context={"value": self.roi_mode})
+        if self.memory_backend not in ("shm", "mmap"):
             raise ConfigError("Unsupported MEMORY_BACKEND", context={"value": self.memory_backend})
+        if len(self.ring_data_name.encode("utf-8")) > 64 or len(self.ring_meta_name.encode("utf-8")) > 64:
+            # Segment names are stored in 64-byte fields (SHM directory, successor record).
+            raise ConfigError("Ring segment name too long (max 64 bytes)", context={"value": self.ring_data_name})
         if self.shm_buffer_bytes <= 0:
             raise ConfigError("Invalid SHM_BUFFER_BYTES", context={"value": self.shm_buffer_bytes})
         if self.selector_mode not in ("clock", "pts"):
             raise ConfigError("Invalid SELECTOR_MODE", context={"value": self.selector_mode})
+        if self.capture_seek_min_frames < 0:
+            raise ConfigError("Invalid CAPTURE_SEEK_MIN_FRAMES", context={"value": self.capture_seek_min_frames})
+        if self.capture_backend not in ("opencv", "pyav"):
+            raise ConfigError("Invalid CAPTURE_BACKEND", context={"value": self.capture_backend})
+        if self.capture_decode_threads < 0:
+            raise ConfigError("Invalid CAPTURE_DECODE_THREADS", context={"value": self.capture_decode_threads})
+        if self.capture_keyframe_fps < 0:
+            raise ConfigError("Invalid CAPTURE_KEYFRAME_FPS", context={"value": self.capture_keyframe_fps})
+        if self.ingest_queue_size < 1:
+            raise ConfigError("Invalid INGEST_QUEUE_SIZE", context={"value": self.ingest_queue_size})
         if self.shm_cache_seconds < 0:
             raise ConfigError("Invalid SHM_CACHE_SECONDS", context={"value": self.shm_cache_seconds})
+        if self.shm_lease_stall_ms < 0:
+            raise ConfigError("Invalid SHM_LEASE_STALL_MS", context={"value": self.shm_lease_stall_ms})
+        if self.shm_write_policy not in ("overwrite", "blocking"):
+            raise ConfigError("Invalid SHM_WRITE_POLICY", context={"value": self.shm_write_policy})
+        if self.shm_pixel_format not in ("bgr", "nv12", "i420"):
+            raise ConfigError("Invalid SHM_PIXEL_FORMAT", context={"value": self.shm_pixel_format})
+        if self.shm_pixel_format != "bgr" and (self.frame_width % 2 or self.frame_height % 2):
+            raise ConfigError(
+                "SHM_PIXEL_FORMAT needs an even resolution",
+                context={"format": self.shm_pixel_format, "w": self.frame_width, "h": self.frame_height},
+            )
+        if self.shm_rendition_model_size < 0 or self.shm_rendition_model_size % 32:
+            # Ultralytics pads inputs to a stride-32 multiple; other sizes would be resized again.
+            raise ConfigError("Invalid SHM_RENDITION_MODEL_SIZE (multiple of 32)", context={"value": self.shm_rendition_model_size})
+        if self.shm_rendition_preview_width < 0 or self.shm_rendition_preview_width % 2:
+            raise ConfigError("Invalid SHM_RENDITION_PREVIEW_WIDTH (even)", context={"value": self.shm_rendition_preview_width})
+        if self.shm_multi_writer and self.shm_resize_file:
+            raise ConfigError("SHM_RESIZE_FILE is not supported with SHM_MULTI_WRITER", context={"value": self.shm_resize_file})
+        if self.shm_resize_file and max(len(self.ring_data_name.encode("utf-8")), len(self.ring_meta_name.encode("utf-8"))) > 64 - len("_h9999"):
+            # Successor rings are named <name>_h<n>, in the same 64-byte fields.
+            raise ConfigError("Ring segment name too long for SHM_RESIZE_FILE (max 58 bytes)", context={"value": self.ring_data_name})
+        if self.shm_handover_grace_sec < 0:
+            raise ConfigError("Invalid SHM_HANDOVER_GRACE_SEC", context={"value": self.shm_handover_grace_sec})
+        if self.shm_block_timeout_ms < 0:
+            raise ConfigError("Invalid SHM_BLOCK_TIMEOUT_MS", context={"value": self.shm_block_timeout_ms})
         if self.rtsp_max_retries < 0:
             raise ConfigError("Invalid RTSP_MAX_RETRIES", context={"value": self.rtsp_max_retries})
         if self.rtsp_retry_backoff_sec < 0:
@@ -164,12 +313,54 @@ class Config:
             raise ConfigError("Invalid ADAPTIVE_LAG_HYSTERESIS", context={"value": self.adaptive_lag_hysteresis})
         if self.record_buffer_seconds < 0:
             raise ConfigError("Invalid RECORD_BUFFER_SECONDS", context={"value": self.record_buffer_seconds})
+        if self.motion_gate not in ("off", "diff", "hash"):
+            raise ConfigError("Invalid MOTION_GATE", context={"value": self.motion_gate})
+        if self.motion_keepalive_fps < 0 or self.motion_hold_sec < 0:
+            raise ConfigError("Invalid MOTION_KEEPALIVE_FPS/MOTION_HOLD_SEC")
+        if not 0 <= self.motion_pixel_threshold <= 255:
+            raise ConfigError("Invalid MOTION_PIXEL_THRESHOLD", context={"value": self.motion_pixel_threshold})
+        if not 0 < self.motion_min_area <= 1:
+            raise ConfigError("Invalid MOTION_MIN_AREA", context={"value": self.motion_min_area})
+        if not 1 <= self.motion_hash_bits <= 64:
+            raise ConfigError("Invalid MOTION_HASH_BITS", context={"value": self.motion_hash_bits})
+        if self.record_main_fps <= 0:
+            raise ConfigError("Invalid RECORD_MAIN_FPS", context={"value": self.record_main_fps})
         if self.record_jpeg_quality <= 0 or self.record_jpeg_quality > 100:
             raise ConfigError("Invalid RECORD_JPEG_QUALITY", context={"value": self.record_jpeg_quality})
+        if self.record_encode_workers < 0 or self.record_encode_queue < 1:
+            raise ConfigError(
+                "Invalid RECORD_ENCODE_WORKERS/RECORD_ENCODE_QUEUE",
+                context={"workers": self.record_encode_workers, "queue": self.record_encode_queue},
+            )
+        if self.record_format not in ("jpeg", "mjpeg", "h264", "remux"):
+            raise ConfigError("Invalid RECORD_FORMAT", context={"value": self.record_format})
+        if self.record_format != "jpeg" and not self.record_video_dir:
+            raise ConfigError("RECORD_FORMAT needs RECORD_VIDEO_DIR", context={"value": self.record_format})
+        if self.record_format == "remux" and self.capture_backend != "pyav":
+            raise ConfigError("RECORD_FORMAT=remux needs CAPTURE_BACKEND=pyav", context={"value": self.capture_backend})
+        if self.record_segment_sec <= 0:
+            raise ConfigError("Invalid RECORD_SEGMENT_SEC", context={"value": self.record_segment_sec})
+        if self.record_spill_seconds <= 0 or self.record_spill_segment_sec <= 0:
+            raise ConfigError(
+                "Invalid RECORD_SPILL_SECONDS/RECORD_SPILL_SEGMENT_SEC",
+                context={"seconds": self.record_spill_seconds, "segment": self.record_spill_segment_sec},
+            )
+
+    @property
+    def keyframes_only(self) -> bool:
+        """PyAV backend: decode only keyframes when TARGET_FPS is at or below CAPTURE_KEYFRAME_FPS."""
+        return self.capture_backend == "pyav" and self.target_fps <= self.capture_keyframe_fps
 
     @property
     def resolution(self):
         return (self.frame_width, self.frame_height)
 
+    @property
+    def output_resolution(self):
+        """(w, h) of the frames written to the ring: the ROI crop with ROI_MODE=crop, else the frame size."""
+        if self.roi_crop is not None:
+            return (self.roi_crop[2], self.roi_crop[3])
+        return self.resolution
+
     def summary(self) -> dict:
         return redact_config(self._values)
@@ -0,0 +1,98 @@
+# FILE: ingestion/frame/motion.py
+# ------------------------------------------------------------------------------
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from ingestion.frame.anchor import Anchor
+
+# Width of the grayscale thumbnail compared in "diff" mode (height keeps the aspect ratio).
+DIFF_WIDTH = 64
+
+
+def hamming_distance(a: str, b: str) -> int:
+    """Differing bits between two hex fingerprints of equal length."""
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+class MotionGate:
+    """
+    Decides whether a frame differs enough from the last published one to be
+    worth publishing. "diff" compares blurred low-res grayscale thumbnails
+    (changed-pixel fraction, ROI only when a mask is given); "hash" compares
+    Anchor fingerprints by Hamming distance. After a change, frames keep
+    flowing for `hold_ms`; a static scene still publishes every `keepalive_ms`
+    so trackers age out and consumers see the stream is alive.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        keepalive_ms: float,
+        hold_ms: float = 0.0,
+        pixel_threshold: int = 25,
+        min_area: float = 0.005,
+        hash_bits: int = 6,
+        roi_mask: Optional[np.ndarray] = None,
+    ):
+        if mode not in ("diff", "hash"):
+            raise ValueError(f"Unknown motion gate mode: {mode}")
+        self.mode = mode
+        self.keepalive_ms = max(0.0, float(keepalive_ms))
+        self.hold_ms = max(0.0, float(hold_ms))
+        self.pixel_threshold = int(pixel_threshold)
+        self.min_area = float(min_area)
+        self.hash_bits = int(hash_bits)
+        self._roi_mask = roi_mask
+        self._mask_cache = None
+        self._anchor = Anchor()
+        self._reference = None
+        self._last_publish_ms = None
+        self._last_change_ms = None
+        self.skipped = 0
+
+    def _thumbnail(self, frame):
+        height = max(1, round(frame.shape[0] * DIFF_WIDTH / frame.shape[1]))
+        thumb = cv2.resize(frame, (DIFF_WIDTH, height), interpolation=cv2.INTER_AREA)
+        if thumb.ndim == 3:
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(thumb, (3, 3), 0)
+
+    def _mask(self, shape):
+        if self._roi_mask is None:
+            return None
+        if self._mask_cache is None or self._mask_cache.shape != shape:
+            self._mask_cache = cv2.resize(self._roi_mask, (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST) > 0
+        return self._mask_cache
+
+    def _signature(self, frame):
+        return self._thumbnail(frame) if self.mode == "diff" else self._anchor.generate(frame)
+
+    def _changed(self, signature) -> bool:
+        if self.mode == "hash":
+            return hamming_distance(signature, self._reference) >= self.hash_bits
+        if signature.shape != self._reference.shape:
+            return True
+        moving = cv2.absdiff(signature, self._reference) > self.pixel_threshold
+        mask = self._mask(signature.shape)
+        if mask is not None:
+            area = int(mask.sum())
+            return area > 0 and int(np.count_nonzero(moving & mask)) / area >= self.min_area
+        return np.count_nonzero(moving) / moving.size >= self.min_area
+
+    def allow(self, frame, now_ms: float) -> bool:
+        """True to publish `frame`; False counts it as skipped."""
+        signature = self._signature(frame)
+        if self._reference is None or self._changed(signature):
+            self._last_change_ms = now_ms
+        elif not (
+            now_ms - self._last_change_ms < self.hold_ms
+            or (self.keepalive_ms and now_ms - self._last_publish_ms >= self.keepalive_ms)
+        ):
+            self.skipped += 1
+            return False
+        # The reference is the last published frame, so slow drift still adds up to a change.
+        self._reference = signature
+        self._last_publish_ms = now_ms
+        return True
@@ -1,6 +1,7 @@
 # FILE: ingestion/frame/normalizer.py
 # ------------------------------------------------------------------------------
 import cv2
+import numpy as np
 
 
 class Normalizer:
@@ -8,10 +9,14 @@ class Normalizer:
         self.target_size = target_resolution
         self.input_color = frame_color
 
-    def process(self, raw_frame):
+    def process(self, raw_frame, dst=None):
+        """Resize/convert to the target layout. With `dst`, renders into it (e.g. a SHM slot view)."""
         frame = raw_frame
         if (frame.shape[1], frame.shape[0]) != self.target_size:
-            frame = cv2.resize(frame, self.target_size, interpolation=cv2.INTER_NEAREST)
+            frame = cv2.resize(frame, self.target_size, dst=dst, interpolation=cv2.INTER_NEAREST)
         if self.input_color == "rgb":
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=dst)
+        if dst is not None and frame is not dst:
+            np.copyto(dst, frame)
+            frame = dst
         return frame
@@ -61,7 +61,57 @@ def build_mask(width: int, height: int, boxes, polygons):
     return mask
 
 
-def apply_mask(frame, mask):
+def expand_mask(mask, channels: int = 3):
+    """Per-channel copy of a single-channel mask, so apply_mask() can run in place."""
+    if mask is None or mask.ndim == 3:
+        return mask
+    return cv2.merge([mask] * channels)
+
+
+def apply_mask(frame, mask, dst=None):
     if mask is None:
         return frame
-    return cv2.bitwise_and(frame, frame, mask=mask)
+    if mask.shape == frame.shape:
+        # elementwise AND against an expanded mask is safe with dst=frame
+        return cv2.bitwise_and(frame, mask, dst=dst)
+    masked = cv2.bitwise_and(frame, frame, mask=mask)
+    if dst is None:
+        return masked
+    np.copyto(dst, masked)
+    return dst
+
+
+def crop_rect(width: int, height: int, boxes, polygons) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Bounding rectangle (x, y, w, h) of every box and polygon, clamped to the
+    frame and widened to even offsets/sizes (so YUV 4:2:0 ring formats still
+    fit). None when there is no ROI.
+    """
+    xs, ys = [], []
+    for x1, y1, x2, y2 in boxes:
+        xs += [x1, x2]
+        ys += [y1, y2]
+    for polygon in polygons:
+        xs += [x for x, _ in polygon]
+        ys += [y for _, y in polygon]
+    if not xs:
+        return None
+    x1 = max(0, min(xs)) & ~1
+    y1 = max(0, min(ys)) & ~1
+    x2 = min(width, max(xs) + 1)
+    y2 = min(height, max(ys) + 1)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    x2 = min(width, x2 + (x2 - x1) % 2)
+    y2 = min(height, y2 + (y2 - y1) % 2)
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+def crop_source(frame, rect, frame_size):
+    """View of `frame` covering `rect`, given in `frame_size` (w, h) coordinates; the source may be any size."""
+    x, y, w, h = rect
+    sx = frame.shape[1] / float(frame_size[0])
+    sy = frame.shape[0] / float(frame_size[1])
+    if sx == 1.0 and sy == 1.0:
+        return frame[y:y + h, x:x + w]
+    return frame[int(round(y * sy)):int(round((y + h) * sy)), int(round(x * sx)):int(round((x + w) * sx))]
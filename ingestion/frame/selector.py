@@ -38,6 +38,12 @@ class Selector:
             return True
         return False
 
+    def next_due_pts(self) -> Optional[float]:
+        """pts (ms) from which the next frame is allowed in pts mode; None if not predictable."""
+        if self.mode != "pts" or self.last_pts < 0:
+            return None
+        return self.last_pts + self.frame_duration_ms
+
     def set_target_fps(self, fps: float):
         if fps <= 0:
             return
@@ -0,0 +1,179 @@
+# FILE: ingestion/host.py
+# ------------------------------------------------------------------------------
+"""
+Multi-camera ingestion host: every camera of INGEST_CAMERAS_FILE runs in its
+own thread of one process, behind one health endpoint, one Prometheus
+endpoint (per-stream series are labelled `stream`) and one ZMQ PUB socket per
+endpoint. Each stream writes to its own ring partition.
+
+    INGEST_CAMERAS_FILE=cameras.json python -m ingestion.host
+
+The file is a JSON list of per-camera overrides of the ingestion environment,
+e.g. [{"STREAM_ID": "cam01", "CAMERA_ID": "cam01", "RTSP_URL": "rtsp://..."}].
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+from ivis_logging import setup_logging
+
+logger = setup_logging("ingestion")
+from ivis.common.config.base import EnvLoader
+from ivis_health import ServiceState
+
+from ingestion.config import Config
+from ingestion.errors.fatal import ConfigError, FatalError
+from ingestion.ipc import SharedPubSocket
+from ingestion.main import run_stream, start_services
+from ingestion.runtime import Runtime
+
+
+class StreamState:
+    """
+    One stream's view of the host's ServiceState. Checks are namespaced
+    `<stream>/<check>`; counters and meta are kept per stream and host-wide.
+    """
+
+    def __init__(self, state: ServiceState, stream_id: str, on_ready=None):
+        self._state = state
+        self.stream_id = stream_id
+        self.ready = False
+        self._on_ready = on_ready
+
+    def _key(self, name: str) -> str:
+        return f"{self.stream_id}/{name}"
+
+    def set_check(self, name, ok, details=None, reason=None):
+        self._state.set_check(self._key(name), ok, details=details, reason=reason)
+
+    def get_check_ok(self, name) -> bool:
+        return self._state.get_check_ok(self._key(name))
+
+    def inc(self, name, by=1):
+        self._state.inc(name, by)
+        self._state.inc(self._key(name), by)
+
+    def set_meta(self, key, value):
+        self._state.set_meta(key, value)
+        self._state.set_meta(self._key(key), value)
+
+    def touch_loop(self):
+        self._state.touch_loop()
+
+    def set_ready(self, ready):
+        self.ready = bool(ready)
+        self.set_check("ready", self.ready)
+        if self._on_ready is not None:
+            self._on_ready()
+
+    def compute_ready(self, required_checks) -> bool:
+        ok = all(self.get_check_ok(name) for name in required_checks)
+        self.set_ready(ok)
+        return ok
+
+    def set_error(self, reason, exc=None, context=None):
+        self._state.set_error(reason, exc, context=dict(context or {}, stream_id=self.stream_id))
+
+
+def load_cameras(path: str) -> list:
+    """Per-camera env overrides from a JSON list; every entry needs a unique STREAM_ID and an RTSP_URL."""
+    with open(path, "r", encoding="utf-8") as fh:
+        cameras = json.load(fh)
+    if not isinstance(cameras, list) or not cameras:
+        raise ConfigError("INGEST_CAMERAS_FILE must hold a non-empty JSON list", context={"path": path})
+    seen = set()
+    for camera in cameras:
+        if not isinstance(camera, dict) or not camera.get("STREAM_ID") or not camera.get("RTSP_URL"):
+            raise ConfigError("Camera entries need STREAM_ID and RTSP_URL", context={"entry": camera})
+        if camera["STREAM_ID"] in seen:
+            raise ConfigError("Duplicate STREAM_ID in INGEST_CAMERAS_FILE", context={"value": camera["STREAM_ID"]})
+        seen.add(camera["STREAM_ID"])
+    return cameras
+
+
+def camera_env(base: dict, camera: dict) -> dict:
+    """
+    The ingestion environment of one camera: the host environment, then the
+    camera's overrides. CAMERA_ID defaults to the STREAM_ID, and ring segments
+    are partitioned per stream (`<SHM_NAME>_<STREAM_ID>`) unless the camera
+    names its own.
+    """
+    env = dict(base)
+    env.update({key: str(value) for key, value in camera.items()})
+    stream_id = env["STREAM_ID"]
+    if "CAMERA_ID" not in camera:
+        env["CAMERA_ID"] = stream_id
+    for key, default in (("SHM_NAME", "ivis_shm_data"), ("SHM_META_NAME", "ivis_shm_meta")):
+        if key not in camera:
+            env[key] = f"{base.get(key, default)}_{stream_id}"
+    return env
+
+
+def main():
+    logger.info(">>> Ingestion Host: Initializing <<<")
+    path = os.getenv("INGEST_CAMERAS_FILE")
+    if not path:
+        logger.error("FATAL: INGEST_CAMERAS_FILE is not set")
+        sys.exit(1)
+    base = EnvLoader().env
+    try:
+        confs = [Config(camera_env(base, camera)) for camera in load_cameras(path)]
+    except (ConfigError, OSError, ValueError) as e:
+        logger.error("FATAL: Config Error - %s", getattr(e, "message", str(e)))
+        sys.exit(1)
+    for conf in confs:
+        logger.info("Config summary (%s): %s", conf.stream_id, conf.summary())
+
+    state = ServiceState("ingestion")
+    start_services(state)
+    runtime = Runtime()
+    pub_sockets = {}
+    try:
+        for conf in confs:
+            if conf.bus_transport.lower() == "zmq" and conf.zmq_pub_endpoint not in pub_sockets:
+                pub_sockets[conf.zmq_pub_endpoint] = SharedPubSocket(conf.zmq_pub_endpoint)
+    except Exception as e:
+        logger.error("FATAL: Publisher bind failed - %s", e)
+        sys.exit(1)
+
+    views = []
+
+    def _update_ready():
+        # Host readiness: every stream is up (per-stream checks say which one is not).
+        state.set_ready(all(view.ready for view in views))
+
+    def _run(conf, view):
+        try:
+            run_stream(conf, view, runtime, pub_sockets)
+        except FatalError as e:
+            logger.error("FATAL: Stream %s failed to start - %s", conf.stream_id, e.message)
+        except Exception as e:
+            logger.exception("Stream %s crashed: %s", conf.stream_id, e)
+        view.set_ready(False)
+
+    threads = []
+    for conf in confs:
+        view = StreamState(state, conf.stream_id, _update_ready)
+        views.append(view)
+        threads.append(threading.Thread(target=_run, args=(conf, view), name=f"ingestion-{conf.stream_id}", daemon=True))
+    for thread in threads:
+        thread.start()
+    logger.info(">>> Ingestion Host Running | Streams: %s <<<", ", ".join(conf.stream_id for conf in confs))
+
+    # A failed stream stays down (its checks say why); the host runs until stopped or none is left.
+    while runtime.should_continue() and any(thread.is_alive() for thread in threads):
+        time.sleep(0.5)
+    runtime.is_running = False
+    for thread in threads:
+        thread.join(5.0)
+    for sock in pub_sockets.values():
+        sock.close()
+    runtime.shutdown()
+    logger.info("Ingestion Host Stopped.")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 import json
 import socket
 import logging
+import threading
 
 from ingestion.memory.ref import MemoryReference
 from ivis.common.contracts.frame_contract import FrameContractV1, FrameMemoryRef
@@ -39,9 +40,10 @@ class SocketPublisher:
     def __init__(self, config, host="localhost", port=5555):
         self.stream_id = config.stream_id
         self.camera_id = config.camera_id
-        self.frame_width = config.frame_width
-        self.frame_height = config.frame_height
+        # Ring frame size (the ROI crop with ROI_MODE=crop)
+        self.frame_width, self.frame_height = getattr(config, "output_resolution", (config.frame_width, config.frame_height))
         self.frame_color = config.frame_color
+        self.pixel_format = getattr(config, "shm_pixel_format", "bgr")
         self.address = (host, port)
         self.sock = None
         self._connect()
@@ -68,6 +70,7 @@ class SocketPublisher:
             self.frame_height,
             self.frame_color,
             roi_meta=roi_meta,
+            pixel_format=self.pixel_format,
         )
         payload = json.dumps(contract) + "\n"
 
@@ -93,19 +96,51 @@ class SocketPublisher:
             self.sock = None
 
 
-class ZmqPublisher:
-    def __init__(self, config, endpoint: str):
+class SharedPubSocket:
+    """
+    One bound ZMQ PUB socket shared by every stream of a multi-camera host.
+    ZMQ sockets are not thread-safe, so sends are serialized.
+    """
+
+    def __init__(self, endpoint: str):
         try:
             import zmq
         except Exception as exc:
             raise RuntimeError(f"Missing ZeroMQ dependency: {exc}") from exc
+        self.endpoint = endpoint
+        self._lock = threading.Lock()
+        self._socket = zmq.Context.instance().socket(zmq.PUB)
+        self._socket.bind(endpoint)
+
+    def send(self, payload: bytes) -> None:
+        with self._lock:
+            self._socket.send(payload)
+
+    def close(self):
+        with self._lock:
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+
 
+class ZmqPublisher:
+    def __init__(self, config, endpoint: str, shared: SharedPubSocket = None):
         self.stream_id = config.stream_id
         self.camera_id = config.camera_id
-        self.frame_width = config.frame_width
-        self.frame_height = config.frame_height
+        # Ring frame size (the ROI crop with ROI_MODE=crop)
+        self.frame_width, self.frame_height = getattr(config, "output_resolution", (config.frame_width, config.frame_height))
         self.frame_color = config.frame_color
+        self.pixel_format = getattr(config, "shm_pixel_format", "bgr")
         self.endpoint = endpoint
+        # A host-owned socket is only borrowed: close() leaves it bound.
+        self._shared = shared
+        if shared is not None:
+            self.socket = shared
+            return
+        try:
+            import zmq
+        except Exception as exc:
+            raise RuntimeError(f"Missing ZeroMQ dependency: {exc}") from exc
         self.zmq = zmq
         self.socket = self.zmq.Context.instance().socket(self.zmq.PUB)
         self.socket.bind(self.endpoint)
@@ -124,6 +159,7 @@ class ZmqPublisher:
             self.frame_height,
             self.frame_color,
             roi_meta=roi_meta,
+            pixel_format=self.pixel_format,
         )
         payload = json.dumps(contract).encode("utf-8")
         try:
@@ -134,12 +170,12 @@ class ZmqPublisher:
             return False
 
     def close(self):
-        if self.socket:
+        if self.socket and self._shared is None:
             try:
                 self.socket.close()
             except Exception as exc:
                 _logger.debug("Error closing socket: %s", exc)
-            self.socket = None
+        self.socket = None
 
 
 def _build_contract(
@@ -154,6 +190,7 @@ def _build_contract(
     frame_height,
     frame_color,
     roi_meta=None,
+    pixel_format="bgr",
 ):
     backend = getattr(memory_ref, "backend_type", "shm_ring_v1")
     memory = FrameMemoryRef(
@@ -162,7 +199,8 @@ def _build_contract(
         size=memory_ref.size,
         generation=gen,
     )
-    output_color = "bgr"
+    # Frames are bgr, or compact nv12/i420 when SHM_PIXEL_FORMAT asks for it.
+    output_color = pixel_format or "bgr"
     contract = FrameContractV1(
         contract_version=1,
         frame_id=frame_identity.frame_id,
@@ -179,13 +217,23 @@ def _build_contract(
         frame_color_space=output_color,
     )
     payload = contract.to_dict()
+    segment = getattr(memory_ref, "segment", None)
+    if segment:
+        payload["memory"]["segment"] = segment
+    renditions = getattr(memory_ref, "renditions", None)
+    if renditions:
+        payload["memory"]["renditions"] = renditions
     if roi_meta:
         payload["roi"] = roi_meta
     return payload
 
 
-def get_publisher(config):
+def get_publisher(config, pub_sockets=None):
+    """`pub_sockets` maps endpoint -> SharedPubSocket when several streams publish from one process."""
     transport = getattr(config, "bus_transport", "zmq").lower()
+    endpoint = getattr(config, "zmq_pub_endpoint", "tcp://localhost:5555")
+    if transport == "zmq" and pub_sockets and endpoint in pub_sockets:
+        return ZmqPublisher(config, endpoint, shared=pub_sockets[endpoint])
     if transport == "zmq":
         try:
             from ivis.legacy.ingestion_ipc_legacy import ZmqPublisher as LegacyZmqPublisher
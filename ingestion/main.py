@@ -2,35 +2,46 @@
 # ------------------------------------------------------------------------------
 import sys
 import os
+import threading
 import time
 
+import numpy as np
+
 from ivis_logging import setup_logging
 
 logger = setup_logging("ingestion")
 import ivis_metrics
 import ivis_tracing
+from ivis.common.pixel_format import BGR, frame_nbytes, frame_shape as pixel_frame_shape, from_bgr
+from ivis.common.renditions import render_renditions, rendition_layout, slot_nbytes
 from ivis.common.time_utils import latency_ms, wall_clock_ms, monotonic_ms
 from ivis_health import ServiceState, HealthServer
 
 from ingestion.capture.decoder import Decoder
 from ingestion.capture.frozen import FrozenStreamDetector
-from ingestion.capture.reader import Reader
 from ingestion.capture.reconnect import ReconnectController
-from ingestion.capture.rtsp_client import RTSPClient
+from ingestion.capture.source import open_capture
 from ingestion.config import Config
-from ingestion.errors.fatal import ConfigError, FatalError
+from ingestion.errors.fatal import ConfigError, FatalError, MemoryWriteError
 from ingestion.frame.anchor import Anchor
 from ingestion.frame.id import FrameIdentity
+from ingestion.frame.motion import MotionGate
 from ingestion.frame.normalizer import Normalizer
-from ingestion.frame.roi import apply_mask, build_mask, parse_boxes, parse_polygons
+from ingestion.frame.roi import apply_mask, build_mask, crop_source, expand_mask, parse_boxes, parse_polygons
 from ingestion.frame.selector import Selector
 from ingestion.heartbeat import Heartbeat
 from ingestion.memory.writer import Writer
 from ingestion.metrics.counters import Metrics
+from ingestion.pipeline import DropOldestQueue, StageThread, raise_stage_errors
 from ingestion.recording.buffer import RecordingBuffer
+from ingestion.recording.main_stream import MainStreamRecorder
+from ingestion.recording.spill import SegmentSpill
+from ingestion.recording.video import PacketSegmentBuffer, VideoSegmentBuffer
 from ingestion.runtime import Runtime
 from ingestion.feedback.adaptive import AdaptiveRateController
+from ingestion.feedback.lag_controller import LagBasedRateController
 
+from ingestion.memory.resize import ResizeRequestFile, ring_slot_count
 from ingestion.memory.shm_backend import ShmRingBackend
 
 try:
@@ -66,24 +77,11 @@ def _safe_metric(reason: str, fn) -> None:
     except Exception as exc:
         _record_issue(reason, "Metrics update failed", exc)
 
-def main():
-    logger.info(">>> Ingestion Service: Initializing (Frozen v1.0) <<<")
-    
-    try:
-        conf = Config()
-    except ConfigError as e:
-        logger.error("FATAL: Config Error - %s", getattr(e, 'message', str(e)))
-        sys.exit(1)
-    logger.info("Config summary: %s", conf.summary())
-
+def start_services(state) -> None:
+    """Health endpoint, tracing and the Prometheus endpoint: one set per process."""
     health_host = os.getenv("HEALTH_BIND", "127.0.0.1")
     health_port = int(os.getenv("INGESTION_HEALTH_PORT", "9001"))
-    state = ServiceState("ingestion")
     HealthServer(state, host=health_host, port=health_port).start_in_thread()
-    state.set_check("config_loaded", True, details={"stream_id": conf.stream_id, "camera_id": conf.camera_id})
-
-    runtime = Runtime()
-    metrics = Metrics()
     # initialize tracing (best-effort)
     try:
         ivis_tracing.init_tracer(service_name=os.getenv("OTEL_SERVICE_NAME", "ingestion"))
@@ -96,54 +94,177 @@ def main():
         logger.info("Prometheus metrics HTTP server started on port %s", port)
     except Exception as exc:
         _record_issue("metrics_server_failed", "Failed to start metrics server", exc)
+
+
+def main():
+    logger.info(">>> Ingestion Service: Initializing (Frozen v1.0) <<<")
     
     try:
-        rtsp = RTSPClient(conf.rtsp_url)
-        reader = Reader(rtsp)
-        decoder = Decoder()
+        conf = Config()
+    except ConfigError as e:
+        logger.error("FATAL: Config Error - %s", getattr(e, 'message', str(e)))
+        sys.exit(1)
+    logger.info("Config summary: %s", conf.summary())
+
+    state = ServiceState("ingestion")
+    start_services(state)
+    runtime = Runtime()
+    try:
+        run_stream(conf, state, runtime)
+    except FatalError as e:
+        logger.error("FATAL: Startup Failed - %s", e.message)
+        sys.exit(1)
+    runtime.shutdown()
+    logger.info("Ingestion Service Stopped.")
+    sys.exit(0) # clean exit
+
+
+def run_stream(conf, state, runtime, pub_sockets=None):
+    """
+    Captures, processes and publishes one camera until `runtime` stops or the
+    source fails for good. `state` may be a per-stream view of a shared
+    ServiceState and `pub_sockets` the shared PUB sockets of a multi-camera
+    host. Startup failures raise FatalError.
+    """
+    state.set_check("config_loaded", True, details={"stream_id": conf.stream_id, "camera_id": conf.camera_id})
+    metrics = Metrics(conf.stream_id)
+
+    try:
         selector = Selector(conf.target_fps, mode=conf.selector_mode)
-        normalizer = Normalizer(conf.resolution, frame_color=conf.frame_color)
+        # Grab-skip: the reader consults the selector and only decodes frames it keeps.
+        # The PyAV backend scales to the frame size inside FFmpeg; the normalizer then has nothing to do.
+        rtsp, reader = open_capture(conf, conf.rtsp_url, selector if conf.capture_grab_skip else None, conf.resolution)
+        decoder = Decoder()
+        # PyAV hands over BGR whatever the source colour.
+        # With ROI_MODE=crop only the ROI rectangle is normalized (to its size in frame pixels).
+        out_width, out_height = conf.output_resolution
+        normalizer = Normalizer(conf.output_resolution, frame_color="bgr" if conf.capture_backend == "pyav" else conf.frame_color)
         anchor = Anchor()
 
         roi_boxes = parse_boxes(conf.roi_boxes)
         roi_polygons = parse_polygons(conf.roi_polygons)
         roi_mask = build_mask(conf.frame_width, conf.frame_height, roi_boxes, roi_polygons)
         roi_meta = None
-        if roi_mask is not None:
+        roi_crop = conf.roi_crop
+        if roi_crop is not None:
+            crop_x, crop_y = roi_crop[0], roi_crop[1]
+            roi_mask = roi_mask[crop_y:crop_y + out_height, crop_x:crop_x + out_width]
+            if np.count_nonzero(roi_mask) == roi_mask.size:
+                # A single box fills its own rectangle: nothing left to mask.
+                roi_mask = None
+        motion_gate = None
+        if conf.motion_gate != "off":
+            # Compares the source frames themselves (before normalize, after the ROI crop), within the ROI if any.
+            motion_gate = MotionGate(
+                conf.motion_gate,
+                1000.0 / conf.motion_keepalive_fps if conf.motion_keepalive_fps > 0 else 0.0,
+                conf.motion_hold_sec * 1000.0,
+                conf.motion_pixel_threshold,
+                conf.motion_min_area,
+                conf.motion_hash_bits,
+                roi_mask=roi_mask,
+            )
+            logger.info("Motion gate enabled (mode=%s, keepalive_fps=%s).", conf.motion_gate, conf.motion_keepalive_fps)
+        if roi_boxes or roi_polygons:
             roi_meta = {}
             if roi_boxes:
                 roi_meta["boxes"] = roi_boxes
             if roi_polygons:
                 roi_meta["polygons"] = roi_polygons
-            logger.info("ROI enabled (boxes=%s, polygons=%s).", len(roi_boxes), len(roi_polygons))
+            if roi_crop is not None:
+                # Consumers add (x, y) to ring-frame coordinates to get back to the full frame.
+                roi_meta["crop"] = {
+                    "x": roi_crop[0],
+                    "y": roi_crop[1],
+                    "width": out_width,
+                    "height": out_height,
+                    "full_width": conf.frame_width,
+                    "full_height": conf.frame_height,
+                }
+            logger.info("ROI enabled (mode=%s, boxes=%s, polygons=%s, crop=%s).", conf.roi_mode, len(roi_boxes), len(roi_polygons), roi_crop)
+            # 3-channel mask so the ROI can be applied in place (inside the SHM slot)
+            roi_mask = expand_mask(roi_mask, 3)
         
         # --- Backend Selection (Strict) ---
-        if conf.memory_backend == "shm":
-            slot_size = conf.frame_width * conf.frame_height * 3
-            if conf.shm_cache_seconds and conf.shm_cache_seconds > 0:
-                slot_count = max(1, int(conf.target_fps * conf.shm_cache_seconds))
-            else:
-                slot_count = max(1, conf.shm_buffer_bytes // slot_size)
+        if conf.memory_backend in ("shm", "mmap"):
+            renditions = rendition_layout(
+                out_width,
+                out_height,
+                conf.shm_pixel_format,
+                conf.shm_rendition_model_size,
+                conf.shm_rendition_preview_width,
+            )
+            frame_bytes = frame_nbytes(out_width, out_height, conf.shm_pixel_format)
+            # Renditions follow the frame inside the same slot (one generation covers all).
+            slot_size = slot_nbytes(
+                out_width,
+                out_height,
+                conf.shm_pixel_format,
+                conf.shm_rendition_model_size,
+                conf.shm_rendition_preview_width,
+            )
+            slot_count = ring_slot_count(slot_size, conf.target_fps, conf.shm_cache_seconds, conf.shm_buffer_bytes)
             logger.info(
-                "[Topology] Using Shared Memory Ring (slots=%s, size=%s)",
+                "[Topology] Using Shared Memory Ring (segment=%s, slots=%s, size=%s, format=%s, renditions=%s, policy=%s, arena=%s, multi_writer=%s)",
+                conf.ring_data_name,
                 slot_count,
                 slot_size,
+                conf.shm_pixel_format,
+                [r["name"] for r in renditions],
+                conf.shm_write_policy,
+                conf.shm_arena,
+                conf.shm_multi_writer,
+            )
+            backend_impl = ShmRingBackend(
+                conf.ring_data_name,
+                conf.ring_meta_name,
+                slot_size,
+                slot_count,
+                lease_stall_ms=conf.shm_lease_stall_ms,
+                write_policy=conf.shm_write_policy,
+                block_timeout_ms=conf.shm_block_timeout_ms,
+                arena=conf.shm_arena,
+                prefault=conf.shm_prefault,
+                hugepages=conf.shm_hugepages,
+                hugepage_dir=conf.shm_hugepage_dir,
+                multi_writer=conf.shm_multi_writer,
+                keep_files=conf.mmap_keep_files,
             )
-            backend_impl = ShmRingBackend(conf.shm_name, conf.shm_meta_name, slot_size, slot_count)
             state.set_check(
                 "shm_ready",
                 True,
-                details={"shm_name": conf.shm_name, "shm_meta_name": conf.shm_meta_name, "slot_size": slot_size, "slot_count": slot_count},
+                details={"shm_name": conf.ring_data_name, "shm_meta_name": conf.ring_meta_name, "slot_size": slot_size, "slot_count": slot_count},
             )
+            if conf.shm_directory:
+                try:
+                    backend_impl.publish(
+                        conf.shm_directory,
+                        conf.stream_id,
+                        out_width,
+                        out_height,
+                        3,
+                        pixel_format=conf.shm_pixel_format,
+                    )
+                except Exception as exc:
+                    _record_issue("shm_directory_publish_failed", "SHM directory publish failed", exc)
         else:
             raise FatalError(f"Unsupported MEMORY_BACKEND for Stage 3: {conf.memory_backend}")
 
         writer = Writer(backend_impl)
+        write_in_place = conf.shm_write_in_place and writer.supports_in_place
+        pack_pixels = conf.shm_pixel_format != BGR
+        frame_shape = pixel_frame_shape(out_width, out_height, conf.shm_pixel_format)
+        # With renditions the whole slot is rendered as one flat buffer (in place,
+        # or in a staging buffer that is copied in with a single write).
+        slot_shape = (slot_size,) if renditions else frame_shape
+        staging = None if write_in_place or not renditions else np.empty(slot_size, dtype=np.uint8)
+        if write_in_place:
+            logger.info("[Topology] Rendering frames in place into SHM slots.")
         
         # --- Publisher Selection ---
         if IPC_AVAILABLE:
             logger.info("[Topology] Using Publisher transport: %s", conf.bus_transport)
-            publisher = get_publisher(conf)
+            publisher = get_publisher(conf, pub_sockets)
             state.set_check(
                 "bus_ready",
                 True,
@@ -162,6 +283,21 @@ def main():
             controller.start(conf.zmq_results_sub_endpoint)
             logger.info("Adaptive FPS enabled (results endpoint=%s).", conf.zmq_results_sub_endpoint)
 
+        # Backlog feedback: cap the selector while a live SHM consumer lags by
+        # ADAPTIVE_LAG_THRESHOLD slots or more (cursor accounting in the ring meta).
+        lag_controller = None
+        if conf.adaptive_fps and conf.adaptive_lag_threshold > 0:
+            lag_controller = LagBasedRateController(
+                selector,
+                conf.adaptive_min_fps,
+                conf.adaptive_max_fps,
+                conf.adaptive_lag_threshold,
+                conf.adaptive_lag_hysteresis,
+            )
+        last_consumer_export = 0.0
+        # Online resize: a changed SHM_RESIZE_FILE hands the stream over to a new ring.
+        resize_requests = ResizeRequestFile(conf.shm_resize_file) if conf.shm_resize_file else None
+
         heartbeat = Heartbeat(conf.stream_id, conf.camera_id, conf.health_interval_sec)
 
         reconnect = ReconnectController(
@@ -180,180 +316,411 @@ def main():
 
         record_buffer = None
         record_buffer_drops = 0
+        record_encode_drops = 0
+        main_recorder = None
         if conf.record_buffer_seconds and conf.record_buffer_seconds > 0:
+            # Dual-stream cameras record the main stream; otherwise the frames detection gets are kept.
+            record_fps = conf.record_main_fps if conf.rtsp_main_url else conf.adaptive_max_fps
             max_frames = conf.record_buffer_max_frames
             if max_frames is None:
-                max_frames = max(1, int(conf.record_buffer_seconds * conf.adaptive_max_fps * 1.2))
-            record_buffer = RecordingBuffer(
+                max_frames = max(1, int(conf.record_buffer_seconds * record_fps * 1.2))
+            spill = None
+            if conf.record_format == "remux":
+                record_buffer = PacketSegmentBuffer(
+                    os.path.join(conf.record_video_dir, conf.stream_id),
+                    conf.record_buffer_seconds,
+                    conf.record_segment_sec,
+                )
+            elif conf.record_format != "jpeg":
+                record_buffer = VideoSegmentBuffer(
+                    conf.record_format,
+                    os.path.join(conf.record_video_dir, conf.stream_id),
+                    conf.record_buffer_seconds,
+                    conf.record_segment_sec,
+                    record_fps,
+                    conf.record_jpeg_quality,
+                    workers=conf.record_encode_workers,
+                    queue_size=conf.record_encode_queue,
+                )
+            else:
+                if conf.record_spill_dir:
+                    spill = SegmentSpill(
+                        os.path.join(conf.record_spill_dir, conf.stream_id),
+                        conf.record_spill_seconds,
+                        conf.record_spill_segment_sec,
+                    )
+                record_buffer = RecordingBuffer(
+                    conf.record_buffer_seconds,
+                    max_frames,
+                    conf.record_jpeg_quality,
+                    workers=conf.record_encode_workers,
+                    queue_size=conf.record_encode_queue,
+                    spill=spill,
+                )
+            if conf.rtsp_main_url:
+                main_recorder = MainStreamRecorder(conf, record_buffer, record_fps, runtime.should_continue)
+            elif record_buffer.takes_packets:
+                # Remux the substream: the capture reader hands over every packet before decoding.
+                reader.packet_sink = record_buffer.add_packet
+            logger.info(
+                "Recording buffer enabled (seconds=%s, format=%s, max_frames=%s, source=%s, encode_workers=%s, spill=%s).",
                 conf.record_buffer_seconds,
+                conf.record_format,
                 max_frames,
-                conf.record_jpeg_quality,
+                "main_stream" if main_recorder is not None else "substream",
+                conf.record_encode_workers,
+                spill.directory if spill is not None else None,
             )
-            logger.info("Recording buffer enabled (seconds=%s, max_frames=%s).", conf.record_buffer_seconds, max_frames)
+        elif conf.rtsp_main_url:
+            logger.info("RTSP_MAIN_URL is set but RECORD_BUFFER_SECONDS=0: the main stream is not opened.")
         
         rtsp.connect()
         state.set_check("source_ready", True, details={"rtsp_url": conf.rtsp_url})
         state.compute_ready(["config_loaded", "shm_ready", "bus_ready", "source_ready"])
+        if main_recorder is not None:
+            main_recorder.start()
 
-    except FatalError as e:
-        logger.error("FATAL: Startup Failed - %s", e.message)
-        sys.exit(1)
+    except FatalError:
+        state.set_ready(False)
+        raise
 
     logger.info(f">>> Ingestion Running | Stream: {conf.stream_id} <<<")
+    _safe_metric("metrics_stream_up_failed", lambda: ivis_metrics.ingestion_stream_up.labels(stream=conf.stream_id).set(1))
+
+    # Reads and reconnects never overlap, whichever stage triggers the reconnect.
+    capture_lock = threading.RLock()
 
     def _attempt_reconnect(reason: str) -> bool:
         _record_issue(f"rtsp_{reason}", "RTSP reconnect triggered", None)
         heartbeat.tick(status="degraded", reason=reason)
-        while runtime.should_continue():
-            delay = reconnect.wait()
-            if delay is None:
-                return False
-            logger.warning(
-                "Attempting reconnect in %.2fs (reason=%s, attempt=%s).",
-                delay,
-                reason,
-                reconnect.attempts,
-            )
-            if rtsp.reconnect():
-                reconnect.reset()
-                frozen.reset()
-                logger.info("Source reconnected (reason=%s).", reason)
-                heartbeat.tick(status="ok", reason="reconnected")
-                return True
+        with capture_lock:
+            while runtime.should_continue():
+                delay = reconnect.wait()
+                if delay is None:
+                    return False
+                logger.warning(
+                    "Attempting reconnect in %.2fs (reason=%s, attempt=%s).",
+                    delay,
+                    reason,
+                    reconnect.attempts,
+                )
+                if rtsp.reconnect():
+                    reconnect.reset()
+                    frozen.reset()
+                    logger.info("Source reconnected (reason=%s).", reason)
+                    heartbeat.tick(status="ok", reason="reconnected")
+                    return True
         return False
 
+    def _next_frame():
+        """Capture stage: the next decoded frame the selector keeps, as (packet, raw_frame), or None."""
+        with capture_lock:
+            packet = reader.next_packet()
+            if packet is None and conf.video_loop and rtsp.is_file:
+                logger.warning("Source EOF reached. Rewinding file input.")
+                rtsp.rewind()
+        if packet is None:
+            if conf.video_loop and rtsp.is_file:
+                # avoid tight rewind loop when VideoCapture doesn't
+                # return frames immediately after seeking
+                time.sleep(0.05)
+                return None
+            if rtsp.is_file:
+                raise FatalError("Source EOF or Connection Lost")
+            freeze_reason = frozen.check(monotonic_ms())
+            if freeze_reason:
+                if not _attempt_reconnect(f"frozen_{freeze_reason}"):
+                    raise FatalError("Source reconnect failed")
+            else:
+                time.sleep(0.05)
+            return None
+
+        reconnect.reset()
+
+        if packet.skipped:
+            # Grabbed but never decoded: dropped by the selector inside the reader.
+            metrics.inc_captured(packet.skipped)
+            metrics.inc_dropped_fps(packet.skipped)
+            _safe_metric("metrics_frames_in_failed", lambda: ivis_metrics.frames_in_total.inc(packet.skipped))
+
+        if packet.pts <= 0:
+            metrics.inc_dropped_pts()
+            return None
+
+        try:
+            raw_frame = decoder.decode(packet)
+            # capture span: decoding/capture
+            try:
+                with ivis_tracing.start_span("ingestion.capture", {"stream_id": conf.stream_id}):
+                    pass
+            except Exception as exc:
+                _record_issue("tracing_span_capture_failed", "Tracing span failed (capture)", exc)
+        except Exception as exc:
+            metrics.inc_dropped_corrupt()
+            logger.debug("Decode error: %s", exc)
+            return None
+        if raw_frame is None:
+            metrics.inc_dropped_corrupt()
+            return None
+
+        metrics.inc_captured()
+        _safe_metric("metrics_frames_in_failed", ivis_metrics.frames_in_total.inc)
+
+        if not reader.selects and not selector.allow(packet.pts):
+            metrics.inc_dropped_fps()
+            return None
+        return packet, raw_frame
+
+    def _export_record_buffer():
+        nonlocal record_buffer_drops, record_encode_drops
+        _safe_metric("record_buffer_size_failed", lambda: ivis_metrics.record_buffer_size.set(record_buffer.size()))
+        _safe_metric("record_encode_queue_failed", lambda: ivis_metrics.record_encode_queue_depth.set(record_buffer.queue_depth()))
+        if record_buffer.spill is not None:
+            _safe_metric("record_spill_frames_failed", lambda: ivis_metrics.record_spill_frames.set(record_buffer.spill.frames))
+        if record_buffer.encode_drops > record_encode_drops:
+            _safe_metric(
+                "record_encode_drops_failed",
+                lambda: ivis_metrics.record_encode_drops.inc(record_buffer.encode_drops - record_encode_drops),
+            )
+            record_encode_drops = record_buffer.encode_drops
+        if record_buffer.drops > record_buffer_drops:
+            _safe_metric(
+                "record_buffer_drops_failed",
+                lambda: ivis_metrics.record_buffer_drops.inc(record_buffer.drops - record_buffer_drops),
+            )
+            record_buffer_drops = record_buffer.drops
+
+    def _freeze_check(packet, fingerprint):
+        """Feeds the frozen-stream detector; the freeze reason when a live source needs a reconnect."""
+        frozen.note_frame(packet.pts, packet.timestamp_ms, fingerprint, packet.mono_ms)
+        freeze_reason = frozen.check(packet.mono_ms)
+        return freeze_reason if freeze_reason and not rtsp.is_file else None
+
+    def _reconnect_frozen(freeze_reason):
+        if not _attempt_reconnect(f"frozen_{freeze_reason}"):
+            raise FatalError("Source reconnect failed")
+
+    def _process(packet, raw_frame):
+        """Processing stage: normalize/ROI/render into the ring. Returns (identity, packet, ref) or None."""
+        if roi_crop is not None:
+            raw_frame = crop_source(raw_frame, roi_crop, conf.resolution)
+        if motion_gate is not None and not motion_gate.allow(raw_frame, packet.mono_ms):
+            # Static frame: never rendered, stored or published. No fingerprint either, so
+            # repeat-hash freeze detection only sees the keep-alive frames.
+            metrics.inc_dropped_reason("static")
+            state.inc("frames_static_skipped", 1)
+            _safe_metric("metrics_frames_dropped_failed", lambda: ivis_metrics.frames_dropped_total.labels(reason="static").inc())
+            freeze_reason = _freeze_check(packet, None)
+            if freeze_reason:
+                _reconnect_frozen(freeze_reason)
+            return None
+        # Write-in-place: resize/mask straight into the next ring slot;
+        # the slot is published by writer.commit() below.
+        slot_view = None
+        if write_in_place:
+            try:
+                slot_view = writer.acquire(slot_shape)
+            except MemoryWriteError as exc:
+                _record_issue("shm_acquire_failed", "SHM slot acquire failed; using copy path", exc)
+        # Anything failing between acquire() and the store must hand the slot back
+        # (busy bit), or the writer keeps skipping it and readers never see it.
+        try:
+            if renditions:
+                if slot_view is None:
+                    slot_view = staging if staging is not None else np.empty(slot_size, dtype=np.uint8)
+                frame_view = slot_view[:frame_bytes].reshape(frame_shape)
+            else:
+                frame_view = slot_view
+            # BGR renders straight into the slot; compact formats are packed into it afterwards.
+            render_dst = None if pack_pixels else frame_view
+            clean_frame = normalizer.process(raw_frame, dst=render_dst)
+            if roi_mask is not None:
+                clean_frame = apply_mask(clean_frame, roi_mask, dst=render_dst)
+            shm_frame = from_bgr(clean_frame, conf.shm_pixel_format, dst=frame_view) if pack_pixels else clean_frame
+            if renditions:
+                render_renditions(clean_frame, slot_view, renditions)
+                shm_frame = slot_view
+            # normalization span
+            try:
+                with ivis_tracing.start_span("ingestion.normalize", {"stream_id": conf.stream_id}):
+                    pass
+            except Exception as exc:
+                _record_issue("tracing_span_normalize_failed", "Tracing span failed (normalize)", exc)
+            fingerprint = anchor.generate(clean_frame)
+            freeze_reason = _freeze_check(packet, fingerprint)
+            if freeze_reason:
+                writer.abort()
+                _reconnect_frozen(freeze_reason)
+                return None
+            identity = FrameIdentity(conf.stream_id, packet.pts, fingerprint)
+            if record_buffer is not None and main_recorder is None and not record_buffer.takes_packets:
+                # Queued for the encode workers (or encoded inline); a full queue counts as an encode drop.
+                record_buffer.add_frame(clean_frame, packet.timestamp_ms)
+                _export_record_buffer()
+        except Exception:
+            if writer.has_pending:
+                writer.abort()
+            raise
+        # Write to SHM (commit the in-place slot, or copy the frame in)
+        def _store():
+            if writer.has_pending:
+                return writer.commit(identity, timestamp_ms=packet.timestamp_ms)
+            return writer.write(shm_frame, identity, timestamp_ms=packet.timestamp_ms)
+
+        try:
+            # SHM write span
+            ref = None
+            stored = False
+            try:
+                with ivis_tracing.start_span("ingestion.shm_write", {"frame_id": identity.frame_id, "stream_id": identity.stream_id}):
+                    stored = True
+                    ref = _store()
+            except Exception as exc:
+                if stored and ref is None:
+                    raise
+                _record_issue("tracing_span_shm_write_failed", "Tracing span failed (shm_write)", exc)
+                # fallback to direct write if tracing wrapper failed before the store;
+                # a store that already ran must not publish the frame a second time
+                if not stored:
+                    ref = _store()
+        except Exception:
+            writer.abort()
+            ref = None
+
+        if ref is not None:
+            if renditions:
+                # memory.size stays the primary frame; renditions carry their own offsets.
+                ref.size = frame_bytes
+                ref.renditions = renditions
+            state.inc("frames_written", 1)
+            state.set_meta("last_frame_id", identity.frame_id)
+            state.set_meta("last_shm_write_ts", time.time())
+        return identity, packet, ref
+
+    def _publish(identity, packet, ref):
+        """Publish stage: sends the frame contract and records delivery metrics."""
+        # publish span
+        try:
+            with ivis_tracing.start_span("ingestion.publish", {"frame_id": identity.frame_id, "stream_id": identity.stream_id}):
+                published = publisher.publish(identity, packet.timestamp_ms, packet.mono_ms, ref, roi_meta=roi_meta)
+        except Exception as exc:
+            _record_issue("tracing_span_publish_failed", "Tracing span failed (publish)", exc)
+            # if tracing wrapper fails, attempt publish anyway
+            published = publisher.publish(identity, packet.timestamp_ms, packet.mono_ms, ref, roi_meta=roi_meta)
+        if not published:
+            state.set_check("bus_active", False, reason="publish_failed")
+            # Frame dropped due to backpressure/lag
+            metrics.inc_dropped_reason("lag")
+            _safe_metric("metrics_frames_dropped_failed", lambda: ivis_metrics.frames_dropped_total.labels(reason="lag").inc())
+            _safe_metric("metrics_drops_total_failed", lambda: ivis_metrics.drops_total.labels(reason="lag").inc())
+            logger.debug("Dropped frame due to backpressure/lag (stream length exceeded)")
+        else:
+            state.inc("frames_published", 1)
+            state.set_check("bus_active", True)
+            state.set_meta("last_publish_ts", time.time())
+            metrics.inc_processed()
+            _safe_metric("metrics_frames_out_failed", ivis_metrics.frames_out_total.inc)
+        # end-to-end: best-effort observe latency from capture timestamp to now
+        try:
+            if packet.timestamp_ms:
+                now_ms = wall_clock_ms()
+                end_ms = latency_ms(now_ms, int(packet.timestamp_ms))
+                _safe_metric("metrics_end_to_end_latency_failed", lambda: ivis_metrics.end_to_end_latency_ms.observe(end_ms))
+        except Exception as exc:
+            _record_issue("end_to_end_latency_failed", "End-to-end latency calculation failed", exc)
+
+    def _periodic():
+        nonlocal last_consumer_export
+        # Consumer lag comes from the cursors in the SHM ring meta
+        now_mono = time.monotonic()
+        if now_mono - last_consumer_export >= 1.0:
+            last_consumer_export = now_mono
+            try:
+                consumers = backend_impl.ring.export_consumer_metrics()
+                if lag_controller is not None:
+                    lags = [c["lag_slots"] for c in consumers if c["alive"]]
+                    lag_controller.update(max(lags) if lags else 0)
+            except Exception as exc:
+                _record_issue("shm_consumer_stats_failed", "SHM consumer stats failed", exc)
+            try:
+                request = resize_requests.poll() if resize_requests is not None else None
+                if request:
+                    new_count = ring_slot_count(
+                        slot_size,
+                        conf.target_fps,
+                        request.get("SHM_CACHE_SECONDS", 0 if "SHM_BUFFER_BYTES" in request else conf.shm_cache_seconds),
+                        request.get("SHM_BUFFER_BYTES", conf.shm_buffer_bytes),
+                    )
+                    if new_count != backend_impl.ring.slot_count:
+                        logger.info("SHM online resize: %s -> %s slots", backend_impl.ring.slot_count, new_count)
+                        backend_impl.resize(slot_size, new_count, conf.shm_handover_grace_sec)
+                        state.set_check(
+                            "shm_ready",
+                            True,
+                            details={
+                                "shm_name": backend_impl.ring.data_name,
+                                "shm_meta_name": backend_impl.ring.meta_name,
+                                "slot_size": slot_size,
+                                "slot_count": new_count,
+                            },
+                        )
+                backend_impl.retire_drained()
+            except Exception as exc:
+                _record_issue("shm_resize_failed", "SHM online resize failed", exc)
+            if record_buffer is not None and (main_recorder is not None or record_buffer.takes_packets):
+                # Recorded off the processing loop: export here.
+                _export_record_buffer()
+            if main_recorder is not None:
+                state.set_check("main_stream_ready", main_recorder.connected, details={"frames": main_recorder.frames})
+        _safe_metric("metrics_adaptive_fps_failed", lambda: ivis_metrics.adaptive_fps_current.set(selector.target_fps))
+
+    # Pipelined mode: capture and publish run in their own threads (cv2 releases
+    # the GIL while decoding), joined to this processing loop by drop-oldest queues.
+    stages = []
+    capture_queue = publish_queue = None
+    if conf.ingest_pipeline:
+        capture_queue = DropOldestQueue("capture", conf.ingest_queue_size, conf.stream_id)
+        publish_queue = DropOldestQueue("publish", conf.ingest_queue_size, conf.stream_id)
+
+        def _capture_step():
+            item = _next_frame()
+            if item is not None and not capture_queue.put(item):
+                metrics.inc_dropped_reason("capture_queue")
+
+        def _publish_step():
+            item = publish_queue.get(0.1)
+            if item is not None:
+                _publish(*item)
+
+        stages = [
+            StageThread("ingestion-capture", _capture_step, runtime.should_continue),
+            StageThread("ingestion-publish", _publish_step, runtime.should_continue),
+        ]
+        for stage in stages:
+            stage.start()
+        logger.info("[Topology] Pipelined ingestion (queue size=%s).", conf.ingest_queue_size)
+
     try:
         while runtime.should_continue():
             try:
                 state.touch_loop()
                 heartbeat.tick()
 
-                packet = reader.next_packet()
-
-                if packet is None:
-                    if conf.video_loop and rtsp.is_file:
-                        logger.warning("Source EOF reached. Rewinding file input.")
-                        rtsp.rewind()
-                        # avoid tight rewind loop when VideoCapture doesn't
-                        # return frames immediately after seeking
-                        time.sleep(0.05)
-                        continue
-                    if rtsp.is_file:
-                        raise FatalError("Source EOF or Connection Lost")
-                    freeze_reason = frozen.check(monotonic_ms())
-                    if freeze_reason:
-                        if not _attempt_reconnect(f"frozen_{freeze_reason}"):
-                            raise FatalError("Source reconnect failed")
-                    else:
-                        time.sleep(0.05)
-                    continue
-
-                reconnect.reset()
-
-                if packet.pts <= 0:
-                    metrics.inc_dropped_pts()
-                    continue
-
-                try:
-                    raw_frame = decoder.decode(packet)
-                    # capture span: decoding/capture
-                    try:
-                        with ivis_tracing.start_span("ingestion.capture", {"stream_id": conf.stream_id}):
-                            pass
-                    except Exception as exc:
-                        _record_issue("tracing_span_capture_failed", "Tracing span failed (capture)", exc)
-                except Exception as exc:
-                    metrics.inc_dropped_corrupt()
-                    logger.debug("Decode error: %s", exc)
-                    continue
-                if raw_frame is None:
-                    metrics.inc_dropped_corrupt()
-                    continue
-                
-                metrics.inc_captured()
-                _safe_metric("metrics_frames_in_failed", ivis_metrics.frames_in_total.inc)
-
-                if not selector.allow(packet.pts):
-                    metrics.inc_dropped_fps()
-                    continue
-
-                clean_frame = normalizer.process(raw_frame)
-                if roi_mask is not None:
-                    clean_frame = apply_mask(clean_frame, roi_mask)
-                # normalization span
-                try:
-                    with ivis_tracing.start_span("ingestion.normalize", {"stream_id": conf.stream_id}):
-                        pass
-                except Exception as exc:
-                    _record_issue("tracing_span_normalize_failed", "Tracing span failed (normalize)", exc)
-                fingerprint = anchor.generate(clean_frame)
-                frozen.note_frame(packet.pts, packet.timestamp_ms, fingerprint, packet.mono_ms)
-                freeze_reason = frozen.check(packet.mono_ms)
-                if freeze_reason and not rtsp.is_file:
-                    if not _attempt_reconnect(f"frozen_{freeze_reason}"):
-                        raise FatalError("Source reconnect failed")
-                    continue
-                identity = FrameIdentity(conf.stream_id, packet.pts, fingerprint)
-                if record_buffer is not None:
-                    if record_buffer.add_frame(clean_frame, packet.timestamp_ms):
-                        _safe_metric("record_buffer_size_failed", lambda: ivis_metrics.record_buffer_size.set(record_buffer.size()))
-                        if record_buffer.drops > record_buffer_drops:
-                            _safe_metric(
-                                "record_buffer_drops_failed",
-                                lambda: ivis_metrics.record_buffer_drops.inc(record_buffer.drops - record_buffer_drops),
-                            )
-                            record_buffer_drops = record_buffer.drops
-                # Write to SHM
-                try:
-                    # SHM write span
-                    ref = None
-                    try:
-                        with ivis_tracing.start_span("ingestion.shm_write", {"frame_id": identity.frame_id, "stream_id": identity.stream_id}):
-                            ref = writer.write(clean_frame, identity)
-                    except Exception as exc:
-                        _record_issue("tracing_span_shm_write_failed", "Tracing span failed (shm_write)", exc)
-                        # fallback to direct write if tracing wrapper failed
-                        ref = writer.write(clean_frame, identity)
-                except Exception:
-                    ref = None
-
-                if ref is not None:
-                    state.inc("frames_written", 1)
-                    state.set_meta("last_frame_id", identity.frame_id)
-                    state.set_meta("last_shm_write_ts", time.time())
-
-                # publish span
-                try:
-                    with ivis_tracing.start_span("ingestion.publish", {"frame_id": identity.frame_id, "stream_id": identity.stream_id}):
-                        published = publisher.publish(identity, packet.timestamp_ms, packet.mono_ms, ref, roi_meta=roi_meta)
-                except Exception as exc:
-                    _record_issue("tracing_span_publish_failed", "Tracing span failed (publish)", exc)
-                    # if tracing wrapper fails, attempt publish anyway
-                    published = publisher.publish(identity, packet.timestamp_ms, packet.mono_ms, ref, roi_meta=roi_meta)
-                if not published:
-                    state.set_check("bus_active", False, reason="publish_failed")
-                    # Frame dropped due to backpressure/lag
-                    metrics.inc_dropped_reason("lag")
-                    _safe_metric("metrics_frames_dropped_failed", lambda: ivis_metrics.frames_dropped_total.labels(reason="lag").inc())
-                    _safe_metric("metrics_drops_total_failed", lambda: ivis_metrics.drops_total.labels(reason="lag").inc())
-                    logger.debug("Dropped frame due to backpressure/lag (stream length exceeded)")
+                if stages:
+                    raise_stage_errors(*stages)
+                    item = capture_queue.get(0.1)
+                    if item is not None:
+                        out = _process(*item)
+                        if out is not None and not publish_queue.put(out):
+                            metrics.inc_dropped_reason("publish_queue")
                 else:
-                    state.inc("frames_published", 1)
-                    state.set_check("bus_active", True)
-                    state.set_meta("last_publish_ts", time.time())
-                    metrics.inc_processed()
-                    _safe_metric("metrics_frames_out_failed", ivis_metrics.frames_out_total.inc)
-                # end-to-end: best-effort observe latency from capture timestamp to now
-                try:
-                    if packet.timestamp_ms:
-                        now_ms = wall_clock_ms()
-                        end_ms = latency_ms(now_ms, int(packet.timestamp_ms))
-                        _safe_metric("metrics_end_to_end_latency_failed", lambda: ivis_metrics.end_to_end_latency_ms.observe(end_ms))
-                except Exception as exc:
-                    _record_issue("end_to_end_latency_failed", "End-to-end latency calculation failed", exc)
-                # No external lag source when running without a broker
-                _safe_metric("metrics_adaptive_fps_failed", lambda: ivis_metrics.adaptive_fps_current.set(selector.target_fps))
-        
+                    item = _next_frame()
+                    if item is not None:
+                        out = _process(*item)
+                        if out is not None:
+                            _publish(*out)
+                _periodic()
+
             except FatalError as e:
                 state.set_error("fatal_error", e, context=getattr(e, "context", None))
                 state.set_ready(False)
@@ -365,7 +732,14 @@ def main():
                 break
 
     finally:
-        logger.info("Cleaning up resources...")
+        logger.info("Cleaning up resources... (stream=%s)", conf.stream_id)
+        _safe_metric("metrics_stream_up_failed", lambda: ivis_metrics.ingestion_stream_up.labels(stream=conf.stream_id).set(0))
+        for stage in stages:
+            stage.stop()
+        if main_recorder is not None:
+            main_recorder.stop()
+        if record_buffer is not None:
+            record_buffer.close()
         rtsp.close()
         try:
             if 'publisher' in locals() and hasattr(publisher, 'close'):
@@ -373,10 +747,6 @@ def main():
                 logger.info("Publisher closed.")
         except Exception as e:
             logger.warning("Error closing publisher: %s", e)
-        
-        runtime.shutdown()
-        logger.info("Ingestion Service Stopped.")
-        sys.exit(0) # clean exit
 
 if __name__ == "__main__":
     main()
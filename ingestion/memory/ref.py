@@ -1,11 +1,15 @@
 # FILE: ingestion/memory/ref.py
 # ------------------------------------------------------------------------------
 class MemoryReference:
-    def __init__(self, location, size, backend_type, generation=0):
+    def __init__(self, location, size, backend_type, generation=0, renditions=None, segment=None):
         self.location = location
         self.size = size
         self.backend_type = backend_type
         self.generation = generation
+        # Extra copies stored after the frame in the same slot (ivis.common.renditions)
+        self.renditions = renditions
+        # Data segment holding the slot; changes when the ring is resized online
+        self.segment = segment
 
     def __repr__(self):
         return f"Ref(loc={self.location}, sz={self.size}, gen={self.generation}, type={self.backend_type})"
@@ -0,0 +1,65 @@
+# FILE: ingestion/memory/resize.py
+# ------------------------------------------------------------------------------
+import json
+import logging
+import os
+from typing import Optional
+
+# Keys a resize request may override (same meaning as the env vars)
+RESIZE_KEYS = ("SHM_CACHE_SECONDS", "SHM_BUFFER_BYTES")
+
+
+def ring_slot_count(slot_size: int, target_fps: float, cache_seconds: float, buffer_bytes: int) -> int:
+    """Slot count for a cache of `cache_seconds` at `target_fps`, else for `buffer_bytes`."""
+    if cache_seconds and cache_seconds > 0:
+        return max(1, int(target_fps * cache_seconds))
+    return max(1, int(buffer_bytes) // slot_size)
+
+
+class ResizeRequestFile:
+    """
+    Watches SHM_RESIZE_FILE, a JSON object such as {"SHM_CACHE_SECONDS": 4},
+    for online ring resizes. A file already present at startup is not applied
+    (env config wins on restart); every later modification is.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime = self._stat()
+        self._logger = logging.getLogger("ingestion")
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def poll(self) -> Optional[dict]:
+        """The new request if the file changed since the last poll, else None."""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                payload = json.load(fh)
+        except (OSError, ValueError) as exc:
+            self._logger.warning("Ignoring unreadable SHM resize request %s: %s", self.path, exc)
+            return None
+        if not isinstance(payload, dict):
+            self._logger.warning("Ignoring SHM resize request %s: expected a JSON object", self.path)
+            return None
+        request = {}
+        for key in RESIZE_KEYS:
+            if key not in payload:
+                continue
+            try:
+                value = float(payload[key]) if key == "SHM_CACHE_SECONDS" else int(payload[key])
+            except (TypeError, ValueError):
+                self._logger.warning("Ignoring SHM resize request %s: bad %s", self.path, key)
+                return None
+            if value < 0 or (key == "SHM_BUFFER_BYTES" and value == 0):
+                self._logger.warning("Ignoring SHM resize request %s: bad %s", self.path, key)
+                return None
+            request[key] = value
+        return request or None
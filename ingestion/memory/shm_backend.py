@@ -3,15 +3,32 @@
 import atexit
 import os
 import sys
+import time
 
 from ingestion.memory.ref import MemoryReference
+from memory.shm_directory import ShmDirectory
 from memory.shm_ring import ShmRing
 
 
 class ShmRingBackend:
     name = "shm_ring_v1"
 
-    def __init__(self, shm_name: str, meta_name: str, slot_size: int, slot_count: int):
+    def __init__(
+        self,
+        shm_name: str,
+        meta_name: str,
+        slot_size: int,
+        slot_count: int,
+        lease_stall_ms: float = 0.0,
+        write_policy: str = "overwrite",
+        block_timeout_ms: float = 0.0,
+        arena: bool = False,
+        prefault: bool = False,
+        hugepages: bool = False,
+        hugepage_dir: str = None,
+        multi_writer: bool = False,
+        keep_files: bool = True,
+    ):
         self._owner = os.getenv("SHM_OWNER", "1").lower() in ("1", "true", "yes")
         self.ring = ShmRing(
             shm_name,
@@ -19,12 +36,112 @@ class ShmRingBackend:
             slot_size,
             slot_count,
             create=True,
-            recreate_on_mismatch=True,
+            # A shared ring with other geometry belongs to the other writers: fail instead.
+            recreate_on_mismatch=not multi_writer,
+            lease_stall_ms=lease_stall_ms,
+            write_policy=write_policy,
+            block_timeout_ms=block_timeout_ms,
+            arena=arena,
+            prefault=prefault,
+            hugepages=hugepages,
+            hugepage_dir=hugepage_dir,
+            multi_writer=multi_writer,
         )
+        self._shm_name = shm_name
+        self._meta_name = meta_name
+        self._base_names = (shm_name, meta_name)
+        if self.ring.successor() is not None:
+            # Reattached a ring a crashed run had resized: readers must not follow its stale successor.
+            import logging
+            logging.getLogger("ingestion").warning("Clearing stale successor record of SHM ring %s", shm_name)
+            self.ring.withdraw_successor()
+        # File-backed rings (MEMORY_BACKEND=mmap) are left on disk at close for replay.
+        self._keep_files = keep_files and self.ring.file_backed
+        self._directory = None
+        self._stream_id = None
+        self._publish_args = None
+        # Online resize: superseded rings stay open until their readers migrate.
+        self._handovers = 0
+        self._retiring = []
         atexit.register(self.close)
 
-    def put(self, key, data):
-        slot, gen = self.ring.write(data)
+    def publish(
+        self,
+        directory_name: str,
+        stream_id: str,
+        width: int,
+        height: int,
+        channels: int = 3,
+        dtype: str = "uint8",
+        pixel_format: str = "bgr",
+    ):
+        """Advertises this ring in the host-wide SHM directory under `stream_id`."""
+        self._publish_args = (directory_name, stream_id, width, height, channels, dtype, pixel_format)
+        directory = self._directory if self._directory is not None else ShmDirectory(directory_name, create=True)
+        directory.publish(
+            stream_id,
+            self._shm_name,
+            self._meta_name,
+            width,
+            height,
+            channels,
+            self.ring.slot_size,
+            self.ring.slot_count,
+            dtype=dtype,
+            pixel_format=pixel_format,
+            arena=self.ring.arena,
+        )
+        self._directory = directory
+        self._stream_id = stream_id
+
+    def resize(self, slot_size: int, slot_count: int, grace_sec: float = 30.0):
+        """
+        Online resize: writes continue in a new ring advertised as the successor
+        of the current one (readers follow it without restarting). The old ring
+        is retired by retire_drained() once its consumers have left, or after
+        `grace_sec`.
+        """
+        if self.ring.multi_writer:
+            raise ValueError("Online resize is not supported on a multi-writer ring")
+        self._handovers += 1
+        base_data, base_meta = self._base_names
+        data_name = f"{base_data}_h{self._handovers}"
+        meta_name = f"{base_meta}_h{self._handovers}"
+        successor = self.ring.handover(data_name, meta_name, slot_size, slot_count)
+        self._retiring.append((self.ring, time.monotonic() + max(0.0, grace_sec)))
+        self.ring = successor
+        self._shm_name = data_name
+        self._meta_name = meta_name
+        if self._publish_args is not None:
+            self.publish(*self._publish_args)
+        return successor
+
+    def retire_drained(self) -> int:
+        """
+        Closes (and unlinks, if owner) superseded rings nobody reads anymore.
+        Rings retire oldest first: a reader still on an older ring walks the
+        successor chain through the newer ones. Returns how many remain.
+        """
+        now = time.monotonic()
+        keep = []
+        for ring, deadline in self._retiring:
+            try:
+                drained = ring.live_consumers() == 0
+            except Exception:
+                drained = True
+            if not keep and (drained or now >= deadline):
+                import logging
+                logging.getLogger("ingestion").info(
+                    "Retiring SHM ring %s (%s)", ring.data_name, "drained" if drained else "grace period over"
+                )
+                ring.close_unlink(unlink=self._owner and not self._keep_files)
+            else:
+                keep.append((ring, deadline))
+        self._retiring = keep
+        return len(keep)
+
+    def put(self, key, data, timestamp_ms=None, pts=None):
+        slot, gen = self.ring.write(data, timestamp_ms=timestamp_ms, pts=pts)
         import logging
         logging.getLogger("ingestion").debug("Wrote to SHM: key=%s slot=%s gen=%s bytes=%s", key, slot, gen, len(data))
         return MemoryReference(
@@ -32,10 +149,11 @@ class ShmRingBackend:
             size=len(data),
             backend_type=self.name,
             generation=gen,
+            segment=self.ring.data_name,
         )
 
-    def put_frame(self, key, frame_data):
-        slot, gen = self.ring.write(frame_data)
+    def put_frame(self, key, frame_data, timestamp_ms=None, pts=None):
+        slot, gen = self.ring.write(frame_data, timestamp_ms=timestamp_ms, pts=pts)
         import logging
         logging.getLogger("ingestion").debug(
             "Wrote frame to SHM: key=%s slot=%s gen=%s bytes=%s", key, slot, gen, frame_data.nbytes
@@ -45,11 +163,43 @@ class ShmRingBackend:
             size=frame_data.nbytes,
             backend_type=self.name,
             generation=gen,
+            segment=self.ring.data_name,
+        )
+
+    def acquire_slot(self, shape, dtype="uint8"):
+        """Hands out a writable view of the next ring slot (write-in-place)."""
+        return self.ring.acquire_slot(shape=shape, dtype=dtype)
+
+    def commit(self, key, nbytes=None, timestamp_ms=None, pts=None):
+        slot, gen = self.ring.commit(nbytes, timestamp_ms=timestamp_ms, pts=pts)
+        size = self.ring._get_payload_length(slot)
+        import logging
+        logging.getLogger("ingestion").debug("Committed frame in SHM: key=%s slot=%s gen=%s bytes=%s", key, slot, gen, size)
+        return MemoryReference(
+            location=str(slot),
+            size=size,
+            backend_type=self.name,
+            generation=gen,
+            segment=self.ring.data_name,
         )
 
+    def abort(self):
+        self.ring.abort()
+
     def close(self):
+        if self._directory is not None:
+            try:
+                self._directory.remove(self._stream_id, pid=os.getpid())
+                self._directory.close()
+            except Exception as exc:
+                import logging
+                logging.getLogger("ingestion").warning("Failed to remove SHM directory entry: %s", exc)
+            self._directory = None
+        for ring, _ in self._retiring:
+            ring.close_unlink(unlink=self._owner and not self._keep_files)
+        self._retiring = []
         try:
-            self.ring.close_unlink(unlink=self._owner)
+            self.ring.close_unlink(unlink=self._owner and not self._keep_files)
         except Exception as exc:
             import logging
             logging.getLogger("ingestion").warning("Failed to close SHM ring: %s", exc)
@@ -7,15 +7,17 @@ from ingestion.memory.ref import MemoryReference
 class Writer:
     def __init__(self, storage_backend):
         self.backend = storage_backend
+        self.has_pending = False
     
-    def write(self, frame_data, identity):
+    def write(self, frame_data, identity, timestamp_ms=None):
+        """Stores the frame; `timestamp_ms` and identity.pts go into the backend's time index."""
         try:
             key = identity.frame_id
             if hasattr(self.backend, "put_frame"):
-                ref = self.backend.put_frame(key, frame_data)
+                ref = self.backend.put_frame(key, frame_data, timestamp_ms=timestamp_ms, pts=identity.pts)
             else:
                 data_bytes = frame_data.tobytes()
-                ref = self.backend.put(key, data_bytes)
+                ref = self.backend.put(key, data_bytes, timestamp_ms=timestamp_ms, pts=identity.pts)
             
             if not isinstance(ref, MemoryReference):
                  raise MemoryWriteError(
@@ -26,3 +28,35 @@ class Writer:
         except Exception as e:
             if isinstance(e, MemoryWriteError): raise e
             raise MemoryWriteError(f"Write Exception: {str(e)}", context={"id": identity.frame_id})
+
+    @property
+    def supports_in_place(self):
+        return hasattr(self.backend, "acquire_slot")
+
+    def acquire(self, shape):
+        """Returns a writable view of backend memory to render the next frame into."""
+        try:
+            view = self.backend.acquire_slot(shape)
+            self.has_pending = True
+            return view
+        except Exception as e:
+            raise MemoryWriteError(f"Acquire Exception: {str(e)}", context={"shape": shape})
+
+    def commit(self, identity, timestamp_ms=None):
+        try:
+            self.has_pending = False
+            ref = self.backend.commit(identity.frame_id, timestamp_ms=timestamp_ms, pts=identity.pts)
+            if not isinstance(ref, MemoryReference):
+                 raise MemoryWriteError(
+                     f"Backend violation: Expected MemoryReference, got {type(ref)}",
+                     context={"id": identity.frame_id}
+                 )
+            return ref
+        except Exception as e:
+            if isinstance(e, MemoryWriteError): raise e
+            raise MemoryWriteError(f"Commit Exception: {str(e)}", context={"id": identity.frame_id})
+
+    def abort(self):
+        if self.has_pending:
+            self.has_pending = False
+            self.backend.abort()
@@ -1,24 +1,61 @@
 # ------------------------------------------------------------------------------
 # FILE: ingestion/metrics/counters.py
 # ------------------------------------------------------------------------------
+import logging
+
+import ivis_metrics
+
+logger = logging.getLogger("ingestion")
+
+
 class Metrics:
-    def __init__(self):
+    def __init__(self, stream_id=None):
         self.frames_captured = 0
-        self.dropped_fps = 0       
-        self.dropped_corrupt = 0   
-        self.dropped_pts = 0       
-        self.frames_processed = 0  
+        self.dropped_fps = 0
+        self.dropped_corrupt = 0
+        self.dropped_pts = 0
+        self.frames_processed = 0
         self.write_failures = 0
         # per-reason drops
         self.frames_dropped_by_reason = {}
+        # With a stream id the counts are mirrored into the per-stream Prometheus series
+        self.stream_id = stream_id
+
+    def inc_captured(self, n=1):
+        self.frames_captured += n
+        self._export(lambda: ivis_metrics.ingestion_stream_frames_in_total.labels(stream=self.stream_id).inc(n))
+
+    def inc_dropped_fps(self, n=1):
+        self.dropped_fps += n
+        self._export_drop("fps", n)
+
+    def inc_dropped_corrupt(self):
+        self.dropped_corrupt += 1
+        self._export_drop("corrupt")
+
+    def inc_dropped_pts(self):
+        self.dropped_pts += 1
+        self._export_drop("pts")
+
+    def inc_processed(self):
+        self.frames_processed += 1
+        self._export(lambda: ivis_metrics.ingestion_stream_frames_out_total.labels(stream=self.stream_id).inc())
 
-    def inc_captured(self): self.frames_captured += 1
-    def inc_dropped_fps(self): self.dropped_fps += 1
-    def inc_dropped_corrupt(self): self.dropped_corrupt += 1
-    def inc_dropped_pts(self): self.dropped_pts += 1
-    def inc_processed(self): self.frames_processed += 1
     def inc_write_failure(self): self.write_failures += 1
+
     def inc_dropped_reason(self, reason: str):
         if not isinstance(reason, str) or not reason:
             reason = "unspecified"
         self.frames_dropped_by_reason[reason] = self.frames_dropped_by_reason.get(reason, 0) + 1
+        self._export_drop(reason)
+
+    def _export_drop(self, reason: str, n=1):
+        self._export(lambda: ivis_metrics.ingestion_stream_frames_dropped_total.labels(stream=self.stream_id, reason=reason).inc(n))
+
+    def _export(self, fn):
+        if self.stream_id is None:
+            return
+        try:
+            fn()
+        except Exception as exc:
+            logger.debug("Per-stream metrics update failed: %s", exc)
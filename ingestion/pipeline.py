@@ -0,0 +1,104 @@
+# FILE: ingestion/pipeline.py
+# ------------------------------------------------------------------------------
+import collections
+import logging
+import threading
+from typing import Callable, Optional
+
+import ivis_metrics
+
+logger = logging.getLogger("ingestion")
+
+
+class DropOldestQueue:
+    """
+    Bounded hand-off between pipeline stages. A full queue discards its oldest
+    item, so a slow consumer stage costs frames, never capture cadence.
+    """
+
+    def __init__(self, name: str, maxsize: int, stream_id: str = ""):
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self.drops = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._depth_metric = None
+        self._drops_metric = None
+        try:
+            self._depth_metric = ivis_metrics.ingestion_queue_depth.labels(stream=stream_id, queue=name)
+            self._drops_metric = ivis_metrics.ingestion_queue_drops_total.labels(stream=stream_id, queue=name)
+        except Exception as exc:
+            logger.debug("Queue metrics unavailable for %s: %s", name, exc)
+
+    def put(self, item) -> bool:
+        """Enqueues `item`; False if the oldest queued item had to be dropped for it."""
+        with self._cond:
+            dropped = len(self._items) >= self.maxsize
+            if dropped:
+                self._items.popleft()
+                self.drops += 1
+            self._items.append(item)
+            depth = len(self._items)
+            self._cond.notify()
+        self._observe(depth, dropped)
+        return not dropped
+
+    def get(self, timeout: float):
+        """Oldest item, or None after `timeout` seconds without one."""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            depth = len(self._items)
+        self._observe(depth, False)
+        return item
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def _observe(self, depth: int, dropped: bool) -> None:
+        try:
+            if self._depth_metric is not None:
+                self._depth_metric.set(depth)
+            if dropped and self._drops_metric is not None:
+                self._drops_metric.inc()
+        except Exception as exc:
+            logger.debug("Queue metrics update failed for %s: %s", self.name, exc)
+
+
+class StageThread(threading.Thread):
+    """
+    Runs `step()` in a loop until stopped. An exception ends the stage and is
+    kept in `error` for the owning loop to re-raise (fatal source errors must
+    still stop the service).
+    """
+
+    def __init__(self, name: str, step: Callable[[], None], should_continue: Callable[[], bool]):
+        super().__init__(name=name, daemon=True)
+        self._step = step
+        self._should_continue = should_continue
+        self._stop_event = threading.Event()
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        while not self._stop_event.is_set() and self._should_continue():
+            try:
+                self._step()
+            except BaseException as exc:
+                self.error = exc
+                logger.error("Ingestion stage %s stopped: %s", self.name, exc)
+                return
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+
+def raise_stage_errors(*stages: StageThread) -> None:
+    for stage in stages:
+        if stage is not None and stage.error is not None:
+            raise stage.error
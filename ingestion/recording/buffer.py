@@ -1,40 +1,159 @@
 # FILE: ingestion/recording/buffer.py
 # ------------------------------------------------------------------------------
+import logging
+import queue
+import threading
 from collections import deque
 
 import cv2
+import numpy as np
+
+from ingestion.recording.spill import SegmentSpill
+
+logger = logging.getLogger("ingestion")
 
 
 class RecordingBuffer:
-    def __init__(self, max_seconds: float, max_frames: int, jpeg_quality: int = 85):
+    """
+    The last `max_seconds` / `max_frames` of recorded frames as JPEGs, for clip
+    export. With `workers` > 0, add_frame() only copies the frame into a
+    bounded queue of `queue_size` and a pool of threads encodes it (a full
+    queue drops the frame: `encode_drops`). With a `spill` segment ring,
+    frames leaving memory go to disk instead of being discarded, and
+    get_clip_frames() serves the disk window too.
+    """
+
+    # Encoded-video buffers (ingestion.recording.video) may record source packets instead of frames.
+    takes_packets = False
+
+    def __init__(
+        self,
+        max_seconds: float,
+        max_frames: int,
+        jpeg_quality: int = 85,
+        workers: int = 0,
+        queue_size: int = 8,
+        spill: SegmentSpill = None,
+    ):
         self.max_seconds = max(0.0, float(max_seconds))
         self.max_frames = max(1, int(max_frames))
         self.jpeg_quality = max(1, min(100, int(jpeg_quality)))
-        self._frames = deque(maxlen=self.max_frames)
+        self._frames = deque()
         self.drops = 0
+        self.encode_drops = 0
+        self.spill = spill
+        # Filled by the ingestion loop, encode workers or a main-stream recorder thread, read by clip export
+        self._lock = threading.Lock()
+        self._queue = None
+        self._workers = []
+        if workers > 0:
+            self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+            for i in range(int(workers)):
+                worker = threading.Thread(target=self._encode_loop, name=f"ingestion-record-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _evict(self, frame) -> None:
+        if self.spill is None:
+            self.drops += 1
+            return
+        try:
+            self.spill.append(*frame)
+        except OSError as exc:
+            self.drops += 1
+            logger.debug("Recording spill write failed: %s", exc)
 
     def _prune_by_time(self, now_ms: int) -> None:
         if self.max_seconds <= 0:
             return
         cutoff = now_ms - int(self.max_seconds * 1000.0)
         while self._frames and self._frames[0][0] < cutoff:
-            self._frames.popleft()
+            frame = self._frames.popleft()
+            if self.spill is not None:
+                self._evict(frame)
 
-    def add_frame(self, frame_bgr, timestamp_ms: int) -> bool:
+    def _encode(self, frame_bgr):
         params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
         ok, jpeg = cv2.imencode(".jpg", frame_bgr, params)
-        if not ok:
+        return jpeg.tobytes() if ok else None
+
+    def _append(self, timestamp_ms: int, payload: bytes) -> None:
+        with self._lock:
+            if len(self._frames) >= self.max_frames:
+                self._evict(self._frames.popleft())
+            # Parallel encoders may finish out of order; keep the buffer sorted by time.
+            index = len(self._frames)
+            while index and self._frames[index - 1][0] > timestamp_ms:
+                index -= 1
+            self._frames.insert(index, (timestamp_ms, payload))
+            self._prune_by_time(self._frames[-1][0])
+
+    def _encode_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                timestamp_ms, frame_bgr = item
+                payload = self._encode(frame_bgr)
+                if payload is not None:
+                    self._append(timestamp_ms, payload)
+            except Exception as exc:
+                logger.debug("Recording encode failed: %s", exc)
+            finally:
+                self._queue.task_done()
+
+    def add_frame(self, frame_bgr, timestamp_ms: int) -> bool:
+        """Encodes (or queues) one frame. False when it failed or the encode queue was full."""
+        if self._queue is None:
+            payload = self._encode(frame_bgr)
+            if payload is None:
+                return False
+            self._append(int(timestamp_ms), payload)
+            return True
+        try:
+            # The caller's frame may be a ring slot that is about to be reused.
+            self._queue.put_nowait((int(timestamp_ms), np.array(frame_bgr, copy=True)))
+        except queue.Full:
+            self.encode_drops += 1
             return False
-        if len(self._frames) == self._frames.maxlen:
-            self.drops += 1
-        self._frames.append((int(timestamp_ms), jpeg.tobytes()))
-        self._prune_by_time(int(timestamp_ms))
         return True
 
-    def get_clip_frames(self, start_ms: int, end_ms: int):
+    def iter_clip_frames(self, start_ms: int, end_ms: int):
+        """JPEG payloads with start_ms <= timestamp <= end_ms, oldest first: spilled ones are read lazily."""
         start = int(start_ms)
         end = int(end_ms)
-        return [payload for ts, payload in self._frames if start <= ts <= end]
+        with self._lock:
+            memory = [(ts, payload) for ts, payload in self._frames if start <= ts <= end]
+        if self.spill is not None:
+            # Disk holds what left memory; stop where memory takes over.
+            disk_end = min(end, memory[0][0] - 1) if memory else end
+            yield from self.spill.iter_frames(start, disk_end)
+        for _, payload in memory:
+            yield payload
+
+    def get_clip_frames(self, start_ms: int, end_ms: int):
+        return list(self.iter_clip_frames(start_ms, end_ms))
 
     def size(self) -> int:
         return len(self._frames)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def flush(self) -> None:
+        """Waits until every queued frame is encoded."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Encodes what is queued, stops the workers and closes the spill segment."""
+        if self._queue is not None:
+            for _ in self._workers:
+                self._queue.put(None)
+            for worker in self._workers:
+                worker.join(2.0)
+            self._queue = None
+            self._workers = []
+        if self.spill is not None:
+            self.spill.close()
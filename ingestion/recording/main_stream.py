@@ -0,0 +1,100 @@
+# FILE: ingestion/recording/main_stream.py
+# ------------------------------------------------------------------------------
+import logging
+import threading
+import time
+
+from ivis.common.time_utils import wall_clock_ms
+from ingestion.capture.reconnect import ReconnectController
+from ingestion.capture.source import open_capture
+from ingestion.errors.fatal import FatalError
+from ingestion.frame.selector import Selector
+
+logger = logging.getLogger("ingestion")
+
+
+class MainStreamRecorder(threading.Thread):
+    """
+    Dual-stream cameras: detection runs on the substream (RTSP_URL) while this
+    thread decodes the main stream (RTSP_MAIN_URL) at `fps` into the recording
+    buffer, at full resolution. Both streams are stamped with the same wall
+    clock, so clips line up with the substream's frame contracts. A buffer
+    that takes packets (RECORD_FORMAT=remux) gets the demuxed packets and
+    nothing is decoded.
+    """
+
+    def __init__(self, conf, buffer, fps: float, should_continue):
+        super().__init__(name=f"ingestion-main-{conf.stream_id}", daemon=True)
+        self.buffer = buffer
+        self.loop = conf.video_loop
+        self.remux = getattr(buffer, "takes_packets", False)
+        self._should_continue = should_continue
+        self._stop_event = threading.Event()
+        # Only the frames kept for recording are decoded (grab-skip / keyframe rules apply).
+        self.client, self.reader = open_capture(conf, conf.rtsp_main_url, Selector(fps, mode=conf.selector_mode))
+        self.reconnect = ReconnectController(
+            conf.rtsp_reconnect_min_sec,
+            conf.rtsp_reconnect_max_sec,
+            conf.rtsp_reconnect_factor,
+            conf.rtsp_reconnect_jitter,
+            conf.rtsp_max_retries,
+        )
+        self.connected = False
+        self.frames = 0
+
+    def _running(self) -> bool:
+        return not self._stop_event.is_set() and self._should_continue()
+
+    def _connect(self) -> bool:
+        while self._running():
+            try:
+                if self.connected:
+                    self.connected = self.client.reconnect()
+                else:
+                    self.client.connect()
+                    self.connected = True
+            except FatalError as exc:
+                logger.warning("Main stream unavailable: %s", getattr(exc, "message", str(exc)))
+            if self.connected:
+                self.reconnect.reset()
+                return True
+            if self.reconnect.wait() is None:
+                return False
+        return False
+
+    def _record_next(self):
+        """Records the next frame (or source packet); None at the end of the stream."""
+        if self.remux:
+            packet = self.client.read_packet()
+            if packet is None:
+                return None
+            if self.buffer.add_packet(packet, wall_clock_ms()):
+                self.frames += 1
+            return True
+        packet = self.reader.next_packet()
+        if packet is None:
+            return None
+        if packet.payload is not None and packet.payload.size and self.buffer.add_frame(packet.payload, packet.timestamp_ms):
+            self.frames += 1
+        return True
+
+    def run(self) -> None:
+        if not self._connect():
+            logger.error("Main stream recording stopped: source unavailable.")
+            return
+        while self._running():
+            if self._record_next() is None:
+                if self.client.is_file and self.loop:
+                    self.client.rewind()
+                    time.sleep(0.05)
+                    continue
+                if self.client.is_file or not self._connect():
+                    logger.error("Main stream recording stopped: source ended.")
+                    break
+        self.connected = False
+        self.client.close()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
@@ -0,0 +1,111 @@
+# FILE: ingestion/recording/spill.py
+# ------------------------------------------------------------------------------
+import bisect
+import logging
+import os
+import threading
+
+logger = logging.getLogger("ingestion")
+
+SEGMENT_SUFFIX = ".mjpg"
+
+
+class _Segment:
+    __slots__ = ("path", "timestamps", "offsets", "lengths", "size")
+
+    def __init__(self, path):
+        self.path = path
+        self.timestamps = []
+        self.offsets = []
+        self.lengths = []
+        self.size = 0
+
+
+class SegmentSpill:
+    """
+    On-disk segment ring for recording frames that left the in-memory buffer.
+    JPEGs are appended back to back to segment files of `segment_seconds`
+    each; a per-segment time index (timestamp, offset, length) kept in memory
+    locates them. Segments older than `max_seconds` behind the newest frame
+    are deleted. Stale segments of an earlier run are removed on start, since
+    their index is gone.
+    """
+
+    def __init__(self, directory: str, max_seconds: float, segment_seconds: float = 10.0):
+        self.directory = directory
+        self.max_ms = int(max(0.0, float(max_seconds)) * 1000.0)
+        self.segment_ms = max(1, int(float(segment_seconds) * 1000.0))
+        self._segments = []
+        self._fh = None
+        self._lock = threading.Lock()
+        self.frames = 0
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(SEGMENT_SUFFIX):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError as exc:
+                    logger.debug("Could not remove stale recording segment %s: %s", name, exc)
+
+    def _roll(self, timestamp_ms: int) -> _Segment:
+        if self._fh is not None:
+            self._fh.close()
+        segment = _Segment(os.path.join(self.directory, f"seg_{timestamp_ms}{SEGMENT_SUFFIX}"))
+        self._fh = open(segment.path, "wb")
+        self._segments.append(segment)
+        return segment
+
+    def _expire(self, newest_ms: int) -> None:
+        # The open segment is never expired.
+        while len(self._segments) > 1 and self._segments[0].timestamps[-1] < newest_ms - self.max_ms:
+            segment = self._segments.pop(0)
+            self.frames -= len(segment.timestamps)
+            try:
+                os.remove(segment.path)
+            except OSError as exc:
+                logger.debug("Could not remove recording segment %s: %s", segment.path, exc)
+
+    def append(self, timestamp_ms: int, payload: bytes) -> None:
+        with self._lock:
+            segment = self._segments[-1] if self._segments else None
+            if segment is None or not segment.timestamps or timestamp_ms - segment.timestamps[0] >= self.segment_ms:
+                segment = self._roll(timestamp_ms)
+            self._fh.write(payload)
+            # Readers open the file themselves; they only see indexed frames, so flush first.
+            self._fh.flush()
+            segment.timestamps.append(int(timestamp_ms))
+            segment.offsets.append(segment.size)
+            segment.lengths.append(len(payload))
+            segment.size += len(payload)
+            self.frames += 1
+            self._expire(int(timestamp_ms))
+
+    def iter_frames(self, start_ms: int, end_ms: int):
+        """JPEG payloads with start_ms <= timestamp <= end_ms, oldest first, read from disk one by one."""
+        with self._lock:
+            spans = []
+            for segment in self._segments:
+                if not segment.timestamps or segment.timestamps[-1] < start_ms or segment.timestamps[0] > end_ms:
+                    continue
+                lo = bisect.bisect_left(segment.timestamps, start_ms)
+                hi = bisect.bisect_right(segment.timestamps, end_ms)
+                spans.append((segment.path, list(zip(segment.offsets[lo:hi], segment.lengths[lo:hi]))))
+        for path, entries in spans:
+            try:
+                with open(path, "rb") as fh:
+                    for offset, length in entries:
+                        fh.seek(offset)
+                        yield fh.read(length)
+            except OSError as exc:
+                # Expired while reading: the clip just starts later.
+                logger.debug("Recording segment %s unavailable: %s", path, exc)
+
+    def oldest_ms(self):
+        with self._lock:
+            return self._segments[0].timestamps[0] if self._segments and self._segments[0].timestamps else None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
@@ -0,0 +1,367 @@
+# FILE: ingestion/recording/video.py
+# ------------------------------------------------------------------------------
+import json
+import logging
+import os
+import queue
+import threading
+from fractions import Fraction
+
+import cv2
+import numpy as np
+
+from ingestion.errors.fatal import FatalError
+
+try:
+    import av
+except ImportError:  # optional: RECORD_FORMAT=h264/remux need PyAV
+    av = None
+
+logger = logging.getLogger("ingestion")
+
+INDEX_FILE = "index.json"
+# Container per format: MJPEG in AVI (OpenCV), H.264 in MP4 (PyAV), source packets in Matroska
+# (remux keeps whatever codec the camera sends; MKV takes any of them and stays readable if cut short).
+SEGMENT_EXTENSIONS = {"mjpeg": ".avi", "h264": ".mp4", "remux": ".mkv"}
+
+
+class SegmentIndex:
+    """
+    Closed recording segments of one stream, oldest first, mirrored to
+    `<directory>/index.json` ({file, start_ms, end_ms, frames, format}) so a
+    clip exporter can pick files by time. Segments ending more than
+    `max_seconds` before the newest one are deleted. Entries of an earlier run
+    are kept while their files exist and they are within the window.
+    """
+
+    def __init__(self, directory: str, max_seconds: float):
+        self.directory = directory
+        self.max_ms = int(max(0.0, float(max_seconds)) * 1000.0)
+        self.path = os.path.join(directory, INDEX_FILE)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.entries = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                loaded = json.load(fh)
+            self.entries = [e for e in loaded if os.path.isfile(os.path.join(directory, e["file"]))]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.entries = []
+
+    def _write(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.entries, fh)
+        os.replace(tmp, self.path)
+
+    def add(self, entry: dict) -> None:
+        with self._lock:
+            self.entries.append(entry)
+            cutoff = entry["end_ms"] - self.max_ms
+            while self.entries and self.entries[0]["end_ms"] < cutoff:
+                expired = self.entries.pop(0)
+                try:
+                    os.remove(os.path.join(self.directory, expired["file"]))
+                except OSError as exc:
+                    logger.debug("Could not remove recording segment %s: %s", expired["file"], exc)
+            try:
+                self._write()
+            except OSError as exc:
+                logger.warning("Recording index write failed: %s", exc)
+
+    def query(self, start_ms: int, end_ms: int) -> list:
+        with self._lock:
+            return [
+                dict(e, path=os.path.join(self.directory, e["file"]))
+                for e in self.entries
+                if e["end_ms"] >= start_ms and e["start_ms"] <= end_ms
+            ]
+
+    def frames(self) -> int:
+        with self._lock:
+            return sum(e["frames"] for e in self.entries)
+
+
+class _Segment:
+    """One open output file: its index entry and the writer behind it."""
+
+    def __init__(self, fmt: str, directory: str, start_ms: int):
+        self.file = f"seg_{start_ms}{SEGMENT_EXTENSIONS[fmt]}"
+        self.path = os.path.join(directory, self.file)
+        self.format = fmt
+        self.start_ms = start_ms
+        self.end_ms = start_ms
+        self.frames = 0
+
+    def entry(self) -> dict:
+        return {"file": self.file, "start_ms": self.start_ms, "end_ms": self.end_ms, "frames": self.frames, "format": self.format}
+
+
+class VideoSegmentBuffer:
+    """
+    Recording as short encoded-video segments instead of per-frame JPEGs:
+    "mjpeg" (MJPEG in AVI through OpenCV) or "h264" (libx264 in MP4 through
+    PyAV). Every segment gets a fresh encoder, so it starts on a keyframe and
+    plays on its own; segments roll every `segment_seconds`. Like
+    RecordingBuffer, add_frame() only queues a copy for the encoder thread
+    (`queue_size`; a full queue counts as `encode_drops`); workers=0 encodes
+    inline.
+    """
+
+    takes_packets = False
+
+    def __init__(
+        self,
+        fmt: str,
+        directory: str,
+        max_seconds: float,
+        segment_seconds: float,
+        fps: float,
+        quality: int = 85,
+        workers: int = 1,
+        queue_size: int = 8,
+    ):
+        if fmt not in ("mjpeg", "h264"):
+            raise ValueError(f"Unknown recording format: {fmt}")
+        if fmt == "h264" and av is None:
+            raise FatalError("RECORD_FORMAT=h264 needs PyAV (pip install av)")
+        self.format = fmt
+        self.index = SegmentIndex(directory, max_seconds)
+        self.segment_ms = max(1, int(float(segment_seconds) * 1000.0))
+        self.fps = max(1.0, float(fps))
+        self.quality = max(1, min(100, int(quality)))
+        self.drops = 0
+        self.encode_drops = 0
+        self.spill = None
+        self._segment = None
+        self._writer = None
+        self._stream = None
+        self._size = None
+        self._last_pts = 0
+        self._queue = None
+        self._thread = None
+        if workers > 0:
+            self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+            self._thread = threading.Thread(target=self._encode_loop, name="ingestion-record-video", daemon=True)
+            self._thread.start()
+
+    def _open(self, frame_bgr, timestamp_ms: int) -> None:
+        self._segment = _Segment(self.format, self.index.directory, timestamp_ms)
+        height, width = frame_bgr.shape[:2]
+        self._size = (width, height)
+        if self.format == "mjpeg":
+            self._writer = cv2.VideoWriter(self._segment.path, cv2.VideoWriter_fourcc(*"MJPG"), self.fps, self._size)
+            if not self._writer.isOpened():
+                raise OSError(f"cannot open {self._segment.path}")
+            self._writer.set(cv2.VIDEOWRITER_PROP_QUALITY, self.quality)
+            return
+        self._writer = av.open(self._segment.path, "w")
+        self._stream = self._writer.add_stream("libx264", rate=int(round(self.fps)))
+        self._stream.width = width
+        self._stream.height = height
+        self._stream.pix_fmt = "yuv420p"
+        # Millisecond timestamps keep the real (variable) frame timing.
+        self._stream.codec_context.time_base = Fraction(1, 1000)
+        self._stream.time_base = Fraction(1, 1000)
+        # One keyframe per segment; quality maps 100..1 onto CRF 18..40.
+        self._stream.codec_context.gop_size = int(self.fps * self.segment_ms / 1000.0) + 1
+        self._stream.options = {"preset": "veryfast", "crf": str(18 + (100 - self.quality) * 22 // 99)}
+
+    def _close_segment(self) -> None:
+        if self._segment is None:
+            return
+        segment, writer = self._segment, self._writer
+        self._segment = self._writer = None
+        try:
+            if self.format == "mjpeg":
+                writer.release()
+            else:
+                for packet in self._stream.encode(None):
+                    writer.mux(packet)
+                writer.close()
+        except Exception as exc:
+            logger.warning("Recording segment %s did not close cleanly: %s", segment.file, exc)
+        self._stream = None
+        if segment.frames:
+            self.index.add(segment.entry())
+
+    def _write(self, frame_bgr, timestamp_ms: int) -> None:
+        size = (frame_bgr.shape[1], frame_bgr.shape[0])
+        segment = self._segment
+        if segment is not None and (timestamp_ms - segment.start_ms >= self.segment_ms or size != self._size):
+            self._close_segment()
+        if self._segment is None:
+            self._open(frame_bgr, timestamp_ms)
+        segment = self._segment
+        if self.format == "mjpeg":
+            self._writer.write(frame_bgr)
+        else:
+            frame = av.VideoFrame.from_ndarray(frame_bgr, format="bgr24")
+            pts = timestamp_ms - segment.start_ms
+            if segment.frames and pts <= self._last_pts:
+                # Strictly increasing pts: two frames in the same millisecond still both play.
+                pts = self._last_pts + 1
+            frame.pts = self._last_pts = pts
+            for packet in self._stream.encode(frame):
+                self._writer.mux(packet)
+        segment.end_ms = max(segment.end_ms, timestamp_ms)
+        segment.frames += 1
+
+    def _encode_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as exc:
+                self.drops += 1
+                logger.debug("Recording video encode failed: %s", exc)
+            finally:
+                self._queue.task_done()
+
+    def add_frame(self, frame_bgr, timestamp_ms: int) -> bool:
+        """Encodes (or queues) one frame. False when it failed or the encode queue was full."""
+        if self._queue is None:
+            try:
+                self._write(frame_bgr, int(timestamp_ms))
+            except Exception as exc:
+                self.drops += 1
+                logger.debug("Recording video encode failed: %s", exc)
+                return False
+            return True
+        try:
+            self._queue.put_nowait((np.array(frame_bgr, copy=True), int(timestamp_ms)))
+        except queue.Full:
+            self.encode_drops += 1
+            return False
+        return True
+
+    def get_clip_segments(self, start_ms: int, end_ms: int) -> list:
+        """Index entries (with `path`) of the closed segments overlapping [start_ms, end_ms]."""
+        return self.index.query(int(start_ms), int(end_ms))
+
+    def size(self) -> int:
+        return self.index.frames() + (self._segment.frames if self._segment is not None else 0)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def flush(self) -> None:
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Encodes what is queued and closes the open segment."""
+        if self._queue is not None:
+            self._queue.put(None)
+            self._thread.join(5.0)
+            self._queue = None
+        self._close_segment()
+
+
+class PacketSegmentBuffer:
+    """
+    RECORD_FORMAT=remux with the PyAV capture backend: the source's compressed
+    packets are copied into Matroska segments as they are demuxed, with no
+    decode or encode at all. A segment is cut at the first keyframe after
+    `segment_seconds`, so each one starts on a keyframe; packets before the
+    first keyframe (and after a reconnect, until the next one) are skipped.
+    """
+
+    takes_packets = True
+
+    def __init__(self, directory: str, max_seconds: float, segment_seconds: float):
+        if av is None:
+            raise FatalError("RECORD_FORMAT=remux needs PyAV (pip install av)")
+        self.format = "remux"
+        self.index = SegmentIndex(directory, max_seconds)
+        self.segment_ms = max(1, int(float(segment_seconds) * 1000.0))
+        self.drops = 0
+        self.encode_drops = 0
+        self.spill = None
+        self._segment = None
+        self._container = None
+        self._stream = None
+        self._source = None
+        self._first_dts = None
+        self._last_dts = None
+        self._lock = threading.Lock()
+
+    def _open(self, packet, timestamp_ms: int) -> None:
+        self._segment = _Segment(self.format, self.index.directory, timestamp_ms)
+        self._container = av.open(self._segment.path, "w")
+        self._source = packet.stream
+        add = getattr(self._container, "add_stream_from_template", None)
+        self._stream = add(self._source) if add is not None else self._container.add_stream(template=self._source)
+        self._first_dts = None
+        self._last_dts = packet.dts
+
+    def _close_segment(self) -> None:
+        if self._segment is None:
+            return
+        segment, container = self._segment, self._container
+        self._segment = self._container = self._stream = None
+        try:
+            container.close()
+        except Exception as exc:
+            logger.warning("Recording segment %s did not close cleanly: %s", segment.file, exc)
+        if segment.frames:
+            self.index.add(segment.entry())
+
+    def add_packet(self, packet, timestamp_ms: int) -> bool:
+        """Muxes one demuxed source packet; False for packets that cannot start or join a segment."""
+        if not packet.size or packet.dts is None:
+            return False
+        timestamp_ms = int(timestamp_ms)
+        with self._lock:
+            segment = self._segment
+            if segment is not None and (packet.stream is not self._source or packet.dts < self._last_dts):
+                # Reconnected or rewound: the old timestamps do not continue; wait for a keyframe.
+                self._close_segment()
+                segment = None
+            if packet.is_keyframe and (segment is None or timestamp_ms - segment.start_ms >= self.segment_ms):
+                self._close_segment()
+                self._open(packet, timestamp_ms)
+                segment = self._segment
+            if segment is None:
+                return False
+            try:
+                # A copy: the source packet may still go to the decoder, and muxing rewrites timestamps.
+                out = av.Packet(bytes(packet))
+                if self._first_dts is None:
+                    self._first_dts = packet.dts
+                # Segments start at timestamp 0.
+                out.dts = packet.dts - self._first_dts
+                out.pts = packet.pts - self._first_dts if packet.pts is not None else None
+                out.time_base = packet.time_base
+                out.is_keyframe = packet.is_keyframe
+                out.stream = self._stream
+                self._container.mux(out)
+                self._last_dts = packet.dts
+            except Exception as exc:
+                self.drops += 1
+                logger.debug("Recording remux failed: %s", exc)
+                return False
+            segment.end_ms = max(segment.end_ms, timestamp_ms)
+            segment.frames += 1
+            return True
+
+    def add_frame(self, frame_bgr, timestamp_ms: int) -> bool:
+        # Decoded frames are never recorded in remux mode.
+        return False
+
+    def get_clip_segments(self, start_ms: int, end_ms: int) -> list:
+        """Index entries (with `path`) of the closed segments overlapping [start_ms, end_ms]."""
+        return self.index.query(int(start_ms), int(end_ms))
+
+    def size(self) -> int:
+        with self._lock:
+            return self.index.frames() + (self._segment.frames if self._segment is not None else 0)
+
+    def queue_depth(self) -> int:
+        return 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_segment()
@@ -5,6 +5,8 @@ Provides a strict, fail-fast validator used by Detection and UI.
 import warnings
 from typing import Any, Dict
 
+from ivis.common.pixel_format import PIXEL_FORMATS, YUV420_FORMATS, frame_nbytes
+
 
 class ContractValidationError(Exception):
     """Raised when a contract fails validation.
@@ -62,6 +64,18 @@ def validate_frame_contract_v1(contract: Dict[str, Any]) -> None:
         raise ContractValidationError("bad_memory_size", "memory.size must be a non-negative int")
     if not isinstance(mem.get("generation"), int):
         raise ContractValidationError("bad_memory_generation", "memory.generation must be an int")
+    renditions = mem.get("renditions")
+    if renditions is not None:
+        if not isinstance(renditions, list):
+            raise ContractValidationError("bad_memory_renditions", "memory.renditions must be a list")
+        for entry in renditions:
+            if not isinstance(entry, dict) or not isinstance(entry.get("name"), str):
+                raise ContractValidationError("bad_memory_renditions", "memory.renditions entries need a name")
+            for field in ("offset", "size", "width", "height"):
+                if not isinstance(entry.get(field), int) or entry.get(field) < 0:
+                    raise ContractValidationError("bad_memory_renditions", f"memory.renditions[].{field} must be a non-negative int")
+            if entry["size"] != entry["width"] * entry["height"] * 3:
+                raise ContractValidationError("bad_memory_renditions", f"rendition {entry['name']} size does not match its geometry")
 
     # Basic metadata
     width = contract.get("frame_width")
@@ -91,11 +105,14 @@ def validate_frame_contract_v1(contract: Dict[str, Any]) -> None:
 
     if not isinstance(color, str) or not color:
         raise ContractValidationError("bad_color_space", "frame_color_space must be a non-empty string")
-    if color.lower() != "bgr":
-        raise ContractValidationError("unsupported_color_space", f"only bgr supported in v1; got {color}")
+    color = color.lower()
+    if color not in PIXEL_FORMATS:
+        raise ContractValidationError("unsupported_color_space", f"only {'/'.join(PIXEL_FORMATS)} supported in v1; got {color}")
+    if color in YUV420_FORMATS and (width % 2 or height % 2):
+        raise ContractValidationError("bad_dimensions", f"{color} needs even width/height; got {width}x{height}")
 
     # Verify memory size matches expected frame layout for uint8
-    expected = width * height * channels
+    expected = frame_nbytes(width, height, color)
     if mem.get("size") != expected:
         raise ContractValidationError("memory_size_mismatch", f"memory.size {mem.get('size')} != expected {expected}")
 
@@ -0,0 +1,68 @@
+# FILE: ivis/common/pixel_format.py
+# ------------------------------------------------------------------------------
+"""Pixel layouts a frame can have in the SHM ring (frame_color_space)."""
+from typing import Optional, Tuple
+
+import numpy as np
+
+BGR = "bgr"
+NV12 = "nv12"
+I420 = "i420"
+PIXEL_FORMATS = (BGR, NV12, I420)
+# 4:2:0 layouts: full-size Y plane followed by quarter-size chroma (1.5 bytes/pixel)
+YUV420_FORMATS = (NV12, I420)
+
+
+def normalize_pixel_format(value: Optional[str]) -> str:
+    fmt = (value or BGR).strip().lower()
+    if fmt not in PIXEL_FORMATS:
+        raise ValueError(f"Unsupported pixel format: {value}")
+    return fmt
+
+
+def frame_shape(width: int, height: int, pixel_format: str = BGR) -> Tuple[int, ...]:
+    """numpy shape of one uint8 frame as stored in the ring."""
+    if pixel_format in YUV420_FORMATS:
+        return (height * 3 // 2, width)
+    return (height, width, 3)
+
+
+def frame_nbytes(width: int, height: int, pixel_format: str = BGR, bytes_per_sample: int = 1) -> int:
+    if pixel_format in YUV420_FORMATS:
+        return (width * height * 3 // 2) * bytes_per_sample
+    return width * height * 3 * bytes_per_sample
+
+
+def to_bgr(data, width: int, height: int, pixel_format: str, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """Returns a (height, width, 3) BGR frame; BGR payloads are reshaped, not copied."""
+    arr = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data
+    if pixel_format not in YUV420_FORMATS:
+        return arr.reshape((height, width, 3))
+    import cv2
+
+    code = cv2.COLOR_YUV2BGR_NV12 if pixel_format == NV12 else cv2.COLOR_YUV2BGR_I420
+    return cv2.cvtColor(arr.reshape(frame_shape(width, height, pixel_format)), code, dst=dst)
+
+
+def from_bgr(frame: np.ndarray, pixel_format: str, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """Packs a BGR frame into `pixel_format` (into `dst`, e.g. a SHM slot view, when given)."""
+    if pixel_format not in YUV420_FORMATS:
+        if dst is None:
+            return frame
+        np.copyto(dst, frame)
+        return dst
+    import cv2
+
+    height, width = frame.shape[:2]
+    if pixel_format == I420:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420, dst=dst)
+    # OpenCV has no BGR->NV12: convert to I420 and interleave the chroma planes.
+    i420 = cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420)
+    out = dst if dst is not None else np.empty_like(i420)
+    quarter = (width // 2) * (height // 2)
+    chroma = i420[height:].reshape(-1)
+    out[:height] = i420[:height]
+    uv = out[height:].reshape(-1)
+    uv[0::2] = chroma[:quarter]
+    uv[1::2] = chroma[quarter:]
+    return out
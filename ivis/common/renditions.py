@@ -0,0 +1,124 @@
+# FILE: ivis/common/renditions.py
+# ------------------------------------------------------------------------------
+"""
+Extra copies of a frame stored after it in the same SHM slot (same generation).
+
+"model" is letterboxed to MODEL_IMG_SIZE the way Ultralytics does it, so the
+detector skips its own resize; "preview" is a small BGR copy for the UI tile.
+Each rendition is advertised in the contract as memory.renditions[] with its
+byte offset inside the slot payload.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ivis.common.pixel_format import BGR, frame_nbytes
+
+MODEL = "model"
+PREVIEW = "preview"
+# Ultralytics LetterBox fill value
+LETTERBOX_FILL = 114
+_ALIGN = 64
+
+
+def _align(value: int) -> int:
+    return (value + _ALIGN - 1) & ~(_ALIGN - 1)
+
+
+def rendition_layout(
+    width: int,
+    height: int,
+    pixel_format: str = BGR,
+    model_size: int = 0,
+    preview_width: int = 0,
+) -> List[Dict]:
+    """Descriptors (name, offset, size, width, height, color_space, scale, pad) after the primary frame."""
+    layout = []
+    offset = _align(frame_nbytes(width, height, pixel_format))
+    if model_size > 0:
+        scale = min(model_size / width, model_size / height)
+        new_w, new_h = int(round(width * scale)), int(round(height * scale))
+        pad_x = int(round((model_size - new_w) / 2 - 0.1))
+        pad_y = int(round((model_size - new_h) / 2 - 0.1))
+        size = model_size * model_size * 3
+        layout.append({
+            "name": MODEL,
+            "offset": offset,
+            "size": size,
+            "width": model_size,
+            "height": model_size,
+            "color_space": BGR,
+            "scale": scale,
+            "pad": [pad_x, pad_y],
+            "content": [new_w, new_h],
+        })
+        offset = _align(offset + size)
+    if 0 < preview_width < width:
+        scale = preview_width / width
+        preview_height = max(2, int(round(height * scale)) & ~1)
+        size = preview_width * preview_height * 3
+        layout.append({
+            "name": PREVIEW,
+            "offset": offset,
+            "size": size,
+            "width": preview_width,
+            "height": preview_height,
+            "color_space": BGR,
+            "scale": scale,
+            "pad": [0, 0],
+            "content": [preview_width, preview_height],
+        })
+    return layout
+
+
+def slot_nbytes(width: int, height: int, pixel_format: str = BGR, model_size: int = 0, preview_width: int = 0) -> int:
+    """Slot payload for the primary frame plus every configured rendition."""
+    layout = rendition_layout(width, height, pixel_format, model_size, preview_width)
+    if not layout:
+        return frame_nbytes(width, height, pixel_format)
+    last = layout[-1]
+    return last["offset"] + last["size"]
+
+
+def find_rendition(memory_ref: Optional[dict], name: str) -> Optional[dict]:
+    if not isinstance(memory_ref, dict):
+        return None
+    for entry in memory_ref.get("renditions") or ():
+        if isinstance(entry, dict) and entry.get("name") == name:
+            return entry
+    return None
+
+
+def render_renditions(frame_bgr: np.ndarray, slot: np.ndarray, layout: Sequence[Dict]) -> None:
+    """Draws every rendition of `frame_bgr` into the flat uint8 `slot` buffer."""
+    import cv2
+
+    for entry in layout:
+        out = slot[entry["offset"]:entry["offset"] + entry["size"]].reshape(entry["height"], entry["width"], 3)
+        content_w, content_h = entry["content"]
+        if entry["name"] == PREVIEW:
+            cv2.resize(frame_bgr, (content_w, content_h), dst=out, interpolation=cv2.INTER_AREA)
+            continue
+        pad_x, pad_y = entry["pad"]
+        # Border is rewritten every time: slots (and arena records) get reused.
+        out[:pad_y] = LETTERBOX_FILL
+        out[pad_y + content_h:] = LETTERBOX_FILL
+        out[:, :pad_x] = LETTERBOX_FILL
+        out[:, pad_x + content_w:] = LETTERBOX_FILL
+        # The padded interior is not contiguous, so cv2 cannot resize into it directly.
+        out[pad_y:pad_y + content_h, pad_x:pad_x + content_w] = cv2.resize(
+            frame_bgr, (content_w, content_h), interpolation=cv2.INTER_LINEAR
+        )
+
+
+def to_source_box(box: Sequence[float], rendition: dict) -> List[float]:
+    """Maps an xyxy box in rendition pixels back to primary-frame pixels."""
+    scale = float(rendition.get("scale") or 1.0)
+    pad_x, pad_y = rendition.get("pad") or (0, 0)
+    x1, y1, x2, y2 = box
+    return [
+        (float(x1) - pad_x) / scale,
+        (float(y1) - pad_y) / scale,
+        (float(x2) - pad_x) / scale,
+        (float(y2) - pad_y) / scale,
+    ]
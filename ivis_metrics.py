@@ -14,6 +14,12 @@ service_errors_total = Counter("service_errors_total", "Service errors", ["servi
 shm_write_latency_ms = Histogram("shm_write_latency_ms", "SHM write latency (ms)")
 shm_read_latency_ms = Histogram("shm_read_latency_ms", "SHM read latency (ms)")
 shm_bytes_copied_total = Counter("shm_bytes_copied_total", "Total bytes copied via SHM")
+shm_pinned_slot_skips_total = Counter("shm_pinned_slot_skips_total", "SHM slots skipped by the writer because a reader leased them")
+shm_lease_evictions_total = Counter("shm_lease_evictions_total", "SHM writes that overwrote a leased slot after the stall budget ran out")
+shm_backpressure_waits_total = Counter("shm_backpressure_waits_total", "SHM writes that waited for a lossless consumer (blocking policy)")
+shm_backpressure_timeouts_total = Counter("shm_backpressure_timeouts_total", "Blocking SHM writes that gave up waiting and overwrote")
+shm_backpressure_wait_ms = Histogram("shm_backpressure_wait_ms", "Time the SHM writer spent blocked on consumers (ms)")
+shm_find_by_time_scans_total = Counter("shm_find_by_time_scans_total", "SHM time lookups that fell back to a linear scan (timestamps out of order)")
 inference_latency_ms = Histogram("inference_latency_ms", "Inference latency (ms)")
 end_to_end_latency_ms = Histogram("end_to_end_latency_ms", "End-to-end latency (ms)")
 
@@ -24,6 +30,18 @@ adaptive_fps_current = Gauge("adaptive_fps_current", "Current adaptive FPS targe
 ui_results_cache_size = Gauge("ui_results_cache_size", "UI results cache size")
 record_buffer_size = Gauge("record_buffer_size", "Recording buffer size (frames)")
 record_buffer_drops = Counter("record_buffer_drops", "Recording buffer drops")
+record_encode_queue_depth = Gauge("record_encode_queue_depth", "Recording frames waiting for a JPEG encode worker")
+record_encode_drops = Counter("record_encode_drops", "Recording frames dropped because the encode queue was full")
+record_spill_frames = Gauge("record_spill_frames", "Recording frames held in the on-disk segment ring")
+shm_consumer_lag_slots = Gauge("shm_consumer_lag_slots", "Frames written since the consumer's cursor", ["consumer"])
+shm_consumer_lapped_frames = Gauge("shm_consumer_lapped_frames", "Frames overwritten before the consumer read them", ["consumer"])
+shm_consumer_time_behind_ms = Gauge("shm_consumer_time_behind_ms", "Write-time gap between the newest frame and the consumer's cursor (ms)", ["consumer"])
+ingestion_queue_depth = Gauge("ingestion_queue_depth", "Items waiting between ingestion pipeline stages", ["stream", "queue"])
+ingestion_queue_drops_total = Counter("ingestion_queue_drops_total", "Items discarded by a full ingestion stage queue (oldest first)", ["stream", "queue"])
+ingestion_stream_frames_in_total = Counter("ingestion_stream_frames_in_total", "Frames read from the source, per ingestion stream", ["stream"])
+ingestion_stream_frames_out_total = Counter("ingestion_stream_frames_out_total", "Frames published, per ingestion stream", ["stream"])
+ingestion_stream_frames_dropped_total = Counter("ingestion_stream_frames_dropped_total", "Frames dropped, per ingestion stream", ["stream", "reason"])
+ingestion_stream_up = Gauge("ingestion_stream_up", "1 while the stream's ingestion loop is running", ["stream"])
 
 
 _server_started = False
@@ -6,3 +6,5 @@ class ConfigurationError(MemoryFatalError):
     pass
 class BackendInitializationError(MemoryFatalError):
     pass
+class MemoryWriteError(MemoryFatalError):
+    pass
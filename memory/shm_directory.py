@@ -0,0 +1,261 @@
+# FILE: memory/shm_directory.py
+# ------------------------------------------------------------------------------
+import os
+import sys
+import struct
+import time
+import logging
+from typing import Optional
+from multiprocessing import shared_memory
+
+from memory.shm_ring import GEN_MASK, SLOT_BUSY, ShmRing, _Mutex
+
+try:
+    from memory.errors.fatal import BackendInitializationError
+except Exception:
+    class BackendInitializationError(Exception):
+        pass
+
+
+DIRECTORY_NAME = "ivis_shm_directory"
+DIR_MAGIC = b"IVSD"
+# v2: pixel format
+DIR_VERSION = 2
+DIR_HEADER_FMT = "<4sII"
+DIR_HEADER_SIZE = struct.calcsize(DIR_HEADER_FMT)
+MAX_STREAMS = 64
+# Entry: seqlock word, stream_id, data/meta segment names, geometry, dtype,
+# pixel format, slot_size, slot_count, flags, writer pid, last update (wall-clock ms)
+ENTRY_FMT = "<I64s64s64sIII8s8sQIIIQ"
+ENTRY_SIZE = struct.calcsize(ENTRY_FMT)
+ENTRY_ARENA = 0x1
+_FIELD_SIZE = 64
+# SharedMemory(track=False) exists from 3.13; older versions need a manual unregister.
+_TRACK_PARAM = sys.version_info >= (3, 13)
+
+logger = logging.getLogger("ivis.shm_directory")
+
+
+def _open_segment(name: str, create: bool, size: int = 0):
+    """
+    Opens a segment that outlives this process. The stdlib resource tracker
+    would unlink it when the first attached process exits, so opt out.
+    """
+    if _TRACK_PARAM:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+    if os.name != "nt":
+        try:
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(segment._name, "shared_memory")
+        except Exception as exc:
+            logger.debug("resource_tracker unregister failed for %s: %s", name, exc)
+    return segment
+
+
+def _encode(value: str, field: str) -> bytes:
+    raw = value.encode("utf-8")
+    if not raw or len(raw) > _FIELD_SIZE:
+        raise ValueError(f"Invalid {field}: {value!r} (1..{_FIELD_SIZE} bytes)")
+    return raw
+
+
+def _decode(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("utf-8", "replace")
+
+
+class ShmDirectory:
+    """
+    Self-describing index of SHM rings on this host, keyed by stream_id.
+
+    Writers publish their ring (segment names, geometry, dtype, slot count, pid);
+    consumers look a stream up instead of re-deriving names and sizes from env.
+    Updates take the directory mutex; lookups are lock-free (per-entry seqlock).
+    The segment is shared by every stream and is never unlinked by publishers.
+    """
+
+    def __init__(self, name: str = DIRECTORY_NAME, create: bool = True):
+        self.name = name
+        self._mutex = _Mutex(f"{name}_mutex")
+        size = DIR_HEADER_SIZE + (MAX_STREAMS * ENTRY_SIZE)
+        with self._mutex:
+            try:
+                self._shm = _open_segment(name, create=False)
+            except FileNotFoundError:
+                if not create:
+                    raise BackendInitializationError(f"Shared memory directory not found: {name}")
+                self._shm = _open_segment(name, create=True, size=size)
+                struct.pack_into(DIR_HEADER_FMT, self._shm.buf, 0, DIR_MAGIC, DIR_VERSION, MAX_STREAMS)
+            magic, version, count = struct.unpack_from(DIR_HEADER_FMT, self._shm.buf, 0)
+            if magic != DIR_MAGIC or version != DIR_VERSION or count != MAX_STREAMS or self._shm.size < size:
+                if not create:
+                    self._shm.close()
+                    raise BackendInitializationError("Shared memory directory header mismatch")
+                # Outdated layout from an older build: publishers start it over.
+                logger.warning("Recreating SHM directory %s (layout v%s -> v%s)", name, version, DIR_VERSION)
+                self.unlink()
+                self._shm = _open_segment(name, create=True, size=size)
+                struct.pack_into(DIR_HEADER_FMT, self._shm.buf, 0, DIR_MAGIC, DIR_VERSION, MAX_STREAMS)
+        self.buf = self._shm.buf
+
+    def _entry_pos(self, index: int) -> int:
+        return DIR_HEADER_SIZE + (index * ENTRY_SIZE)
+
+    def _load(self, index: int, retries: int = 5):
+        pos = self._entry_pos(index)
+        for _ in range(retries):
+            before = struct.unpack_from("<I", self.buf, pos)[0]
+            if before & SLOT_BUSY:
+                time.sleep(0)
+                continue
+            fields = struct.unpack_from(ENTRY_FMT, self.buf, pos)
+            if struct.unpack_from("<I", self.buf, pos)[0] == before:
+                return fields
+        return None
+
+    def _store(self, index: int, *fields) -> None:
+        # Caller holds the mutex.
+        pos = self._entry_pos(index)
+        gen = struct.unpack_from("<I", self.buf, pos)[0] & GEN_MASK
+        struct.pack_into("<I", self.buf, pos, gen | SLOT_BUSY)
+        struct.pack_into(ENTRY_FMT, self.buf, pos, gen | SLOT_BUSY, *fields)
+        struct.pack_into("<I", self.buf, pos, (gen + 1) & GEN_MASK)
+
+    @staticmethod
+    def _to_dict(fields) -> dict:
+        (_, stream_id, data_name, meta_name, width, height, channels, dtype,
+         pixel_format, slot_size, slot_count, flags, pid, updated_ms) = fields
+        return {
+            "stream_id": _decode(stream_id),
+            "data_name": _decode(data_name),
+            "meta_name": _decode(meta_name),
+            "width": width,
+            "height": height,
+            "channels": channels,
+            "dtype": _decode(dtype),
+            "pixel_format": _decode(pixel_format) or "bgr",
+            "slot_size": slot_size,
+            "slot_count": slot_count,
+            "arena": bool(flags & ENTRY_ARENA),
+            "pid": pid,
+            "alive": ShmRing._pid_alive(pid),
+            "updated_ms": updated_ms,
+        }
+
+    def publish(
+        self,
+        stream_id: str,
+        data_name: str,
+        meta_name: str,
+        width: int,
+        height: int,
+        channels: int,
+        slot_size: int,
+        slot_count: int,
+        dtype: str = "uint8",
+        pixel_format: str = "bgr",
+        arena: bool = False,
+        pid: Optional[int] = None,
+    ) -> int:
+        """Adds or replaces the entry for `stream_id`. Entries of dead writers are recycled."""
+        raw_id = _encode(stream_id, "stream_id")
+        fields = (
+            raw_id,
+            _encode(data_name, "data_name"),
+            _encode(meta_name, "meta_name"),
+            int(width),
+            int(height),
+            int(channels),
+            dtype.encode("utf-8")[:8],
+            pixel_format.encode("utf-8")[:8],
+            int(slot_size),
+            int(slot_count),
+            ENTRY_ARENA if arena else 0,
+            os.getpid() if pid is None else int(pid),
+            int(time.time() * 1000),
+        )
+        with self._mutex:
+            free = None
+            stale = None
+            for i in range(MAX_STREAMS):
+                entry = struct.unpack_from(ENTRY_FMT, self.buf, self._entry_pos(i))
+                entry_id = entry[1].rstrip(b"\0")
+                if entry_id == raw_id:
+                    self._store(i, *fields)
+                    return i
+                if not entry_id and free is None:
+                    free = i
+                elif entry_id and stale is None and not ShmRing._pid_alive(entry[12]):
+                    stale = i
+            chosen = free if free is not None else stale
+            if chosen is None:
+                raise BackendInitializationError("Shared memory directory full")
+            self._store(chosen, *fields)
+        logger.info("SHM directory: published stream_id=%s data=%s", stream_id, data_name)
+        return chosen
+
+    def remove(self, stream_id: str, pid: Optional[int] = None) -> bool:
+        """Drops the entry for `stream_id` (only if still owned by `pid`, when given)."""
+        raw_id = stream_id.encode("utf-8")
+        with self._mutex:
+            for i in range(MAX_STREAMS):
+                entry = struct.unpack_from(ENTRY_FMT, self.buf, self._entry_pos(i))
+                if entry[1].rstrip(b"\0") != raw_id:
+                    continue
+                if pid is not None and entry[12] != pid:
+                    return False
+                self._store(i, b"", b"", b"", 0, 0, 0, b"", b"", 0, 0, 0, 0, 0)
+                return True
+        return False
+
+    def entries(self, include_dead: bool = False) -> list:
+        found = []
+        for i in range(MAX_STREAMS):
+            fields = self._load(i)
+            if fields is None or not fields[1].rstrip(b"\0"):
+                continue
+            entry = self._to_dict(fields)
+            if entry["alive"] or include_dead:
+                found.append(entry)
+        return found
+
+    def lookup(self, stream_id: str) -> Optional[dict]:
+        for entry in self.entries(include_dead=True):
+            if entry["stream_id"] == stream_id:
+                return entry
+        return None
+
+    def open_ring(self, stream_id: str, **ring_kwargs):
+        """Attaches to the ring published for `stream_id`. Returns (ShmRing, entry)."""
+        entry = self.lookup(stream_id)
+        if entry is None:
+            raise BackendInitializationError(f"Stream not in shared memory directory: {stream_id}")
+        ring = ShmRing(
+            entry["data_name"],
+            entry["meta_name"],
+            entry["slot_size"],
+            entry["slot_count"],
+            create=False,
+            **ring_kwargs,
+        )
+        return ring, entry
+
+    def close(self) -> None:
+        self.buf = None
+        try:
+            self._shm.close()
+        except Exception:
+            pass
+
+    def unlink(self) -> None:
+        self.close()
+        try:
+            if not _TRACK_PARAM and os.name != "nt":
+                # unlink() unregisters the name again; keep the tracker consistent.
+                from multiprocessing import resource_tracker
+
+                resource_tracker.register(self._shm._name, "shared_memory")
+            self._shm.unlink()
+        except Exception:
+            pass
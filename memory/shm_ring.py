@@ -1,27 +1,106 @@
 # FILE: memory/shm_ring.py
 # ------------------------------------------------------------------------------
 import os
+import sys
+import mmap
 import struct
 import time
+import platform
 import atexit
 import tempfile
 from typing import Optional
 from multiprocessing import shared_memory
 import logging
 
+import numpy as np
+
 try:
-    from memory.errors.fatal import BackendInitializationError
+    from memory.errors.fatal import BackendInitializationError, MemoryWriteError
 except Exception:
     class BackendInitializationError(Exception):
         pass
 
+    class MemoryWriteError(Exception):
+        pass
+
 
 MAGIC = b"IVIS"
-VERSION = 1
+# v2: consumer table (leases) appended to the meta segment
+# v3: write sequence, per-slot sequence/write time and consumer cursors
+# v4: consumer flags and the release notification word (blocking write policy)
+# v5: arena mode (variable-size records, per-slot offset table)
+# v6: per-slot capture timestamp / pts (time index)
+# v7: successor record (online resize / ring handover)
+# v8: committed-latest word (multi-writer)
+VERSION = 8
 HEADER_FMT = "<4sIIII"
 HEADER_SIZE = struct.calcsize(HEADER_FMT)
+# Sequence header (after HEADER): frames committed so far, monotonic ms of the last commit.
+# The low 32 bits of the write sequence double as the new-frame futex word.
+SEQ_FMT = "<QQ"
+SEQ_SIZE = struct.calcsize(SEQ_FMT)
+# Release word (after SEQ): bumped by consumers whenever a cursor moves, so a
+# blocked writer can sleep on it (futex) instead of polling the consumer table.
+RELEASE_FMT = "<I"
+RELEASE_SIZE = struct.calcsize(RELEASE_FMT)
+# Arena header (after the release word): arena capacity in bytes (0 = fixed
+# slots), offset of the next record. In arena mode the data segment holds
+# variable-size records; slots become record descriptors whose offset lives in
+# the per-slot offset table and whose size lives in the payload-length table.
+ARENA_FMT = "<QQ"
+ARENA_SIZE = struct.calcsize(ARENA_FMT)
+# Successor record (after the arena header): epoch (odd while being written),
+# data/meta segment names and geometry of the ring that replaces this one.
+# Readers that see it migrate; the old ring keeps serving until they have.
+HANDOVER_FMT = "<I64s64sII"
+HANDOVER_SIZE = struct.calcsize(HANDOVER_FMT)
+# Committed-latest word (after the successor record): slot + 1 of the newest
+# committed frame, 0 before the first. Multi-writer rings commit out of
+# reservation order, so the write index may point past a slot still being copied.
+LATEST_FMT = "<I"
+LATEST_SIZE = struct.calcsize(LATEST_FMT)
+SLOT_OFFSET_FMT = "<Q"
+SLOT_OFFSET_SIZE = struct.calcsize(SLOT_OFFSET_FMT)
+ARENA_ALIGN = 64
+# Hugepage-backed data segments live as files on a hugetlbfs mount.
+HUGEPAGE_DIR = os.getenv("SHM_HUGEPAGE_DIR", "/dev/hugepages")
+# madvise(MADV_POPULATE_READ/WRITE) (Linux 5.14+); not exported by the mmap module
+_MADV_POPULATE_READ = 22
+_MADV_POPULATE_WRITE = 23
+# Per-slot info: sequence number of the frame in the slot, monotonic ms it was committed
+SLOT_INFO_FMT = "<QQ"
+SLOT_INFO_SIZE = struct.calcsize(SLOT_INFO_FMT)
+# Per-slot time index: capture timestamp (wall-clock ms) and stream pts of the frame
+SLOT_TIME_FMT = "<qd"
+SLOT_TIME_SIZE = struct.calcsize(SLOT_TIME_FMT)
 PAYLOAD_LEN_FMT = "<I"
 PAYLOAD_LEN_SIZE = struct.calcsize(PAYLOAD_LEN_FMT)
+# The per-slot generation word doubles as a seqlock: the writer sets SLOT_BUSY
+# before touching the slot and stores the bare generation once the copy is
+# committed. Generations therefore live in the low 31 bits.
+SLOT_BUSY = 0x80000000
+GEN_MASK = 0x7FFFFFFF
+# Consumer table entry, split so each party only ever writes its own part:
+#   identity: name, pid, flags (CONSUMER_LOSSLESS)
+#   lease:    pinned slot (-1 = none), pinned gen, lease expiry (monotonic ms)
+#   cursor:   last consumed sequence, lapped frames, write time of the cursor frame (monotonic ms)
+MAX_CONSUMERS = 8
+CONSUMER_NAME_SIZE = 16
+CONSUMER_ID_FMT = "<16sII"
+CONSUMER_LEASE_FMT = "<iIQ"
+CONSUMER_CURSOR_FMT = "<QQQ"
+CONSUMER_LEASE_OFFSET = struct.calcsize(CONSUMER_ID_FMT)
+CONSUMER_CURSOR_OFFSET = CONSUMER_LEASE_OFFSET + struct.calcsize(CONSUMER_LEASE_FMT)
+CONSUMER_SIZE = CONSUMER_CURSOR_OFFSET + struct.calcsize(CONSUMER_CURSOR_FMT)
+# A lossless consumer holds back the writer under the "blocking" write policy.
+CONSUMER_LOSSLESS = 0x1
+# Successor records a reader follows at most to find a frame's ring (online resize).
+MAX_HANDOVER_HOPS = 8
+# Write policies: overwrite the oldest slot (live streams) or wait for the
+# slowest lossless consumer to move past it (offline / batch runs).
+POLICY_OVERWRITE = "overwrite"
+POLICY_BLOCKING = "blocking"
+WRITE_POLICIES = (POLICY_OVERWRITE, POLICY_BLOCKING)
 
 
 class _Mutex:
@@ -43,9 +122,13 @@ class _Mutex:
             # Create a named mutex (NULL security, not owned initially)
             self._handle = self._ctypes.windll.kernel32.CreateMutexW(None, False, name)
         else:
-            # POSIX: use a lock file in the temp directory
+            # POSIX: use a lock file in the temp directory (next to the ring
+            # file when the name is a path, i.e. a file-backed ring)
             self._lock_dir = tempfile.gettempdir()
-            self._lock_path = os.path.join(self._lock_dir, f"{name}.lock")
+            if os.path.isabs(name):
+                self._lock_path = f"{name}.lock"
+            else:
+                self._lock_path = os.path.join(self._lock_dir, f"{name}.lock")
             # open file in append+binary so it is shareable and persists
             # keep the file descriptor as the handle for fcntl locks
             self._handle = open(self._lock_path, "a+b")
@@ -84,6 +167,161 @@ class _Mutex:
             pass
 
 
+class _Futex:
+    """
+    Process-shared wait/wake on a 32-bit word of a shared segment (Linux futex).
+
+    Where the syscall is unavailable wait() degrades to a short sleep and wake()
+    is a no-op, so callers must always re-check their condition after waking.
+    """
+
+    _SYSCALL_NR = {"x86_64": 202, "amd64": 202, "aarch64": 98, "arm64": 98, "i386": 240, "i686": 240, "armv7l": 240}
+    _FUTEX_WAIT = 0
+    _FUTEX_WAKE = 1
+    _POLL_SEC = 0.001
+    _libc = None
+
+    def __init__(self, buf, offset: int):
+        self._buf = buf
+        self._offset = offset
+        self._word = None
+        self._nr = None
+        if not sys.platform.startswith("linux"):
+            return
+        nr = self._SYSCALL_NR.get(platform.machine().lower())
+        if nr is None:
+            return
+        try:
+            import ctypes
+
+            if _Futex._libc is None:
+                _Futex._libc = ctypes.CDLL(None, use_errno=True)
+            class _Timespec(ctypes.Structure):
+                _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+            self._ctypes = ctypes
+            self._timespec = _Timespec
+            self._word = ctypes.c_uint32.from_buffer(buf, offset)
+            self._nr = nr
+        except Exception as exc:
+            logger.debug("futex unavailable, falling back to polling: %s", exc)
+            self._word = None
+
+    @property
+    def available(self) -> bool:
+        return self._word is not None
+
+    def load(self) -> int:
+        """Current value of the word, as the kernel compares it."""
+        return struct.unpack_from("=I", self._buf, self._offset)[0]
+
+    def wait(self, expected: int, timeout_sec: float) -> None:
+        """Sleeps while the word equals `expected`, at most `timeout_sec`."""
+        timeout_sec = max(0.0, timeout_sec)
+        if self._word is None:
+            time.sleep(min(timeout_sec, self._POLL_SEC))
+            return
+        ctypes = self._ctypes
+        ts = self._timespec(int(timeout_sec), int((timeout_sec % 1.0) * 1e9))
+        self._libc.syscall(
+            ctypes.c_long(self._nr),
+            ctypes.c_void_p(ctypes.addressof(self._word)),
+            ctypes.c_int(self._FUTEX_WAIT),
+            ctypes.c_uint32(expected & 0xFFFFFFFF),
+            ctypes.byref(ts),
+            None,
+            ctypes.c_int(0),
+        )
+
+    def wake(self) -> None:
+        if self._word is None:
+            return
+        ctypes = self._ctypes
+        self._libc.syscall(
+            ctypes.c_long(self._nr),
+            ctypes.c_void_p(ctypes.addressof(self._word)),
+            ctypes.c_int(self._FUTEX_WAKE),
+            ctypes.c_int(0x7FFFFFFF),
+            None,
+            None,
+            ctypes.c_int(0),
+        )
+
+    def close(self) -> None:
+        # Drop the ctypes export so the shared segment can be closed.
+        self._word = None
+        self._buf = None
+
+
+class _FileSegment:
+    """
+    SharedMemory look-alike backed by a file mapping (e.g. on hugetlbfs).
+    Exposes the same name/size/buf/close()/unlink() surface.
+    """
+
+    def __init__(self, path: str, create: bool = False, size: int = 0, align: int = mmap.PAGESIZE):
+        flags = os.O_RDWR | ((os.O_CREAT | os.O_EXCL) if create else 0)
+        fd = os.open(path, flags, 0o600)
+        try:
+            if create:
+                size = -(-size // align) * align
+                os.ftruncate(fd, size)
+            else:
+                size = os.fstat(fd).st_size
+            self._mmap = mmap.mmap(fd, size)
+        except BaseException:
+            os.close(fd)
+            if create:
+                os.unlink(path)
+            raise
+        os.close(fd)
+        self.path = path
+        self.name = os.path.basename(path)
+        self.size = size
+        self.buf = memoryview(self._mmap)
+
+    def close(self) -> None:
+        if self.buf is not None:
+            self.buf.release()
+            self.buf = None
+        self._mmap.close()
+
+    def unlink(self) -> None:
+        os.unlink(self.path)
+
+
+def _hugepage_size() -> int:
+    """Default hugepage size in bytes (0 if hugepages are unsupported/unreserved)."""
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as fh:
+            info = dict(line.split(":", 1) for line in fh if ":" in line)
+        if int(info.get("HugePages_Total", "0").split()[0]) <= 0:
+            return 0
+        return int(info["Hugepagesize"].split()[0]) * 1024
+    except (OSError, KeyError, ValueError, IndexError):
+        return 0
+
+
+def _hugepages_free_bytes() -> int:
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as fh:
+            info = dict(line.split(":", 1) for line in fh if ":" in line)
+        return int(info["HugePages_Free"].split()[0]) * int(info["Hugepagesize"].split()[0]) * 1024
+    except (OSError, KeyError, ValueError, IndexError):
+        return 0
+
+
+def file_ring_names(directory: str, data_name: str, meta_name: str):
+    """Segment names of a file-backed ring: absolute paths under `directory`."""
+    directory = os.path.abspath(directory)
+    return os.path.join(directory, data_name), os.path.join(directory, meta_name)
+
+
+def _segment_mmap(segment):
+    # SharedMemory keeps its mapping private; both segment kinds name it _mmap.
+    return getattr(segment, "_mmap", None)
+
+
 logger = logging.getLogger("ivis.shm_ring")
 
 
@@ -96,27 +334,84 @@ class ShmRing:
         slot_count: int,
         create: bool = False,
         recreate_on_mismatch: bool = True,
+        seqlock: bool = True,
+        lease_ttl_ms: int = 2000,
+        lease_stall_ms: float = 0.0,
+        write_policy: str = POLICY_OVERWRITE,
+        block_timeout_ms: float = 0.0,
+        arena: bool = False,
+        prefault: bool = False,
+        hugepages: bool = False,
+        hugepage_dir: Optional[str] = None,
+        multi_writer: bool = False,
     ):
         self.data_name = data_name
         self.meta_name = meta_name
         self.slot_size = slot_size
         self.slot_count = slot_count
+        # seqlock=True validates reads against the generation word without any
+        # kernel lock; seqlock=False keeps the legacy mutex-guarded metadata reads.
+        self.seqlock = seqlock
+        # Leases: a pinned slot is skipped by write(); once every slot is pinned
+        # the writer waits up to lease_stall_ms and then overwrites anyway.
+        self.lease_ttl_ms = max(1, int(lease_ttl_ms))
+        self.lease_stall_ms = max(0.0, float(lease_stall_ms))
+        # Blocking policy: write() waits (up to block_timeout_ms, 0 = no limit)
+        # until every live lossless consumer has consumed the slot it would overwrite.
+        if write_policy not in WRITE_POLICIES:
+            raise ValueError(f"Invalid write policy: {write_policy}")
+        self.write_policy = write_policy
+        self.block_timeout_ms = max(0.0, float(block_timeout_ms))
+        # Arena mode packs variable-size records into the slot_size * slot_count
+        # data segment. Only the creator chooses; attaching readers adopt the
+        # mode recorded in the meta segment.
+        self.arena = bool(arena)
+        # Startup tail latency: prefault maps every data page up front, hugepages
+        # backs a newly created data segment with hugetlbfs (falling back to
+        # MADV_HUGEPAGE on the regular segment when none are free).
+        self.prefault = prefault
+        self.hugepages = hugepages
+        self.hugepage_dir = hugepage_dir or HUGEPAGE_DIR
+        # Absolute paths as names select a file-backed ring (e.g. on tmpfs or
+        # NVMe): both segments are mmap'ed files that outlive a writer crash and
+        # stay readable for post-mortem replay until removed explicitly.
+        self.file_backed = os.path.isabs(data_name)
+        if self.file_backed and create:
+            os.makedirs(os.path.dirname(data_name), exist_ok=True)
+            os.makedirs(os.path.dirname(meta_name), exist_ok=True)
+        # Multi-writer: several processes write one ring. The mutex only covers
+        # slot reservation and the commit bookkeeping; payload copies run
+        # unlocked, so writers copy in parallel into slots they own (SLOT_BUSY).
+        self.multi_writer = bool(multi_writer)
         self._mutex = _Mutex(f"{data_name}_mutex")
+        self._pending = None
         self._owner = create
-        self._payload_offset = HEADER_SIZE + (slot_count * 4)
+        self._release_offset = HEADER_SIZE + SEQ_SIZE
+        self._arena_offset = self._release_offset + RELEASE_SIZE
+        self._handover_offset = self._arena_offset + ARENA_SIZE
+        self._latest_offset = self._handover_offset + HANDOVER_SIZE
+        self._gen_offset = self._latest_offset + LATEST_SIZE
+        self._payload_offset = self._gen_offset + (slot_count * 4)
+        self._slot_info_offset = self._payload_offset + (slot_count * PAYLOAD_LEN_SIZE)
+        self._slot_offset_offset = self._slot_info_offset + (slot_count * SLOT_INFO_SIZE)
+        self._slot_time_offset = self._slot_offset_offset + (slot_count * SLOT_OFFSET_SIZE)
+        self._consumer_offset = self._slot_time_offset + (slot_count * SLOT_TIME_SIZE)
         self._has_payload_lengths = False
 
-        meta_size = HEADER_SIZE + (slot_count * 4) + (slot_count * PAYLOAD_LEN_SIZE)
+        meta_size = self._consumer_offset + (MAX_CONSUMERS * CONSUMER_SIZE)
         if create:
             try:
-                self.data = shared_memory.SharedMemory(name=data_name, create=True, size=slot_size * slot_count)
-                self.meta = shared_memory.SharedMemory(name=meta_name, create=True, size=meta_size)
+                self.data = self._create_data(slot_size * slot_count)
+                self.meta = self._create_meta(meta_size)
                 self._has_payload_lengths = self.meta.size >= (self._payload_offset + (slot_count * PAYLOAD_LEN_SIZE))
                 self._init_meta()
             except FileExistsError:
                 self._warn_existing()
-                self.data = shared_memory.SharedMemory(name=data_name, create=False)
-                self.meta = shared_memory.SharedMemory(name=meta_name, create=False)
+                if self.multi_writer:
+                    # A peer writer created the ring: leave the unlink to it.
+                    self._owner = False
+                self.data = self._open_data(data_name, self.hugepage_dir)
+                self.meta = self._open_meta()
                 self._has_payload_lengths = self.meta.size >= (self._payload_offset + (slot_count * PAYLOAD_LEN_SIZE))
                 try:
                     self._validate_meta()
@@ -125,26 +420,122 @@ class ShmRing:
                         raise
                     self._warn_recreate()
                     self._cleanup()
-                    self.data = shared_memory.SharedMemory(name=data_name, create=True, size=slot_size * slot_count)
-                    self.meta = shared_memory.SharedMemory(name=meta_name, create=True, size=meta_size)
+                    self.data = self._create_data(slot_size * slot_count)
+                    self.meta = self._create_meta(meta_size)
                     self._has_payload_lengths = self.meta.size >= (self._payload_offset + (slot_count * PAYLOAD_LEN_SIZE))
                     self._init_meta()
         else:
-            self.data = shared_memory.SharedMemory(name=data_name, create=False)
-            self.meta = shared_memory.SharedMemory(name=meta_name, create=False)
+            self.data = self._open_data(data_name, self.hugepage_dir)
+            self.meta = self._open_meta()
             self._has_payload_lengths = self.meta.size >= (self._payload_offset + (slot_count * PAYLOAD_LEN_SIZE))
             self._validate_meta()
 
         self.data_buf = self.data.buf
         self.meta_buf = self.meta.buf
+        if self.prefault:
+            self._prefault_data(write=self._fresh_data)
+        self._capacity = slot_size * slot_count
+        # Largest single payload: one slot, or the whole arena.
+        self._max_payload = self._capacity if self.arena else slot_size
+        self._release_futex = _Futex(self.meta_buf, self._release_offset)
+        self._frame_futex = _Futex(self.meta_buf, HEADER_SIZE)
 
-        # If this process created the segments, try to unlink them on clean exit
-        if self._owner:
+        # If this process created the segments, try to unlink them on clean exit.
+        # Shared (multi-writer) rings are unlinked by whoever owns the deployment,
+        # file-backed rings are kept on purpose.
+        if self._owner and not self.multi_writer and not self.file_backed:
             try:
                 atexit.register(self.close_unlink, True)
             except Exception:
                 logger.warning("Failed to register atexit handler for shm cleanup")
 
+    def _create_data(self, size: int):
+        self._fresh_data = True
+        if self.file_backed:
+            if self.hugepages:
+                logger.info("Hugepages do not apply to file-backed ring %s; using the page cache", self.data_name)
+            return _FileSegment(self.data_name, create=True, size=size)
+        if self.hugepages:
+            page = _hugepage_size()
+            path = os.path.join(self.hugepage_dir, self.data_name)
+            if page and os.path.isdir(self.hugepage_dir) and _hugepages_free_bytes() >= size:
+                # Readers look in /dev/shm first: never shadow a stale segment there.
+                try:
+                    shared_memory.SharedMemory(name=self.data_name, create=False).close()
+                    raise FileExistsError(self.data_name)
+                except FileNotFoundError:
+                    pass
+                try:
+                    segment = _FileSegment(path, create=True, size=size, align=page)
+                    logger.info("SHM data segment on hugetlbfs: %s (%s bytes)", path, segment.size)
+                    return segment
+                except FileExistsError:
+                    raise
+                except OSError as exc:
+                    logger.warning("Hugepage segment unavailable (%s); using regular pages", exc)
+            else:
+                logger.info("No free hugepages for %s bytes; using regular pages with MADV_HUGEPAGE", size)
+        segment = shared_memory.SharedMemory(name=self.data_name, create=True, size=size)
+        if self.hugepages:
+            self._madvise(segment, getattr(mmap, "MADV_HUGEPAGE", None))
+        return segment
+
+    def _open_data(self, data_name: str, hugepage_dir: str):
+        self._fresh_data = False
+        if self.file_backed:
+            return _FileSegment(data_name, create=False)
+        try:
+            return shared_memory.SharedMemory(name=data_name, create=False)
+        except FileNotFoundError:
+            path = os.path.join(hugepage_dir, data_name)
+            if not os.path.exists(path):
+                raise
+            return _FileSegment(path, create=False)
+
+    def _create_meta(self, size: int):
+        if self.file_backed:
+            return _FileSegment(self.meta_name, create=True, size=size)
+        return shared_memory.SharedMemory(name=self.meta_name, create=True, size=size)
+
+    def _open_meta(self):
+        if self.file_backed:
+            return _FileSegment(self.meta_name, create=False)
+        return shared_memory.SharedMemory(name=self.meta_name, create=False)
+
+    @staticmethod
+    def _madvise(segment, advice) -> bool:
+        mapping = _segment_mmap(segment)
+        if advice is None or mapping is None or not hasattr(mapping, "madvise"):
+            return False
+        try:
+            mapping.madvise(advice)
+            return True
+        except OSError as exc:
+            logger.debug("madvise(%s) failed: %s", advice, exc)
+            return False
+
+    def _prefault_data(self, write: bool) -> None:
+        """
+        Maps every page of the data segment now rather than on first touch.
+        Only a freshly created (all-zero) segment is prefaulted for write.
+        """
+        start = time.perf_counter()
+        advice = _MADV_POPULATE_WRITE if write else _MADV_POPULATE_READ
+        if not self._madvise(self.data, advice):
+            self._madvise(self.data, getattr(mmap, "MADV_WILLNEED", None))
+            pages = np.frombuffer(self.data_buf, dtype=np.uint8)[:: mmap.PAGESIZE]
+            if write:
+                pages[:] = 0
+            else:
+                int(pages.sum())
+            del pages
+        logger.info(
+            "SHM data segment prefaulted: %s bytes in %.1f ms (%s)",
+            self.data.size,
+            (time.perf_counter() - start) * 1000.0,
+            "write" if write else "read",
+        )
+
     def _init_meta(self):
         struct.pack_into(
             HEADER_FMT,
@@ -156,11 +547,25 @@ class ShmRing:
             self.slot_count,
             0,
         )
+        struct.pack_into(SEQ_FMT, self.meta.buf, HEADER_SIZE, 0, 0)
+        struct.pack_into(RELEASE_FMT, self.meta.buf, self._release_offset, 0)
+        capacity = self.slot_size * self.slot_count if self.arena else 0
+        struct.pack_into(ARENA_FMT, self.meta.buf, self._arena_offset, capacity, 0)
+        struct.pack_into(HANDOVER_FMT, self.meta.buf, self._handover_offset, 0, b"", b"", 0, 0)
+        struct.pack_into(LATEST_FMT, self.meta.buf, self._latest_offset, 0)
         for i in range(self.slot_count):
-            struct.pack_into("<I", self.meta.buf, HEADER_SIZE + (i * 4), 0)
+            struct.pack_into("<I", self.meta.buf, self._gen_offset + (i * 4), 0)
+            struct.pack_into(SLOT_INFO_FMT, self.meta.buf, self._slot_info_offset + (i * SLOT_INFO_SIZE), 0, 0)
+            struct.pack_into(SLOT_OFFSET_FMT, self.meta.buf, self._slot_offset_offset + (i * SLOT_OFFSET_SIZE), 0)
+            struct.pack_into(SLOT_TIME_FMT, self.meta.buf, self._slot_time_offset + (i * SLOT_TIME_SIZE), 0, 0.0)
         if self._has_payload_lengths:
             for i in range(self.slot_count):
                 struct.pack_into(PAYLOAD_LEN_FMT, self.meta.buf, self._payload_offset + (i * PAYLOAD_LEN_SIZE), 0)
+        for i in range(MAX_CONSUMERS):
+            pos = self._consumer_offset + (i * CONSUMER_SIZE)
+            struct.pack_into(CONSUMER_ID_FMT, self.meta.buf, pos, b"", 0, 0)
+            struct.pack_into(CONSUMER_LEASE_FMT, self.meta.buf, pos + CONSUMER_LEASE_OFFSET, -1, 0, 0)
+            struct.pack_into(CONSUMER_CURSOR_FMT, self.meta.buf, pos + CONSUMER_CURSOR_OFFSET, 0, 0, 0)
 
     def _validate_meta(self):
         magic, version, slot_size, slot_count, _ = struct.unpack_from(HEADER_FMT, self.meta.buf, 0)
@@ -168,6 +573,12 @@ class ShmRing:
             raise BackendInitializationError("Shared memory header mismatch")
         if slot_size != self.slot_size or slot_count != self.slot_count:
             raise BackendInitializationError("Shared memory layout mismatch")
+        if self.meta.size < self._consumer_offset + (MAX_CONSUMERS * CONSUMER_SIZE):
+            raise BackendInitializationError("Shared memory meta segment too small")
+        capacity, _ = struct.unpack_from(ARENA_FMT, self.meta.buf, self._arena_offset)
+        if self._owner and bool(capacity) != self.arena:
+            raise BackendInitializationError("Shared memory mode mismatch (arena)")
+        self.arena = bool(capacity)
 
     def _get_write_index(self) -> int:
         _, _, _, _, idx = struct.unpack_from(HEADER_FMT, self.meta_buf, 0)
@@ -177,11 +588,263 @@ class ShmRing:
         magic, version, slot_size, slot_count, _ = struct.unpack_from(HEADER_FMT, self.meta_buf, 0)
         struct.pack_into(HEADER_FMT, self.meta_buf, 0, magic, version, slot_size, slot_count, idx)
 
+    def _get_seq(self):
+        return struct.unpack_from(SEQ_FMT, self.meta_buf, HEADER_SIZE)
+
+    def _slot_offset(self, slot: int) -> int:
+        if not self.arena:
+            return slot * self.slot_size
+        return struct.unpack_from(SLOT_OFFSET_FMT, self.meta_buf, self._slot_offset_offset + (slot * SLOT_OFFSET_SIZE))[0]
+
+    def _set_slot_offset(self, slot: int, offset: int) -> None:
+        struct.pack_into(SLOT_OFFSET_FMT, self.meta_buf, self._slot_offset_offset + (slot * SLOT_OFFSET_SIZE), offset)
+
+    def _get_arena_head(self) -> int:
+        return struct.unpack_from(ARENA_FMT, self.meta_buf, self._arena_offset)[1]
+
+    def _set_arena_head(self, head: int) -> None:
+        struct.pack_into(ARENA_FMT, self.meta_buf, self._arena_offset, self._capacity, head)
+
+    def _arena_region(self, nbytes: int):
+        """(offset, reserved size) for the next record; wraps to 0 if the tail is too short."""
+        size = -(-max(1, nbytes) // ARENA_ALIGN) * ARENA_ALIGN
+        size = min(size, self._capacity)
+        head = self._get_arena_head()
+        if head + size > self._capacity:
+            head = 0
+        return head, size
+
+    def _live_records(self, start: int, size: int):
+        """Committed records whose bytes intersect [start, start + size)."""
+        hits = []
+        for slot in range(self.slot_count):
+            gen = self._get_generation(slot)
+            length = self._get_payload_length(slot)
+            if gen & SLOT_BUSY or length <= 0:
+                continue
+            offset = self._slot_offset(slot)
+            if offset < start + size and start < offset + length:
+                hits.append(slot)
+        return hits
+
+    def _in_flight_end(self, start: int, size: int, keep: int):
+        """End of the furthest record another writer is still copying into [start, start + size), or None."""
+        end = None
+        for slot in range(self.slot_count):
+            if slot == keep or not self._get_generation(slot) & SLOT_BUSY:
+                continue
+            offset = self._slot_offset(slot)
+            length = self._get_payload_length(slot)
+            if length > 0 and offset < start + size and start < offset + length:
+                end = max(end or 0, offset + length)
+        return end
+
+    def _arena_region_idle(self, nbytes: int, keep: int):
+        """
+        Multi-writer _arena_region(): steps past records other writers are
+        still copying (they cannot be evicted). Waits, with the mutex released,
+        for up to lease_stall_ms when the arena has no such room.
+        """
+        deadline = time.perf_counter() + (self.lease_stall_ms / 1000.0)
+        while True:
+            offset, size = self._arena_region(nbytes)
+            for _ in range(self.slot_count + 1):
+                end = self._in_flight_end(offset, size, keep)
+                if end is None:
+                    return offset, size
+                offset = -(-end // ARENA_ALIGN) * ARENA_ALIGN
+                if offset + size > self._capacity:
+                    offset = 0
+            if time.perf_counter() >= deadline:
+                raise MemoryWriteError(f"No SHM arena space for {size} bytes outside records being written")
+            self._mutex.__exit__(None, None, None)
+            try:
+                time.sleep(0.0005)
+            finally:
+                self._mutex.__enter__()
+
+    def _evict_records(self, slots, keep: int) -> None:
+        # Retire records the new one overlaps: bump their generation so pending
+        # readers fail validation, and zero their length so they stay dead.
+        pinned = self._pinned_slots()
+        for slot in slots:
+            if slot == keep:
+                continue
+            if slot in pinned:
+                self._inc_counter("shm_lease_evictions_total")
+            self._set_payload_length(slot, 0)
+            self._set_generation(slot, ((self._get_generation(slot) & GEN_MASK) + 1) & GEN_MASK)
+
+    # --- handover (online resize) -------------------------------------------
+
+    @staticmethod
+    def _successor_names(data_name: str, meta_name: str):
+        raw_data = data_name.encode("utf-8")
+        raw_meta = meta_name.encode("utf-8")
+        if not raw_data or not raw_meta or len(raw_data) > 64 or len(raw_meta) > 64:
+            raise ValueError("Successor segment names must be 1..64 bytes")
+        return raw_data, raw_meta
+
+    def advertise_successor(self, data_name: str, meta_name: str, slot_size: int, slot_count: int) -> None:
+        """Publishes the ring that replaces this one; readers migrate on their next check."""
+        raw_data, raw_meta = self._successor_names(data_name, meta_name)
+        with self._mutex:
+            epoch = struct.unpack_from("<I", self.meta_buf, self._handover_offset)[0]
+            # Odd while the record is being rewritten (a crashed writer may have left it odd).
+            epoch = epoch if epoch & 1 else epoch + 1
+            struct.pack_into("<I", self.meta_buf, self._handover_offset, epoch)
+            struct.pack_into(HANDOVER_FMT, self.meta_buf, self._handover_offset, epoch, raw_data, raw_meta, slot_size, slot_count)
+            struct.pack_into("<I", self.meta_buf, self._handover_offset, (epoch + 1) & 0xFFFFFFFF)
+        # Wake readers parked in wait_for_frame() so they notice promptly.
+        self._frame_futex.wake()
+        logger.info("SHM handover: %s -> %s (slot_size=%s, slots=%s)", self.data_name, data_name, slot_size, slot_count)
+
+    def withdraw_successor(self) -> None:
+        """Clears the successor record, e.g. one a crashed writer left behind."""
+        with self._mutex:
+            struct.pack_into(HANDOVER_FMT, self.meta_buf, self._handover_offset, 0, b"", b"", 0, 0)
+
+    def successor(self, retries: int = 5) -> Optional[dict]:
+        """The advertised replacement ring ({data_name, meta_name, slot_size, slot_count}) or None."""
+        for _ in range(retries):
+            before = struct.unpack_from("<I", self.meta_buf, self._handover_offset)[0]
+            if before == 0:
+                return None
+            if before & 1:
+                time.sleep(0)
+                continue
+            _, data_name, meta_name, slot_size, slot_count = struct.unpack_from(HANDOVER_FMT, self.meta_buf, self._handover_offset)
+            if struct.unpack_from("<I", self.meta_buf, self._handover_offset)[0] == before:
+                return {
+                    "data_name": data_name.rstrip(b"\0").decode("utf-8", "replace"),
+                    "meta_name": meta_name.rstrip(b"\0").decode("utf-8", "replace"),
+                    "slot_size": slot_size,
+                    "slot_count": slot_count,
+                }
+        return None
+
+    def follow_successors(self, data_name: Optional[str] = None, max_hops: int = MAX_HANDOVER_HOPS, **ring_kwargs):
+        """
+        Reader side of an online resize: walks the successor chain (a stream may
+        be resized again before a reader catches up) to the ring named
+        `data_name`, or to the newest ring when it is None. Returns (ring,
+        successor record) with that ring attached, or None if it is not
+        reachable within `max_hops`. Intermediate rings are only opened to read
+        their own successor record.
+        """
+        ring = self
+        found = None
+        opened = []
+        try:
+            for _ in range(max_hops):
+                successor = ring.successor()
+                if successor is None:
+                    break
+                ring = ShmRing(
+                    successor["data_name"],
+                    successor["meta_name"],
+                    successor["slot_size"],
+                    successor["slot_count"],
+                    create=False,
+                    **ring_kwargs,
+                )
+                opened.append(ring)
+                found = (ring, successor)
+                if successor["data_name"] == data_name:
+                    break
+        except (OSError, ValueError, BackendInitializationError):
+            # A ring in the chain is already gone (retired).
+            pass
+        if found is not None and data_name is not None and found[1]["data_name"] != data_name:
+            found = None
+        for hop in opened:
+            if found is None or hop is not found[0]:
+                hop.close()
+        return found
+
+    def handover(self, data_name: str, meta_name: str, slot_size: int, slot_count: int, **ring_kwargs) -> "ShmRing":
+        """
+        Writer side of an online resize: creates the replacement ring (same
+        write policy / arena / prefault options unless overridden) and
+        advertises it here. Keep this ring open until live_consumers() drops
+        to zero (or a grace period passes), then close_unlink() it. Segments
+        already under the new names (left by an earlier run) are replaced.
+        """
+        # Before anything is created: a name that cannot be advertised would leak the new segments.
+        self._successor_names(data_name, meta_name)
+        options = {
+            "lease_ttl_ms": self.lease_ttl_ms,
+            "lease_stall_ms": self.lease_stall_ms,
+            "write_policy": self.write_policy,
+            "block_timeout_ms": self.block_timeout_ms,
+            "arena": self.arena,
+            "prefault": self.prefault,
+            "hugepages": self.hugepages,
+            "hugepage_dir": self.hugepage_dir,
+        }
+        options.update(ring_kwargs)
+        if ShmRing.exists(data_name, meta_name):
+            logger.warning("Removing stale SHM ring %s before handover", data_name)
+        ShmRing.remove(data_name, meta_name, options["hugepage_dir"])
+        successor = ShmRing(data_name, meta_name, slot_size, slot_count, create=True, recreate_on_mismatch=True, **options)
+        try:
+            self.advertise_successor(data_name, meta_name, slot_size, slot_count)
+        except BaseException:
+            successor.close_unlink(True)
+            raise
+        return successor
+
+    def live_consumers(self) -> int:
+        """Registered consumers whose process is still alive."""
+        return sum(1 for entry in self.consumer_stats() if entry["alive"])
+
+    def _get_release_word(self) -> int:
+        return struct.unpack_from(RELEASE_FMT, self.meta_buf, self._release_offset)[0]
+
+    def _notify_release(self) -> None:
+        # Consumers may race on the increment; any change of the word wakes the writer.
+        struct.pack_into(RELEASE_FMT, self.meta_buf, self._release_offset, (self._get_release_word() + 1) & 0xFFFFFFFF)
+        self._release_futex.wake()
+
     def _get_generation(self, slot: int) -> int:
-        return struct.unpack_from("<I", self.meta_buf, HEADER_SIZE + (slot * 4))[0]
+        return struct.unpack_from("<I", self.meta_buf, self._gen_offset + (slot * 4))[0]
 
     def _set_generation(self, slot: int, gen: int) -> None:
-        struct.pack_into("<I", self.meta_buf, HEADER_SIZE + (slot * 4), gen)
+        struct.pack_into("<I", self.meta_buf, self._gen_offset + (slot * 4), gen)
+
+    def _get_slot_info(self, slot: int):
+        return struct.unpack_from(SLOT_INFO_FMT, self.meta_buf, self._slot_info_offset + (slot * SLOT_INFO_SIZE))
+
+    def _get_slot_time(self, slot: int):
+        return struct.unpack_from(SLOT_TIME_FMT, self.meta_buf, self._slot_time_offset + (slot * SLOT_TIME_SIZE))
+
+    def _load_generation(self, slot: int) -> int:
+        if self.seqlock:
+            return self._get_generation(slot)
+        with self._mutex:
+            return self._get_generation(slot)
+
+    def _latest_slot(self) -> int:
+        if not self.multi_writer:
+            return (self._get_write_index() - 1) % self.slot_count
+        committed = struct.unpack_from(LATEST_FMT, self.meta_buf, self._latest_offset)[0]
+        if committed and not self._get_generation(committed - 1) & SLOT_BUSY:
+            return committed - 1
+        # Reserved again since: the newest frame no writer is copying into.
+        newest = None
+        for slot in range(self.slot_count):
+            seq = self._get_slot_info(slot)[0]
+            if seq and not self._get_generation(slot) & SLOT_BUSY and (newest is None or seq > newest[0]):
+                newest = (seq, slot)
+        return newest[1] if newest is not None else (self._get_write_index() - 1) % self.slot_count
+
+    def _load_latest(self):
+        if self.seqlock:
+            idx = self._latest_slot()
+            return idx, self._get_generation(idx), self._get_payload_length(idx)
+        with self._mutex:
+            idx = self._latest_slot()
+            return idx, self._get_generation(idx), self._get_payload_length(idx)
 
     def _get_payload_length(self, slot: int) -> int:
         if not self._has_payload_lengths:
@@ -209,35 +872,502 @@ class ShmRing:
         except Exception:
             pass
 
-    def write(self, data):
+    def _inc_counter(self, metric_name: str, value: int = 1) -> None:
+        try:
+            import ivis_metrics
+            metric = getattr(ivis_metrics, metric_name, None)
+            if metric is not None:
+                metric.inc(int(value))
+        except Exception:
+            pass
+
+    # --- consumer table / leases -------------------------------------------
+
+    def _consumer_pos(self, consumer: int) -> int:
+        if consumer < 0 or consumer >= MAX_CONSUMERS:
+            raise ValueError(f"Invalid consumer id: {consumer}")
+        return self._consumer_offset + (consumer * CONSUMER_SIZE)
+
+    def _get_consumer(self, consumer: int):
+        """Returns ((name, pid, flags), (pin_slot, pin_gen, expiry_ms), (cursor_seq, lapped, cursor_ms))."""
+        pos = self._consumer_pos(consumer)
+        return (
+            struct.unpack_from(CONSUMER_ID_FMT, self.meta_buf, pos),
+            struct.unpack_from(CONSUMER_LEASE_FMT, self.meta_buf, pos + CONSUMER_LEASE_OFFSET),
+            struct.unpack_from(CONSUMER_CURSOR_FMT, self.meta_buf, pos + CONSUMER_CURSOR_OFFSET),
+        )
+
+    def _set_consumer_id(self, consumer: int, name: bytes, pid: int, flags: int = 0) -> None:
+        struct.pack_into(CONSUMER_ID_FMT, self.meta_buf, self._consumer_pos(consumer), name, pid, flags)
+
+    def _set_lease(self, consumer: int, pin_slot: int, pin_gen: int, expiry_ms: int) -> None:
+        struct.pack_into(
+            CONSUMER_LEASE_FMT, self.meta_buf, self._consumer_pos(consumer) + CONSUMER_LEASE_OFFSET, pin_slot, pin_gen, expiry_ms
+        )
+
+    def _set_cursor(self, consumer: int, seq: int, lapped: int, cursor_ms: int) -> None:
+        struct.pack_into(
+            CONSUMER_CURSOR_FMT, self.meta_buf, self._consumer_pos(consumer) + CONSUMER_CURSOR_OFFSET, seq, lapped, cursor_ms
+        )
+
+    def _reset_consumer(self, consumer: int, name: bytes, pid: int, flags: int = 0) -> None:
+        self._set_consumer_id(consumer, name, pid, flags)
+        self._set_lease(consumer, -1, 0, 0)
+        # New consumers start at the writer's current position (no backlog).
+        write_seq, last_ms = self._get_seq()
+        self._set_cursor(consumer, write_seq, 0, last_ms)
+
+    @staticmethod
+    def _encode_consumer_name(name: str) -> bytes:
+        raw = name.encode("utf-8")[:CONSUMER_NAME_SIZE]
+        if not raw:
+            raise ValueError("Consumer name must be non-empty")
+        return raw
+
+    @staticmethod
+    def _pid_alive(pid: int) -> bool:
+        if pid <= 0 or os.name == "nt":
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def register_consumer(self, name: str, lossless: bool = False) -> int:
+        """
+        Claims (or re-claims, by name) an entry in the meta consumer table and
+        returns its id. Entries of dead processes are recycled when the table is full.
+        A lossless consumer holds back a writer running the blocking policy.
+        """
+        raw = self._encode_consumer_name(name)
+        flags = CONSUMER_LOSSLESS if lossless else 0
+        with self._mutex:
+            free = None
+            stale = None
+            for i in range(MAX_CONSUMERS):
+                (entry_name, pid, _), _, _ = self._get_consumer(i)
+                entry_name = entry_name.rstrip(b"\0")
+                if entry_name == raw:
+                    self._reset_consumer(i, raw, os.getpid(), flags)
+                    return i
+                if not entry_name and free is None:
+                    free = i
+                elif entry_name and stale is None and not self._pid_alive(pid):
+                    stale = i
+            chosen = free if free is not None else stale
+            if chosen is None:
+                raise BackendInitializationError("Shared memory consumer table full")
+            self._reset_consumer(chosen, raw, os.getpid(), flags)
+        logger.debug("SHM consumer registered: name=%s id=%s", name, chosen)
+        return chosen
+
+    def unregister_consumer(self, consumer: int) -> None:
+        with self._mutex:
+            self._set_consumer_id(consumer, b"", 0)
+            self._set_lease(consumer, -1, 0, 0)
+            self._set_cursor(consumer, 0, 0, 0)
+        self._notify_release()
+
+    def pin(self, consumer: int, slot: int, gen: int, ttl_ms: Optional[int] = None) -> bool:
+        """
+        Leases (slot, gen) for `consumer` so write() skips it until unpin() or
+        lease expiry. Returns False if the slot no longer holds `gen`.
+        Each consumer holds at most one pin; pinning again replaces it.
+        """
+        if slot < 0 or slot >= self.slot_count:
+            return False
+        ttl = self.lease_ttl_ms if ttl_ms is None else max(1, int(ttl_ms))
+        expiry = int(time.monotonic() * 1000) + ttl
+        # Publish the pin first, then validate: the writer marks a slot busy
+        # before scanning pins, so one of the two sides always sees the other.
+        self._set_lease(consumer, slot, gen, expiry)
+        if self._get_generation(slot) != gen:
+            self._set_lease(consumer, -1, 0, 0)
+            return False
+        return True
+
+    def unpin(self, consumer: int) -> None:
+        self._set_lease(consumer, -1, 0, 0)
+
+    def _pinned_slots(self) -> set:
+        now_ms = int(time.monotonic() * 1000)
+        pinned = set()
+        for i in range(MAX_CONSUMERS):
+            _, (pin_slot, _, expiry), _ = self._get_consumer(i)
+            if pin_slot >= 0 and expiry > now_ms:
+                pinned.add(pin_slot)
+        return pinned
+
+    def advance(self, consumer: int, slot: int, gen: int) -> bool:
+        """
+        Moves `consumer`'s cursor to the frame (slot, gen) it just consumed.
+        Frames it skipped that had already left the ring count as lapped.
+        Returns False (and counts one lapped frame) if the slot was overwritten.
+        """
+        _, _, (cursor_seq, lapped, cursor_ms) = self._get_consumer(consumer)
+        if slot < 0 or slot >= self.slot_count:
+            return False
+        seq, write_ms = self._get_slot_info(slot)
+        if self._get_generation(slot) != gen:
+            self._set_cursor(consumer, cursor_seq, lapped + 1, cursor_ms)
+            return False
+        if seq <= cursor_seq:
+            return True
+        write_seq = self._get_seq()[0]
+        oldest_available = max(1, write_seq - self.slot_count + 1)
+        lapped += max(0, min(seq, oldest_available) - cursor_seq - 1)
+        self._set_cursor(consumer, seq, lapped, write_ms)
+        self._notify_release()
+        return True
+
+    def consumer_stats(self):
+        """Per-consumer lag (slots), lapped frame count and time behind the writer (ms)."""
+        write_seq, last_write_ms = self._get_seq()
+        stats = []
+        for i in range(MAX_CONSUMERS):
+            (name, pid, flags), (pin_slot, _, _), (cursor_seq, lapped, cursor_ms) = self._get_consumer(i)
+            name = name.rstrip(b"\0")
+            if not name:
+                continue
+            stats.append({
+                "consumer": name.decode("utf-8", "replace"),
+                "pid": pid,
+                "alive": self._pid_alive(pid),
+                "lag_slots": max(0, write_seq - cursor_seq),
+                "lapped": lapped,
+                "time_behind_ms": max(0, last_write_ms - cursor_ms),
+                "pinned_slot": pin_slot,
+                "lossless": bool(flags & CONSUMER_LOSSLESS),
+            })
+        return stats
+
+    def export_consumer_metrics(self):
+        """Publishes consumer_stats() as Prometheus gauges; returns the stats."""
+        stats = self.consumer_stats()
+        try:
+            import ivis_metrics
+            for entry in stats:
+                name = entry["consumer"]
+                ivis_metrics.shm_consumer_lag_slots.labels(consumer=name).set(entry["lag_slots"])
+                ivis_metrics.shm_consumer_lapped_frames.labels(consumer=name).set(entry["lapped"])
+                ivis_metrics.shm_consumer_time_behind_ms.labels(consumer=name).set(entry["time_behind_ms"])
+        except Exception:
+            pass
+        return stats
+
+    def _victim_seq(self, nbytes: int) -> int:
+        """Sequence of the newest committed frame the next write would destroy (0 = none)."""
+        slots = [self._get_write_index() % self.slot_count]
+        if self.arena:
+            slots += self._live_records(*self._arena_region(nbytes))
+        victim = 0
+        for slot in slots:
+            if self._get_generation(slot) & SLOT_BUSY or self._get_payload_length(slot) <= 0:
+                continue
+            victim = max(victim, self._get_slot_info(slot)[0])
+        return victim
+
+    def _blocking_consumer(self, victim_seq: int):
+        """Name of a live lossless consumer that has not consumed `victim_seq` yet, or None."""
+        if victim_seq <= 0:
+            return None
+        for i in range(MAX_CONSUMERS):
+            (name, pid, flags), _, (cursor_seq, _, _) = self._get_consumer(i)
+            if not (flags & CONSUMER_LOSSLESS) or not name.rstrip(b"\0"):
+                continue
+            if cursor_seq < victim_seq and self._pid_alive(pid):
+                return name.rstrip(b"\0").decode("utf-8", "replace")
+        return None
+
+    def _wait_for_space(self, nbytes: int) -> bool:
+        """
+        Blocking policy: sleeps on the release word until no lossless consumer
+        needs the slot the next write replaces. Returns False on timeout.
+        Called without the ring mutex; only consumers can change the outcome.
+        """
+        if self.write_policy != POLICY_BLOCKING:
+            return True
+        start = None
+        while True:
+            token = self._release_futex.load()
+            blocker = self._blocking_consumer(self._victim_seq(nbytes))
+            now = time.perf_counter()
+            if blocker is None:
+                if start is not None:
+                    self._record_latency("shm_backpressure_wait_ms", (now - start) * 1000.0)
+                return True
+            if start is None:
+                start = now
+                self._inc_counter("shm_backpressure_waits_total")
+                logger.debug("SHM writer blocked by consumer=%s", blocker)
+            wait_sec = 0.05
+            if self.block_timeout_ms > 0:
+                remaining = start + (self.block_timeout_ms / 1000.0) - now
+                if remaining <= 0:
+                    self._inc_counter("shm_backpressure_timeouts_total")
+                    logger.warning("SHM blocking write timed out on consumer=%s; overwriting", blocker)
+                    return False
+                wait_sec = min(wait_sec, remaining)
+            self._release_futex.wait(token, wait_sec)
+
+    def _claim_slot(self):
+        """
+        Picks the next slot to overwrite, skipping leased slots (caller holds
+        the mutex; it is released while waiting for a lease to end). Returns
+        (slot, previous generation word); the slot is left marked SLOT_BUSY.
+        """
+        deadline = None
+        while True:
+            start = self._get_write_index() % self.slot_count
+            pinned = self._pinned_slots()
+            slot = start
+            for _ in range(self.slot_count):
+                prev = self._get_generation(slot)
+                if slot in pinned or (self.multi_writer and prev & SLOT_BUSY):
+                    # Leased, or another writer is still copying into it.
+                    slot = (slot + 1) % self.slot_count
+                    continue
+                self._set_generation(slot, (prev & GEN_MASK) | SLOT_BUSY)
+                # A pin published since the scan either sees SLOT_BUSY and fails, or shows up here.
+                if slot not in self._pinned_slots():
+                    if slot != start:
+                        self._inc_counter("shm_pinned_slot_skips_total", (slot - start) % self.slot_count)
+                    return slot, prev
+                self._set_generation(slot, prev)
+                slot = (slot + 1) % self.slot_count
+            now = time.perf_counter()
+            if deadline is None:
+                deadline = now + (self.lease_stall_ms / 1000.0)
+            if now >= deadline:
+                break
+            # Readers and the other writers need the mutex to let go of slots.
+            self._mutex.__exit__(None, None, None)
+            try:
+                time.sleep(0.0005)
+            finally:
+                self._mutex.__enter__()
+        # Every slot is leased and the stall budget is spent: evict the oldest.
+        if self.multi_writer:
+            start = self._first_idle_slot(start)
+        self._inc_counter("shm_lease_evictions_total")
+        logger.debug("SHM all slots leased; overwriting slot=%s", start)
+        prev = self._get_generation(start)
+        self._set_generation(start, (prev & GEN_MASK) | SLOT_BUSY)
+        return start, prev
+
+    def _first_idle_slot(self, start: int) -> int:
+        """
+        First slot from `start` that no writer is copying into. Only waits when
+        there are more writes in flight than slots (caller holds the mutex; it
+        is released while waiting), for up to lease_stall_ms.
+        """
+        deadline = time.perf_counter() + (self.lease_stall_ms / 1000.0)
+        while True:
+            for step in range(self.slot_count):
+                slot = (start + step) % self.slot_count
+                if not self._get_generation(slot) & SLOT_BUSY:
+                    return slot
+            if time.perf_counter() >= deadline:
+                raise MemoryWriteError(f"Every SHM slot is being written ({self.slot_count} slots); ring too small for its writers")
+            # The other writers need the mutex to commit.
+            self._mutex.__exit__(None, None, None)
+            try:
+                time.sleep(0.0005)
+            finally:
+                self._mutex.__enter__()
+
+    def write(self, data, timestamp_ms: Optional[int] = None, pts: Optional[float] = None):
+        """
+        Copies `data` into the next slot. `timestamp_ms` (capture wall-clock ms,
+        default now) and `pts` feed the time index used by find_by_time().
+        """
         start_ts = time.perf_counter()
         view = memoryview(data)
         if view.ndim != 1:
             view = view.cast("B")
         payload_len = view.nbytes
-        if payload_len > self.slot_size:
-            raise ValueError(f"Invalid frame size: {payload_len} (expected <= {self.slot_size})")
+        if payload_len > self._max_payload:
+            raise ValueError(f"Invalid frame size: {payload_len} (expected <= {self._max_payload})")
         if not self._has_payload_lengths and payload_len != self.slot_size:
             raise ValueError(f"Invalid frame size: {payload_len} (expected {self.slot_size})")
-        with self._mutex:
-            slot = self._get_write_index() % self.slot_count
-            gen = (self._get_generation(slot) + 1) & 0xFFFFFFFF
-            start = slot * self.slot_size
-            end = start + payload_len
-            self.data_buf[start:end] = view
-            self._set_generation(slot, gen)
-            self._set_payload_length(slot, payload_len)
-            self._set_write_index(slot + 1)
+        self._wait_for_space(payload_len)
+        if self.multi_writer:
+            with self._mutex:
+                slot, gen, start, _ = self._begin_write(payload_len)
+            try:
+                self.data_buf[start:start + payload_len] = view
+            except BaseException:
+                with self._mutex:
+                    self._drop_write(slot, gen)
+                raise
+            with self._mutex:
+                self._end_write(slot, gen, payload_len, timestamp_ms, pts)
+        else:
+            with self._mutex:
+                slot, gen, start, _ = self._begin_write(payload_len)
+                end = start + payload_len
+                self.data_buf[start:end] = view
+                self._end_write(slot, gen, payload_len, timestamp_ms, pts)
         self._record_bytes(payload_len)
         self._record_latency("shm_write_latency_ms", (time.perf_counter() - start_ts) * 1000.0)
         logger.debug("SHM write: data_name=%s slot=%s gen=%s bytes=%s", self.data_name, slot, gen, payload_len)
         return slot, gen
 
+    def _begin_write(self, nbytes: int):
+        """Claims a slot for nbytes; returns (slot, gen, data offset, reserved bytes)."""
+        # Seqlock: the claimed slot is marked in-progress until _end_write().
+        slot, prev = self._claim_slot()
+        gen = ((prev & GEN_MASK) + 1) & GEN_MASK
+        self._set_generation(slot, gen | SLOT_BUSY)
+        if self.multi_writer:
+            # Reserve now so the next writer claims the following slot while
+            # this one is still copying.
+            self._set_write_index(slot + 1)
+        if not self.arena:
+            return slot, gen, slot * self.slot_size, self.slot_size
+        if self.multi_writer:
+            try:
+                offset, size = self._arena_region_idle(nbytes, slot)
+            except BaseException:
+                self._drop_write(slot, gen)
+                raise
+            # Peers choosing space see this reservation until _end_write() stores the real length.
+            self._set_payload_length(slot, size)
+        else:
+            offset, size = self._arena_region(nbytes)
+        self._evict_records(self._live_records(offset, size), slot)
+        self._set_slot_offset(slot, offset)
+        self._set_arena_head(offset + size)
+        return slot, gen, offset, size
+
+    def _end_write(
+        self,
+        slot: int,
+        gen: int,
+        payload_len: int,
+        timestamp_ms: Optional[int] = None,
+        pts: Optional[float] = None,
+    ) -> None:
+        seq = self._get_seq()[0] + 1
+        now_ms = int(time.monotonic() * 1000)
+        if timestamp_ms is None:
+            timestamp_ms = int(time.time() * 1000)
+        self._set_payload_length(slot, payload_len)
+        struct.pack_into(SLOT_INFO_FMT, self.meta_buf, self._slot_info_offset + (slot * SLOT_INFO_SIZE), seq, now_ms)
+        struct.pack_into(
+            SLOT_TIME_FMT,
+            self.meta_buf,
+            self._slot_time_offset + (slot * SLOT_TIME_SIZE),
+            int(timestamp_ms),
+            float(pts) if pts is not None else 0.0,
+        )
+        self._set_generation(slot, gen)
+        struct.pack_into(LATEST_FMT, self.meta_buf, self._latest_offset, slot + 1)
+        if not self.multi_writer:
+            self._set_write_index(slot + 1)
+        struct.pack_into(SEQ_FMT, self.meta_buf, HEADER_SIZE, seq, now_ms)
+        self._frame_futex.wake()
+
+    def _drop_write(self, slot: int, gen: int) -> None:
+        # The slot may be half-written: leave it committed under a generation
+        # nobody was handed (caller holds the mutex).
+        self._set_payload_length(slot, 0)
+        self._set_generation(slot, gen)
+
+    def write_seq(self) -> int:
+        """Number of frames committed so far (sequence of the newest frame)."""
+        return self._get_seq()[0]
+
+    def wait_for_frame(self, after_seq: int, timeout: float) -> int:
+        """
+        Blocks until a frame newer than `after_seq` is committed, or `timeout`
+        seconds pass. Returns the current write sequence (== after_seq on timeout).
+        Co-located readers wake on the writer's commit (futex) without polling.
+        """
+        deadline = time.perf_counter() + max(0.0, timeout)
+        while True:
+            token = self._frame_futex.load()
+            seq = self._get_seq()[0]
+            if seq != after_seq:
+                return seq
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return seq
+            self._frame_futex.wait(token, remaining)
+
+    def acquire_slot(self, shape=None, dtype="uint8"):
+        """
+        Write-in-place: claims the next slot and returns a writable numpy view of
+        it (e.g. for cv2.resize(..., dst=view)). The slot stays SLOT_BUSY until
+        commit() or abort(); the ring mutex is only held for the reservation, so
+        consumers and readers aren't held up while the frame is rendered.
+        Arena mode needs `shape` to size the record.
+        """
+        if self._pending is not None:
+            logger.warning("SHM acquire_slot with a pending slot; aborting slot=%s", self._pending[0])
+            self.abort()
+        if shape is not None:
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        elif self.arena:
+            raise ValueError("acquire_slot() needs a shape in arena mode")
+        else:
+            nbytes = self.slot_size
+        if nbytes > self._max_payload:
+            raise ValueError(f"Invalid frame size: {nbytes} (expected <= {self._max_payload})")
+        self._wait_for_space(nbytes)
+        with self._mutex:
+            slot, gen, start, reserved = self._begin_write(nbytes)
+            try:
+                arr = np.frombuffer(self.data_buf, dtype=np.uint8, count=min(reserved, self._capacity - start), offset=start)
+                if np.dtype(dtype) != np.uint8:
+                    arr = arr.view(dtype)
+                if shape is not None:
+                    arr = arr[: int(np.prod(shape))].reshape(shape)
+            except BaseException:
+                self._drop_write(slot, gen)
+                raise
+        self._pending = (slot, gen, time.perf_counter(), arr.nbytes, nbytes if self.arena else self.slot_size)
+        return arr
+
+    def commit(self, nbytes: Optional[int] = None, timestamp_ms: Optional[int] = None, pts: Optional[float] = None):
+        """Publishes the slot handed out by acquire_slot(). Returns (slot, gen)."""
+        if self._pending is None:
+            raise RuntimeError("commit() without acquire_slot()")
+        slot, gen, start_ts, view_bytes, limit = self._pending
+        payload_len = view_bytes if nbytes is None else int(nbytes)
+        if payload_len <= 0 or payload_len > limit:
+            self.abort()
+            raise ValueError(f"Invalid frame size: {payload_len} (expected <= {limit})")
+        try:
+            with self._mutex:
+                self._end_write(slot, gen, payload_len, timestamp_ms, pts)
+        finally:
+            self._pending = None
+        self._record_bytes(payload_len)
+        self._record_latency("shm_write_latency_ms", (time.perf_counter() - start_ts) * 1000.0)
+        logger.debug("SHM commit: data_name=%s slot=%s gen=%s bytes=%s", self.data_name, slot, gen, payload_len)
+        return slot, gen
+
+    def abort(self) -> None:
+        """Releases an acquired slot without publishing it (contents are discarded)."""
+        if self._pending is None:
+            return
+        slot, gen = self._pending[:2]
+        try:
+            with self._mutex:
+                # Don't advance the write index (single writer).
+                self._drop_write(slot, gen)
+        finally:
+            self._pending = None
+
     def read(self, slot: int, gen: int, retries: int = 3):
         """
         Reads data from the specified slot securely using optimistic concurrency control.
         If the generation changes during the read (indicating a write occurred),
-        it retries up to `retries` times.
+        it retries up to `retries` times. In seqlock mode no lock is taken.
         """
         start_ts = time.perf_counter()
         if slot < 0 or slot >= self.slot_count:
@@ -245,18 +1375,10 @@ class ShmRing:
 
         # Try to read, retry if torn
         for _ in range(retries):
-            # 1. Pre-check: Verify generation matches request
-            # We don't need the mutex for reading if we use optimistic concurrency,
-            # but we use it here to ensure we don't read completely garbage pointers if resizing.
-            # However, for pure data consistency, the generation check is key.
-            # Ideally, we read without lock for speed, but Python's shm access is safe enough.
-            # We will use the mutex for metadata consistency but minimize holding it during copy if possible.
-            # CAUTION: For maximum speed we might avoid mutex during copy, but let's stick to
-            # the design: The mutex primarily protects metadata. The data buffer is just memory.
-            
-            with self._mutex:
-                current_before = self._get_generation(slot)
-            
+            # 1. Pre-check: the generation word must match the request. A slot
+            # that is being rewritten carries SLOT_BUSY and never matches.
+            current_before = self._load_generation(slot)
+
             if current_before != gen:
                 # Slot has already been overwritten before we started
                 logger.debug(
@@ -269,14 +1391,11 @@ class ShmRing:
 
             # 2. Copy data
             # We calculate offsets. Note: The data might be changing RIGHT NOW.
-            start = slot * self.slot_size
             # We must read the payload length carefully.
             # If payload length is being updated, we might get a wrong value.
             # But the generation check after will catch this.
-            payload_len = self._get_payload_length(slot)
-            if payload_len <= 0 or payload_len > self.slot_size:
-                payload_len = self.slot_size
-            
+            start, payload_len = self._slot_span(slot)
+
             end = start + payload_len
             # Validating bounds just in case
             if end > len(self.data_buf):
@@ -288,8 +1407,7 @@ class ShmRing:
             data = bytes(self.data_buf[start:end])
 
             # 3. Post-check: Verify generation hasn't changed
-            with self._mutex:
-                current_after = self._get_generation(slot)
+            current_after = self._load_generation(slot)
 
             if current_before == current_after:
                 # Success! Consistent read.
@@ -312,26 +1430,20 @@ class ShmRing:
         start_ts = time.perf_counter()
         
         for _ in range(retries):
-            with self._mutex:
-                # Find the latest written index
-                write_idx = self._get_write_index()
-                # The latest complete frame is at write_idx - 1
-                idx = (write_idx - 1) % self.slot_count
-                gen = self._get_generation(idx)
-                payload_len = self._get_payload_length(idx)
-
-            if payload_len <= 0 or payload_len > self.slot_size:
-                payload_len = self.slot_size
-                
-            start = idx * self.slot_size
+            # The latest complete frame is at write_idx - 1
+            idx, gen, payload_len = self._load_latest()
+            if gen & SLOT_BUSY:
+                logger.debug("SHM read_latest slot busy (retry): slot=%s", idx)
+                continue
+
+            start, payload_len = self._slot_span(idx)
             end = start + payload_len
 
             # buffer copy
             data = bytes(self.data_buf[start:end])
 
             # Verify it's still the same frame
-            with self._mutex:
-                gen_after = self._get_generation(idx)
+            gen_after = self._load_generation(idx)
             
             if gen == gen_after:
                 logger.debug("SHM read_latest success: slot=%s gen=%s bytes=%s", idx, gen, len(data))
@@ -344,10 +1456,208 @@ class ShmRing:
         
         return None, -1, 0
 
+    def _time_at(self, slot: int):
+        """(timestamp_ms, pts, gen) of a committed slot, or None (empty, evicted or being rewritten)."""
+        gen = self._load_generation(slot)
+        if gen & SLOT_BUSY or self._get_slot_info(slot)[0] == 0 or self._get_payload_length(slot) <= 0:
+            return None
+        timestamp_ms, pts = self._get_slot_time(slot)
+        if self._load_generation(slot) != gen:
+            return None
+        return timestamp_ms, pts, gen
+
+    def _scan_time(self, oldest: int, start: int, stop: int, step: int):
+        """First committed (position, entry) from `start` towards `stop` (exclusive); positions count from `oldest`."""
+        for pos in range(start, stop, step):
+            entry = self._time_at((oldest + pos) % self.slot_count)
+            if entry is not None:
+                return pos, entry
+        return None, None
+
+    def find_by_time(self, timestamp_ms: int, tolerance_ms: Optional[int] = None):
+        """
+        Frame captured closest to `timestamp_ms`: (slot, gen, timestamp_ms, pts),
+        or None if the ring is empty or the nearest frame is further than
+        `tolerance_ms` away. Binary search over the ring in commit order
+        (oldest slot first), so O(log slot_count); holes (empty, evicted,
+        dropped or half-written slots) are stepped over. If the timestamps it
+        looked at are out of order (a clock step, writers committing out of
+        order) it falls back to a linear scan. Read the frame with read*(slot, gen).
+        """
+        n = self.slot_count
+        oldest = self._get_write_index() % n
+        lo, hi = 0, n
+        probes = {}
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos, entry = self._scan_time(oldest, mid, hi, 1)
+            if entry is not None:
+                probes[pos] = entry[0]
+            if entry is not None and entry[0] < timestamp_ms:
+                lo = pos + 1
+            else:
+                # At or past the target, or only holes up to hi
+                hi = mid
+        before_pos, before = self._scan_time(oldest, lo - 1, -1, -1)
+        after_pos, after = self._scan_time(oldest, lo, n, 1)
+        candidates = []
+        for pos, entry in ((before_pos, before), (after_pos, after)):
+            if entry is not None:
+                probes[pos] = entry[0]
+                candidates.append(((oldest + pos) % n, entry))
+        ordered = [probes[pos] for pos in sorted(probes)]
+        if (
+            any(a > b for a, b in zip(ordered, ordered[1:]))
+            or (before is not None and before[0] >= timestamp_ms)
+            or (after is not None and after[0] < timestamp_ms)
+        ):
+            self._inc_counter("shm_find_by_time_scans_total")
+            candidates = [(slot, entry) for slot, entry in ((slot, self._time_at(slot)) for slot in range(n)) if entry is not None]
+        best = None
+        for slot, entry in candidates:
+            delta = abs(entry[0] - timestamp_ms)
+            if best is None or delta < best[0]:
+                best = (delta, (slot, entry[2], entry[0], entry[1]))
+        if best is None or (tolerance_ms is not None and best[0] > tolerance_ms):
+            return None
+        return best[1]
+
+    def frames(self):
+        """
+        Committed frames still in the ring, oldest first, as
+        (slot, gen, seq, timestamp_ms, pts). Used to replay a ring, e.g. a
+        file-backed one left behind by a crashed writer.
+        """
+        found = []
+        for slot in range(self.slot_count):
+            entry = self._time_at(slot)
+            if entry is None:
+                continue
+            seq = self._get_slot_info(slot)[0]
+            found.append((seq, slot, entry))
+        found.sort()
+        return [(slot, gen, seq, timestamp_ms, pts) for seq, slot, (timestamp_ms, pts, gen) in found]
+
+    @staticmethod
+    def stored_layout(meta_name: str):
+        """(slot_size, slot_count) recorded in an existing meta segment (shm name or file path)."""
+        if os.path.isabs(meta_name):
+            meta = _FileSegment(meta_name, create=False)
+        else:
+            meta = shared_memory.SharedMemory(name=meta_name, create=False)
+        try:
+            magic, version, slot_size, slot_count, _ = struct.unpack_from(HEADER_FMT, meta.buf, 0)
+        finally:
+            meta.close()
+        if magic != MAGIC or version != VERSION:
+            raise BackendInitializationError("Shared memory header mismatch")
+        return slot_size, slot_count
+
+    def is_valid(self, slot: int, gen: int) -> bool:
+        """True while `slot` still holds generation `gen` (committed, not being rewritten)."""
+        if slot < 0 or slot >= self.slot_count:
+            return False
+        return self._load_generation(slot) == gen
+
+    def _slot_span(self, slot: int):
+        start = self._slot_offset(slot)
+        if start >= self._capacity:
+            start = 0
+        payload_len = self._get_payload_length(slot)
+        if payload_len <= 0 or payload_len > self._max_payload:
+            payload_len = self._max_payload
+        return start, min(payload_len, self._capacity - start)
+
+    def _sub_span(self, slot: int, offset: int = 0, length: Optional[int] = None):
+        """(start, nbytes) of `length` bytes at `offset` inside the slot payload, or None if out of range."""
+        start, payload_len = self._slot_span(slot)
+        if offset == 0 and length is None:
+            return start, payload_len
+        if length is None:
+            length = payload_len - offset
+        if offset < 0 or length < 0 or offset + length > payload_len:
+            return None
+        return start + offset, length
+
+    def read_view(self, slot: int, gen: int, shape=None, dtype="uint8", offset: int = 0, length: Optional[int] = None):
+        """
+        Zero-copy read: returns a read-only numpy view backed by the shared segment.
+        The view is only meaningful while is_valid(slot, gen) holds; consumers must
+        re-check after they are done with it and discard their work if lapped.
+        `offset`/`length` select part of the payload (e.g. one rendition).
+        """
+        if slot < 0 or slot >= self.slot_count:
+            return None
+        if self._load_generation(slot) != gen:
+            logger.debug("SHM read_view miss: slot=%s expected_gen=%s", slot, gen)
+            return None
+        span = self._sub_span(slot, offset, length)
+        if span is None:
+            return None
+        start, payload_len = span
+        arr = np.frombuffer(self.data_buf, dtype=np.uint8, count=payload_len, offset=start)
+        if np.dtype(dtype) != np.uint8:
+            arr = arr.view(dtype)
+        if shape is not None:
+            arr = arr.reshape(shape)
+        arr.flags.writeable = False
+        if self._load_generation(slot) != gen:
+            return None
+        return arr
+
+    def _copy_into(self, slot: int, gen: int, dst, retries: int, offset: int = 0, length: Optional[int] = None):
+        for _ in range(retries):
+            if self._load_generation(slot) != gen:
+                return None
+            span = self._sub_span(slot, offset, length)
+            if span is None:
+                return None
+            start, payload_len = span
+            if payload_len > dst.nbytes:
+                raise ValueError(f"Output buffer too small: {dst.nbytes} < {payload_len}")
+            dst[:payload_len] = self.data_buf[start:start + payload_len]
+            if self._load_generation(slot) == gen:
+                self._record_bytes(payload_len)
+                return payload_len
+            logger.debug("SHM torn read_into detected (retry): slot=%s gen=%s", slot, gen)
+        return None
+
+    def read_into(self, slot: int, gen: int, out, retries: int = 3, offset: int = 0, length: Optional[int] = None):
+        """
+        Copies the slot payload (or `length` bytes at `offset`) into a
+        caller-owned writable buffer (e.g. a preallocated numpy array).
+        Returns the number of bytes copied, or None on a miss / torn read.
+        """
+        start_ts = time.perf_counter()
+        if slot < 0 or slot >= self.slot_count:
+            return None
+        dst = memoryview(out).cast("B")
+        copied = self._copy_into(slot, gen, dst, retries, offset, length)
+        if copied is not None:
+            self._record_latency("shm_read_latency_ms", (time.perf_counter() - start_ts) * 1000.0)
+        return copied
+
+    def read_latest_into(self, out, retries: int = 3, offset: int = 0, length: Optional[int] = None):
+        """Like read_latest() but fills `out`. Returns (bytes_copied, slot, gen)."""
+        start_ts = time.perf_counter()
+        dst = memoryview(out).cast("B")
+        for _ in range(retries):
+            idx, gen, _ = self._load_latest()
+            if gen & SLOT_BUSY:
+                continue
+            copied = self._copy_into(idx, gen, dst, 1, offset, length)
+            if copied is not None:
+                self._record_latency("shm_read_latency_ms", (time.perf_counter() - start_ts) * 1000.0)
+                return copied, idx, gen
+        return None, -1, 0
+
     def close(self):
         self.close_unlink(unlink=False)
 
     def close_unlink(self, unlink: bool = False):
+        for futex in (getattr(self, "_release_futex", None), getattr(self, "_frame_futex", None)):
+            if futex is not None:
+                futex.close()
         try:
             self.data.close()
         except Exception:
@@ -368,10 +1678,16 @@ class ShmRing:
 
     @staticmethod
     def exists(data_name: str, meta_name: str) -> bool:
+        if os.path.isabs(data_name):
+            return os.path.exists(data_name) and os.path.exists(meta_name)
         data = None
         meta = None
         try:
-            data = shared_memory.SharedMemory(name=data_name, create=False)
+            try:
+                data = shared_memory.SharedMemory(name=data_name, create=False)
+            except FileNotFoundError:
+                if not os.path.exists(os.path.join(HUGEPAGE_DIR, data_name)):
+                    raise
             meta = shared_memory.SharedMemory(name=meta_name, create=False)
             return True
         except FileNotFoundError:
@@ -388,6 +1704,26 @@ class ShmRing:
                 except Exception:
                     pass
 
+    @staticmethod
+    def remove(data_name: str, meta_name: str, hugepage_dir: Optional[str] = None) -> None:
+        """Unlinks a ring's segments (shm name or file path); missing ones are skipped."""
+        if os.path.isabs(data_name):
+            paths = [data_name, meta_name]
+        else:
+            paths = [os.path.join(hugepage_dir or HUGEPAGE_DIR, data_name)]
+            for name in (data_name, meta_name):
+                try:
+                    segment = shared_memory.SharedMemory(name=name, create=False)
+                except FileNotFoundError:
+                    continue
+                segment.close()
+                segment.unlink()
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+
     def _warn_existing(self) -> None:
         logger.warning("Existing shared memory detected: %s, %s", self.data_name, self.meta_name)
 
@@ -337,7 +337,8 @@ def main(argv=None):
     env_detection["BUS_TRANSPORT"] = args.bus
     env_detection["ZMQ_SUB_ENDPOINT"] = env_ingestion.get("ZMQ_PUB_ENDPOINT", "tcp://localhost:5555")
     env_detection["ZMQ_RESULTS_PUB_ENDPOINT"] = "tcp://localhost:5557"
-    env_detection["MEMORY_BACKEND"] = "shm"
+    env_detection["MEMORY_BACKEND"] = env_ingestion["MEMORY_BACKEND"]
+    env_detection["MMAP_DIR"] = env_ingestion.get("MMAP_DIR", "/dev/shm/ivis")
     env_detection["SHM_OWNER"] = "0"
     env_detection["SHM_NAME"] = env_ingestion["SHM_NAME"]
     env_detection["SHM_META_NAME"] = env_ingestion["SHM_META_NAME"]
@@ -372,6 +373,8 @@ def main(argv=None):
     env_ui["ZMQ_SUB_ENDPOINT"] = env_ingestion.get("ZMQ_PUB_ENDPOINT", "tcp://localhost:5555")
     env_ui["ZMQ_RESULTS_SUB_ENDPOINT"] = env_detection.get("ZMQ_RESULTS_PUB_ENDPOINT", "tcp://localhost:5557")
     env_ui["SHM_OWNER"] = "0"
+    env_ui["MEMORY_BACKEND"] = env_ingestion["MEMORY_BACKEND"]
+    env_ui["MMAP_DIR"] = env_ingestion.get("MMAP_DIR", "/dev/shm/ivis")
     env_ui["STREAM_ID"] = env_ingestion["STREAM_ID"]
     env_ui["CAMERA_ID"] = env_ingestion["CAMERA_ID"]
     env_ui["SHM_NAME"] = env_ingestion["SHM_NAME"]
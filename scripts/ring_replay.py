@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Dumps the frames left in an IVIS ring, oldest first, for post-mortem analysis
+(e.g. the file-backed ring of a crashed ingestion process, MEMORY_BACKEND=mmap).
+
+Usage:
+  python scripts/ring_replay.py <data_name_or_path> <meta_name_or_path> <out_dir>
+      [--width W --height H [--pixel-format bgr|nv12|i420]]
+
+Writes index.json (slot, gen, seq, timestamp_ms, pts, file per frame) and one
+file per frame: raw payload bytes, or a JPEG of the primary frame when the
+geometry is given.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+from memory.shm_ring import ShmRing
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Dump the frames still held by an IVIS ring.")
+    parser.add_argument("data_name")
+    parser.add_argument("meta_name")
+    parser.add_argument("out_dir")
+    parser.add_argument("--width", type=int, default=0)
+    parser.add_argument("--height", type=int, default=0)
+    parser.add_argument("--pixel-format", default="bgr")
+    args = parser.parse_args(argv[1:])
+
+    try:
+        slot_size, slot_count = ShmRing.stored_layout(args.meta_name)
+    except FileNotFoundError:
+        print(f"[RING] Not found: {args.meta_name}")
+        return 1
+    except Exception as exc:
+        print(f"[RING] Unreadable meta segment {args.meta_name}: {exc}")
+        return 1
+    ring = ShmRing(args.data_name, args.meta_name, slot_size, slot_count, create=False)
+    encode = None
+    if args.width and args.height:
+        import cv2
+
+        from ivis.common.pixel_format import frame_nbytes, normalize_pixel_format, to_bgr
+
+        fmt = normalize_pixel_format(args.pixel_format)
+        primary = frame_nbytes(args.width, args.height, fmt)
+
+        def encode(data):
+            frame = to_bgr(data[:primary], args.width, args.height, fmt)
+            ok, jpeg = cv2.imencode(".jpg", frame)
+            return jpeg.tobytes() if ok else None
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    index = []
+    try:
+        for slot, gen, seq, timestamp_ms, pts in ring.frames():
+            data = ring.read(slot, gen)
+            if data is None:
+                continue
+            payload, ext = (encode(data), "jpg") if encode is not None else (data, "bin")
+            if payload is None:
+                continue
+            name = f"{seq:012d}.{ext}"
+            with open(os.path.join(args.out_dir, name), "wb") as fh:
+                fh.write(payload)
+            index.append({"slot": slot, "gen": gen, "seq": seq, "timestamp_ms": timestamp_ms, "pts": pts, "file": name})
+    finally:
+        ring.close()
+    with open(os.path.join(args.out_dir, "index.json"), "w", encoding="utf-8") as fh:
+        json.dump({"slot_size": slot_size, "slot_count": slot_count, "frames": index}, fh, indent=2)
+    print(f"[RING] Dumped {len(index)} frames to {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
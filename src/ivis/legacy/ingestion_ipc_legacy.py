@@ -12,9 +12,10 @@ class SocketPublisher:
     def __init__(self, config, host="localhost", port=5555):
         self.stream_id = config.stream_id
         self.camera_id = config.camera_id
-        self.frame_width = config.frame_width
-        self.frame_height = config.frame_height
+        # Ring frame size (the ROI crop with ROI_MODE=crop)
+        self.frame_width, self.frame_height = getattr(config, "output_resolution", (config.frame_width, config.frame_height))
         self.frame_color = config.frame_color
+        self.pixel_format = getattr(config, "shm_pixel_format", "bgr")
         self.address = (host, port)
         self.sock = None
         self._connect()
@@ -40,6 +41,7 @@ class SocketPublisher:
             self.frame_height,
             self.frame_color,
             roi_meta=roi_meta,
+            pixel_format=self.pixel_format,
         )
         payload = json.dumps(contract) + "\n"
 
@@ -63,9 +65,10 @@ class ZmqPublisher:
 
         self.stream_id = config.stream_id
         self.camera_id = config.camera_id
-        self.frame_width = config.frame_width
-        self.frame_height = config.frame_height
+        # Ring frame size (the ROI crop with ROI_MODE=crop)
+        self.frame_width, self.frame_height = getattr(config, "output_resolution", (config.frame_width, config.frame_height))
         self.frame_color = config.frame_color
+        self.pixel_format = getattr(config, "shm_pixel_format", "bgr")
         self.endpoint = endpoint
         self.zmq = zmq
         self.socket = self.zmq.Context.instance().socket(self.zmq.PUB)
@@ -85,6 +88,7 @@ class ZmqPublisher:
             self.frame_height,
             self.frame_color,
             roi_meta=roi_meta,
+            pixel_format=self.pixel_format,
         )
         payload = json.dumps(contract).encode("utf-8")
         self.socket.send(payload)
@@ -102,6 +106,7 @@ def _build_contract(
     frame_height,
     frame_color,
     roi_meta=None,
+    pixel_format="bgr",
 ):
     backend = getattr(memory_ref, "backend_type", "shm_ring_v1")
     memory = FrameMemoryRef(
@@ -110,7 +115,8 @@ def _build_contract(
         size=memory_ref.size,
         generation=gen,
     )
-    output_color = "bgr"
+    # Frames are bgr, or compact nv12/i420 when SHM_PIXEL_FORMAT asks for it.
+    output_color = pixel_format or "bgr"
     contract = FrameContractV1(
         contract_version="v1",
         frame_id=frame_identity.frame_id,
@@ -127,6 +133,12 @@ def _build_contract(
         frame_color_space=output_color,
     )
     payload = contract.to_dict()
+    segment = getattr(memory_ref, "segment", None)
+    if segment:
+        payload["memory"]["segment"] = segment
+    renditions = getattr(memory_ref, "renditions", None)
+    if renditions:
+        payload["memory"]["renditions"] = renditions
     if roi_meta:
         payload["roi"] = roi_meta
     return payload
@@ -0,0 +1,101 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import logging
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from memory.shm_ring import ShmRing
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger("bench_shm_read")
+
+SHM_NAME = "bench_read_shm"
+SHM_META = "bench_read_meta"
+
+
+def writer_process(slot_size, slot_count, fps, stop_event):
+    ring = ShmRing(SHM_NAME, SHM_META, slot_size, slot_count, create=False)
+    payload = bytes(slot_size)
+    interval = 1.0 / fps if fps > 0 else 0.0
+    try:
+        while not stop_event.is_set():
+            ring.write(payload)
+            if interval:
+                time.sleep(interval)
+    finally:
+        ring.close()
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round((pct / 100.0) * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def bench_mode(seqlock, slot_size, slot_count, iterations):
+    ring = ShmRing(SHM_NAME, SHM_META, slot_size, slot_count, create=False, seqlock=seqlock)
+    samples = []
+    misses = 0
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            data, _, _ = ring.read_latest()
+            samples.append((time.perf_counter() - start) * 1e6)
+            if data is None:
+                misses += 1
+    finally:
+        ring.close()
+    return {
+        "mode": "seqlock" if seqlock else "mutex",
+        "p50_us": _percentile(samples, 50),
+        "p99_us": _percentile(samples, 99),
+        "mean_us": sum(samples) / max(1, len(samples)),
+        "misses": misses,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare ShmRing read latency with and without the read mutex.")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--writer-fps", type=float, default=30.0, help="0 disables the concurrent writer")
+    args = parser.parse_args(argv)
+
+    slot_size = args.width * args.height * 3
+    owner = ShmRing(SHM_NAME, SHM_META, slot_size, args.slots, create=True, recreate_on_mismatch=True)
+    owner.write(bytes(slot_size))
+
+    stop_event = multiprocessing.Event()
+    p_writer = None
+    if args.writer_fps > 0:
+        p_writer = multiprocessing.Process(
+            target=writer_process, args=(slot_size, args.slots, args.writer_fps, stop_event)
+        )
+        p_writer.start()
+
+    try:
+        for seqlock in (False, True):
+            res = bench_mode(seqlock, slot_size, args.slots, args.iterations)
+            logger.info(
+                "%-7s p50=%.1fus p99=%.1fus mean=%.1fus misses=%s",
+                res["mode"], res["p50_us"], res["p99_us"], res["mean_us"], res["misses"],
+            )
+    finally:
+        stop_event.set()
+        if p_writer is not None:
+            p_writer.join()
+        owner.close_unlink(True)
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    raise SystemExit(main())
@@ -0,0 +1,278 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import logging
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from memory.shm_ring import ShmRing, file_ring_names
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger("bench_shm_ring")
+
+SHM_NAME = "bench_ring_shm"
+SHM_META = "bench_ring_meta"
+BASELINE_VERSION = 1
+
+SIZES = {
+    "vga": (640, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+# seqlock=True reads validate the generation word only; "mutex" takes the ring
+# lock for every metadata read (the pre-seqlock behaviour).
+MODES = {"seqlock": True, "mutex": False}
+READ_OPS = ("read_latest", "read", "read_into")
+# Metrics compared against a baseline, and which direction is a regression.
+LOWER_IS_BETTER = ("p50_us", "p90_us", "p99_us", "miss_rate")
+HIGHER_IS_BETTER = ("gb_per_s",)
+
+
+def _summary(samples_us, nbytes, misses, wall_sec):
+    """Latency percentiles (µs) of the successful calls, miss rate and GB/s copied over the wall time."""
+    arr = np.asarray(samples_us, dtype=np.float64)
+    calls = len(arr) + misses
+    return {
+        "calls": calls,
+        "p50_us": float(np.percentile(arr, 50)) if len(arr) else 0.0,
+        "p90_us": float(np.percentile(arr, 90)) if len(arr) else 0.0,
+        "p99_us": float(np.percentile(arr, 99)) if len(arr) else 0.0,
+        "max_us": float(arr.max()) if len(arr) else 0.0,
+        "miss_rate": misses / calls if calls else 0.0,
+        "gb_per_s": nbytes / wall_sec / 1e9 if wall_sec > 0 else 0.0,
+    }
+
+
+def writer_process(names, slot_size, slot_count, seqlock, fps, start_event, stop_event, results):
+    ring = ShmRing(*names, slot_size, slot_count, create=False, seqlock=seqlock)
+    frame = np.full(slot_size, 1, dtype=np.uint8)
+    interval = 1.0 / fps if fps > 0 else 0.0
+    samples = []
+    try:
+        start_event.wait()
+        began = time.perf_counter()
+        while not stop_event.is_set():
+            frame[0] = frame[-1] = len(samples) % 251
+            t0 = time.perf_counter()
+            ring.write(frame)
+            samples.append((time.perf_counter() - t0) * 1e6)
+            if interval:
+                time.sleep(interval)
+        wall = time.perf_counter() - began
+    finally:
+        ring.close()
+    results.put(("write", _summary(samples, len(samples) * slot_size, 0, wall)))
+
+
+def reader_process(names, slot_size, slot_count, seqlock, start_event, stop_event, results):
+    """
+    One iteration = read_latest, then read and read_into of the same frame.
+    Every call gets a single attempt (retries=1), so a miss is exactly one
+    torn or lapped read that the default retry loop would have repeated.
+    """
+    ring = ShmRing(*names, slot_size, slot_count, create=False, seqlock=seqlock)
+    out = np.empty(slot_size, dtype=np.uint8)
+    samples = {op: [] for op in READ_OPS}
+    misses = {op: 0 for op in READ_OPS}
+    nbytes = {op: 0 for op in READ_OPS}
+    try:
+        start_event.wait()
+        began = time.perf_counter()
+        while not stop_event.is_set():
+            t0 = time.perf_counter()
+            data, slot, gen = ring.read_latest(retries=1)
+            t1 = time.perf_counter()
+            if data is None:
+                misses["read_latest"] += 1
+                continue
+            samples["read_latest"].append((t1 - t0) * 1e6)
+            nbytes["read_latest"] += len(data)
+
+            t0 = time.perf_counter()
+            data = ring.read(slot, gen, retries=1)
+            t1 = time.perf_counter()
+            if data is None:
+                misses["read"] += 1
+            else:
+                samples["read"].append((t1 - t0) * 1e6)
+                nbytes["read"] += len(data)
+
+            t0 = time.perf_counter()
+            copied = ring.read_into(slot, gen, out, retries=1)
+            t1 = time.perf_counter()
+            if not copied:
+                misses["read_into"] += 1
+            else:
+                samples["read_into"].append((t1 - t0) * 1e6)
+                nbytes["read_into"] += copied
+        wall = time.perf_counter() - began
+    finally:
+        ring.close()
+    results.put(("read", {op: (samples[op], nbytes[op], misses[op], wall) for op in READ_OPS}))
+
+
+def run_scenario(names, size_name, readers, mode, slot_count, duration, writer_fps):
+    width, height = SIZES[size_name]
+    slot_size = width * height * 3
+    seqlock = MODES[mode]
+    owner = ShmRing(*names, slot_size, slot_count, create=True, recreate_on_mismatch=True)
+    owner.write(bytes(slot_size))
+    start_event = multiprocessing.Event()
+    stop_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(
+            target=writer_process, args=(names, slot_size, slot_count, seqlock, writer_fps, start_event, stop_event, results)
+        )
+    ]
+    procs += [
+        multiprocessing.Process(target=reader_process, args=(names, slot_size, slot_count, seqlock, start_event, stop_event, results))
+        for _ in range(readers)
+    ]
+    try:
+        for proc in procs:
+            proc.start()
+        time.sleep(0.3)
+        start_event.set()
+        time.sleep(duration)
+        stop_event.set()
+        collected = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+    finally:
+        owner.close_unlink(True)
+
+    scenario = {}
+    per_op = {op: ([], 0, 0, 0.0) for op in READ_OPS}
+    for kind, payload in collected:
+        if kind == "write":
+            scenario["write"] = payload
+            continue
+        for op, (samples, nbytes, misses, wall) in payload.items():
+            acc = per_op[op]
+            # Readers run concurrently: bytes add up, wall time does not.
+            per_op[op] = (acc[0] + samples, acc[1] + nbytes, acc[2] + misses, max(acc[3], wall))
+    if readers:
+        for op, (samples, nbytes, misses, wall) in per_op.items():
+            scenario[op] = _summary(samples, nbytes, misses, wall)
+    return scenario
+
+
+def run_suite(names, sizes, reader_counts, modes, slot_count, duration, writer_fps):
+    results = {}
+    for size_name in sizes:
+        for mode in modes:
+            for readers in reader_counts:
+                key = f"{size_name}/{mode}/readers={readers}"
+                scenario = run_scenario(names, size_name, readers, mode, slot_count, duration, writer_fps)
+                for op, metrics in scenario.items():
+                    results[f"{key}/{op}"] = metrics
+                    logger.info(
+                        "%-34s %-11s p50=%8.1fus p99=%8.1fus miss=%6.2f%% %6.2f GB/s",
+                        key,
+                        op,
+                        metrics["p50_us"],
+                        metrics["p99_us"],
+                        metrics["miss_rate"] * 100.0,
+                        metrics["gb_per_s"],
+                    )
+    return results
+
+
+def compare(baseline, current, threshold_pct):
+    """Regressions beyond `threshold_pct` between two result dicts, as printable lines."""
+    regressions = []
+    for key in sorted(set(baseline) & set(current)):
+        old, new = baseline[key], current[key]
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            before, after = old.get(metric), new.get(metric)
+            if before is None or after is None:
+                continue
+            if metric == "miss_rate":
+                # Absolute percentage points: rates near zero make relative changes meaningless.
+                delta = (after - before) * 100.0
+            elif before > 0:
+                delta = (after - before) / before * 100.0
+            else:
+                continue
+            worse = delta > threshold_pct if metric in LOWER_IS_BETTER else delta < -threshold_pct
+            unit = "pp" if metric == "miss_rate" else "%"
+            line = f"{key:<44} {metric:<9} {before:12.3f} -> {after:12.3f} ({delta:+.1f}{unit})"
+            logger.info("%s%s", "REGRESSION " if worse else "", line)
+            if worse:
+                regressions.append(line)
+    missing = sorted(set(baseline) - set(current))
+    if missing:
+        logger.info("Not measured in this run: %s", ", ".join(missing))
+    return regressions
+
+
+def _environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ShmRing microbenchmarks with JSON baselines.")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"comma-separated subset of {','.join(SIZES)}")
+    parser.add_argument("--readers", default="0,1,2,4", help="comma-separated reader process counts")
+    parser.add_argument("--modes", default=",".join(MODES), help="seqlock (lock-free reads) and/or mutex")
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per scenario")
+    parser.add_argument("--writer-fps", type=float, default=0.0, help="0 writes as fast as possible")
+    parser.add_argument("--mmap-dir", help="benchmark a file-backed ring in this directory (MEMORY_BACKEND=mmap)")
+    parser.add_argument("--save", help="write the results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="baseline JSON to compare against (exit 1 on regressions)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [s for s in sizes if s not in SIZES] + [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"unknown size/mode: {', '.join(unknown)}")
+    reader_counts = [int(r) for r in args.readers.split(",") if r.strip()]
+
+    names = file_ring_names(args.mmap_dir, SHM_NAME, SHM_META) if args.mmap_dir else (SHM_NAME, SHM_META)
+    results = run_suite(names, sizes, reader_counts, modes, args.slots, args.duration, args.writer_fps)
+    document = {
+        "version": BASELINE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": _environment(),
+        "params": {"backend": "mmap" if args.mmap_dir else "shm", "slots": args.slots, "duration": args.duration, "writer_fps": args.writer_fps},
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(document, fh, indent=2, sort_keys=True)
+        logger.info("Baseline written to %s", args.save)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline.get("environment") != document["environment"]:
+            logger.warning("Baseline was recorded on a different environment: %s", baseline.get("environment"))
+        regressions = compare(baseline.get("results", {}), results, args.threshold)
+        if regressions:
+            logger.error("%d regression(s) beyond %.1f%%", len(regressions), args.threshold)
+            return 1
+        logger.info("No regressions beyond %.1f%%", args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    raise SystemExit(main())
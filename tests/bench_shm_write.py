@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+import time
+import logging
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from memory.shm_ring import ShmRing
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger("bench_shm_write")
+
+SHM_NAME = "bench_write_shm"
+SHM_META = "bench_write_meta"
+
+MODES = {
+    "default": {},
+    "prefault": {"prefault": True},
+    "hugepages": {"prefault": True, "hugepages": True},
+}
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round((pct / 100.0) * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def bench_mode(name, slot_size, slot_count, laps):
+    """Write latency on a freshly created ring: the first lap pays first-touch faults."""
+    start = time.perf_counter()
+    ring = ShmRing(SHM_NAME, SHM_META, slot_size, slot_count, create=True, recreate_on_mismatch=True, **MODES[name])
+    create_ms = (time.perf_counter() - start) * 1000.0
+    frame = np.full(slot_size, 7, dtype=np.uint8)
+    first_lap = []
+    steady = []
+    try:
+        for lap in range(laps):
+            for _ in range(slot_count):
+                t0 = time.perf_counter()
+                ring.write(frame)
+                (first_lap if lap == 0 else steady).append((time.perf_counter() - t0) * 1000.0)
+    finally:
+        ring.close_unlink(True)
+    return {
+        "mode": name,
+        "create_ms": create_ms,
+        "first_p50_ms": _percentile(first_lap, 50),
+        "first_p99_ms": _percentile(first_lap, 99),
+        "first_max_ms": max(first_lap) if first_lap else 0.0,
+        "steady_p99_ms": _percentile(steady, 99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare ShmRing write latency tails with prefault / hugepages.")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--slots", type=int, default=60)
+    parser.add_argument("--laps", type=int, default=3)
+    parser.add_argument("--modes", default=",".join(MODES))
+    args = parser.parse_args(argv)
+
+    slot_size = args.width * args.height * 3
+    for name in args.modes.split(","):
+        res = bench_mode(name.strip(), slot_size, args.slots, args.laps)
+        logger.info(
+            "%-9s create=%.1fms first-lap p50=%.2fms p99=%.2fms max=%.2fms | steady p99=%.2fms",
+            res["mode"], res["create_ms"], res["first_p50_ms"], res["first_p99_ms"], res["first_max_ms"], res["steady_p99_ms"],
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,7 @@
+# FILE: tests/conftest.py
+# ------------------------------------------------------------------------------
+import os
+import tempfile
+
+# Service modules call setup_logging() on import; keep their log files out of the tree.
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="ivis-test-logs-"))
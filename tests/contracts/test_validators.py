@@ -97,3 +97,14 @@ def test_contract_version_rejects_invalid_values(bad_value):
     with pytest.raises(ContractValidationError) as exc:
         validate_frame_contract_v1(c)
     assert exc.value.reason_code == "contract_version_mismatch"
+
+
+def test_nv12_contract_sized_at_one_and_a_half_bytes_per_pixel():
+    c = base_contract()
+    c["frame_color_space"] = "nv12"
+    c["memory"]["size"] = 640 * 480 * 3 // 2
+    validate_frame_contract_v1(c)
+    c["memory"]["size"] = 640 * 480 * 3
+    with pytest.raises(ContractValidationError) as exc:
+        validate_frame_contract_v1(c)
+    assert exc.value.reason_code == "memory_size_mismatch"
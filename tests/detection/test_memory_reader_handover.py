@@ -0,0 +1,133 @@
+import os
+import uuid
+
+import pytest
+
+# Config loads at import time.
+os.environ.setdefault("MODEL_NAME", "stub")
+os.environ.setdefault("MODEL_VERSION", "0")
+os.environ.setdefault("MODEL_HASH", "stub")
+os.environ.setdefault("MODEL_PATH", "stub.pt")
+
+from detection.config import Config  # noqa: E402
+from detection.memory.reader import MemoryReader  # noqa: E402
+from memory.shm_ring import ShmRing  # noqa: E402
+
+
+def test_reader_follows_ring_handover(monkeypatch):
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    monkeypatch.setattr(Config, "SHM_NAME", name)
+    monkeypatch.setattr(Config, "SHM_META_NAME", meta)
+    monkeypatch.setattr(Config, "SHM_STREAM_ID", None)
+    monkeypatch.setattr(Config, "FRAME_WIDTH", 4)
+    monkeypatch.setattr(Config, "FRAME_HEIGHT", 2)
+    monkeypatch.setattr(Config, "SHM_BUFFER_BYTES", 48)
+    monkeypatch.setattr(Config, "SHM_CACHE_SECONDS", 0)
+    ring = ShmRing(name, meta, slot_size=24, slot_count=2, create=True, recreate_on_mismatch=True)
+    reader = MemoryReader()
+    successor = None
+    try:
+        assert reader.ensure_ring()[0]
+        slot, gen = ring.write(b"a" * 24)
+        assert bytes(reader.read({"backend": "shm_ring_v1", "key": str(slot), "generation": gen, "segment": name})) == b"a" * 24
+
+        successor = ring.handover(f"{name}_h1", f"{meta}_h1", 24, 6)
+        slot, gen = successor.write(b"b" * 24)
+        ref = {"backend": "shm_ring_v1", "key": str(slot), "generation": gen, "segment": f"{name}_h1"}
+        assert bytes(reader.read(ref)) == b"b" * 24
+        assert reader.ensure_ring()[1]["slot_count"] == 6
+        # The reader left the old ring, so the writer may retire it.
+        assert ring.live_consumers() == 0
+        assert successor.live_consumers() == 1
+    finally:
+        reader.close()
+        ring.close_unlink(True)
+        if successor is not None:
+            successor.close_unlink(True)
+
+
+def test_reader_follows_two_handovers_in_one_step(monkeypatch):
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    monkeypatch.setattr(Config, "SHM_NAME", name)
+    monkeypatch.setattr(Config, "SHM_META_NAME", meta)
+    monkeypatch.setattr(Config, "SHM_STREAM_ID", None)
+    monkeypatch.setattr(Config, "FRAME_WIDTH", 4)
+    monkeypatch.setattr(Config, "FRAME_HEIGHT", 2)
+    monkeypatch.setattr(Config, "SHM_BUFFER_BYTES", 48)
+    monkeypatch.setattr(Config, "SHM_CACHE_SECONDS", 0)
+    ring = ShmRing(name, meta, slot_size=24, slot_count=2, create=True, recreate_on_mismatch=True)
+    reader = MemoryReader()
+    rings = [ring]
+    try:
+        assert reader.ensure_ring()[0]
+        # Resized twice before the reader sees a frame of the first successor
+        rings.append(ring.handover(f"{name}_h1", f"{meta}_h1", 24, 4))
+        rings.append(rings[1].handover(f"{name}_h2", f"{meta}_h2", 24, 6))
+        slot, gen = rings[2].write(b"c" * 24)
+        ref = {"backend": "shm_ring_v1", "key": str(slot), "generation": gen, "segment": f"{name}_h2"}
+        assert bytes(reader.read(ref)) == b"c" * 24
+        assert reader.ensure_ring()[1]["slot_count"] == 6
+        assert ring.live_consumers() == 0 and rings[2].live_consumers() == 1
+        # Not in the chain: still an unknown segment
+        assert ring.follow_successors(f"{name}_h9") is None
+    finally:
+        reader.close()
+        for r in rings:
+            r.close_unlink(True)
+
+
+def test_superseded_rings_retire_oldest_first(monkeypatch):
+    from ingestion.memory.shm_backend import ShmRingBackend
+
+    monkeypatch.setenv("SHM_OWNER", "1")
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    backend = ShmRingBackend(name, f"{name}_meta", slot_size=24, slot_count=2)
+    reader = ShmRing(name, f"{name}_meta", 24, 2, create=False)
+    try:
+        consumer = reader.register_consumer("detection")
+        backend.resize(24, 4)
+        backend.resize(24, 6)
+        # The middle ring has no consumers, but the one on the first ring walks through it.
+        assert backend.retire_drained() == 2
+        reader.unregister_consumer(consumer)
+        assert backend.retire_drained() == 0
+    finally:
+        reader.close()
+        backend.close()
+
+
+def test_backend_clears_a_stale_successor_record(monkeypatch):
+    from ingestion.memory.shm_backend import ShmRingBackend
+
+    monkeypatch.setenv("SHM_OWNER", "1")
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    crashed = ShmRing(name, f"{name}_meta", 24, 2, create=True, recreate_on_mismatch=True)
+    crashed.advertise_successor(f"{name}_h1", f"{name}_meta_h1", 24, 4)
+    crashed.close()
+    backend = ShmRingBackend(name, f"{name}_meta", slot_size=24, slot_count=2)
+    try:
+        assert backend.ring.successor() is None
+    finally:
+        backend.close()
+        crashed.close_unlink(True)
+
+
+def test_config_leaves_room_for_successor_names():
+    from ingestion.config import Config as IngestionConfig
+    from ingestion.errors.fatal import ConfigError
+
+    env = {
+        "RTSP_URL": "unused",
+        "STREAM_ID": "cam01",
+        "CAMERA_ID": "cam01",
+        "TARGET_FPS": "5",
+        "FRAME_WIDTH": "64",
+        "FRAME_HEIGHT": "48",
+        "MEMORY_BACKEND": "shm",
+    }
+    name = "s" * 60
+    IngestionConfig(dict(env, SHM_NAME=name, SHM_META_NAME="meta"))
+    with pytest.raises(ConfigError):
+        IngestionConfig(dict(env, SHM_NAME=name, SHM_META_NAME="meta", SHM_RESIZE_FILE="/tmp/resize.json"))
@@ -0,0 +1,112 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import logging
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from memory.shm_ring import ShmRing
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger("stress_shm_writers")
+
+SHM_NAME = "stress_writers_shm"
+SHM_META = "stress_writers_meta"
+
+
+def writer_process(writer_id, slot_size, slot_count, multi_writer, start_event, stop_event, results):
+    ring = ShmRing(SHM_NAME, SHM_META, slot_size, slot_count, create=False, multi_writer=multi_writer)
+    # Each writer stamps its id into every byte so readers can spot interleaved copies.
+    frame = np.full(slot_size, writer_id + 1, dtype=np.uint8)
+    writes = 0
+    try:
+        start_event.wait()
+        while not stop_event.is_set():
+            ring.write(frame)
+            writes += 1
+    finally:
+        ring.close()
+        results.put(writes)
+
+
+def reader_process(slot_size, slot_count, stop_event, errors):
+    ring = ShmRing(SHM_NAME, SHM_META, slot_size, slot_count, create=False)
+    torn = 0
+    try:
+        while not stop_event.is_set():
+            data, idx, gen = ring.read_latest()
+            if data is None:
+                continue
+            if data[0] != data[-1] or data[0] != data[len(data) // 2]:
+                torn += 1
+    finally:
+        ring.close()
+        errors.put(torn)
+
+
+def run(writers, slot_size, slot_count, duration, multi_writer):
+    """Aggregate writes/s of `writers` processes sharing one ring, plus torn reads seen."""
+    ring = ShmRing(SHM_NAME, SHM_META, slot_size, slot_count, create=True, recreate_on_mismatch=True, multi_writer=multi_writer)
+    start_event = multiprocessing.Event()
+    stop_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    errors = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(
+            target=writer_process,
+            args=(i, slot_size, slot_count, multi_writer, start_event, stop_event, results),
+        )
+        for i in range(writers)
+    ]
+    procs.append(multiprocessing.Process(target=reader_process, args=(slot_size, slot_count, stop_event, errors)))
+    try:
+        for proc in procs:
+            proc.start()
+        time.sleep(0.5)
+        start_event.set()
+        time.sleep(duration)
+        stop_event.set()
+        total = sum(results.get() for _ in range(writers))
+        torn = errors.get()
+        for proc in procs:
+            proc.join()
+    finally:
+        ring.close_unlink(True)
+    return total / duration, torn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SHM ring throughput vs. number of concurrent writers")
+    parser.add_argument("--writers", default="1,2,4", help="comma-separated writer counts")
+    parser.add_argument("--slot-size", type=int, default=1920 * 1080 * 3)
+    parser.add_argument("--slot-count", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    failed = False
+    for count in [int(value) for value in args.writers.split(",")]:
+        for multi_writer in (False, True):
+            rate, torn = run(count, args.slot_size, args.slot_count, args.duration, multi_writer)
+            mode = "multi_writer" if multi_writer else "global_lock"
+            logger.info(
+                "writers=%d mode=%-12s %8.1f writes/s %8.1f MB/s torn_reads=%d",
+                count,
+                mode,
+                rate,
+                rate * args.slot_size / 1e6,
+                torn,
+            )
+            failed = failed or (multi_writer and torn > 0)
+    if failed:
+        logger.error("Test FAILED: torn reads on a multi-writer ring")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
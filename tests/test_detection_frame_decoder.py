@@ -84,3 +84,27 @@ def test_decoder_missing_metadata_works_in_fallback_mode():
     assert w == 100
     assert h == 100
     assert fallback is True
+
+
+def test_decoder_converts_nv12_and_i420_to_bgr():
+    from ivis.common.pixel_format import from_bgr
+
+    dec = FrameDecoder()
+    w, h = 8, 4
+    bgr = np.zeros((h, w, 3), dtype=np.uint8)
+    bgr[:, :4] = (255, 0, 0)
+    bgr[:, 4:] = (0, 0, 255)
+    for color in ("nv12", "i420"):
+        packed = from_bgr(bgr, color)
+        assert packed.nbytes == w * h * 3 // 2
+        contract = {
+            "frame_width": w,
+            "frame_height": h,
+            "frame_channels": 3,
+            "frame_dtype": "uint8",
+            "frame_color_space": color,
+            "memory": {"size": packed.nbytes},
+        }
+        out = dec.decode(packed.tobytes(), contract)
+        assert out.shape == (h, w, 3)
+        assert np.abs(out.astype(int) - bgr.astype(int)).max() < 24
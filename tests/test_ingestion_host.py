@@ -0,0 +1,57 @@
+# FILE: tests/test_ingestion_host.py
+# ------------------------------------------------------------------------------
+import json
+
+import pytest
+
+from ingestion.config import Config
+from ingestion.errors.fatal import ConfigError
+from ingestion.host import StreamState, camera_env, load_cameras
+from ivis_health import ServiceState
+
+BASE_ENV = {
+    "RTSP_URL": "unused",
+    "STREAM_ID": "unused",
+    "CAMERA_ID": "unused",
+    "TARGET_FPS": "5",
+    "FRAME_WIDTH": "64",
+    "FRAME_HEIGHT": "48",
+    "MEMORY_BACKEND": "shm",
+    "SHM_NAME": "host_ring",
+}
+
+
+def test_camera_env_partitions_rings_per_stream():
+    conf = Config(camera_env(BASE_ENV, {"STREAM_ID": "cam01", "RTSP_URL": "rtsp://a"}))
+    assert (conf.stream_id, conf.camera_id, conf.rtsp_url) == ("cam01", "cam01", "rtsp://a")
+    assert (conf.ring_data_name, conf.ring_meta_name) == ("host_ring_cam01", "ivis_shm_meta_cam01")
+    own = Config(camera_env(BASE_ENV, {"STREAM_ID": "cam02", "RTSP_URL": "rtsp://b", "SHM_NAME": "mine", "TARGET_FPS": 2}))
+    assert own.ring_data_name == "mine" and own.target_fps == 2
+
+
+def test_load_cameras_rejects_duplicates(tmp_path):
+    path = tmp_path / "cameras.json"
+    path.write_text(json.dumps([{"STREAM_ID": "a", "RTSP_URL": "x"}, {"STREAM_ID": "a", "RTSP_URL": "y"}]))
+    with pytest.raises(ConfigError):
+        load_cameras(str(path))
+    path.write_text(json.dumps([{"STREAM_ID": "a"}]))
+    with pytest.raises(ConfigError):
+        load_cameras(str(path))
+
+
+def test_stream_state_namespaces_checks_and_tracks_readiness():
+    state = ServiceState("ingestion")
+    views = []
+    a = StreamState(state, "a", lambda: state.set_ready(all(v.ready for v in views)))
+    b = StreamState(state, "b", lambda: state.set_ready(all(v.ready for v in views)))
+    views += [a, b]
+    a.set_check("source_ready", True)
+    b.set_check("source_ready", False)
+    assert a.compute_ready(["source_ready"]) and not b.compute_ready(["source_ready"])
+    assert not state.ready
+    b.set_check("source_ready", True)
+    b.compute_ready(["source_ready"])
+    assert state.ready
+    a.inc("frames_published", 2)
+    b.inc("frames_published", 1)
+    assert state.counters["frames_published"] == 3 and state.counters["a/frames_published"] == 2
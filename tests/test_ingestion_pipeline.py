@@ -0,0 +1,77 @@
+# FILE: tests/test_ingestion_pipeline.py
+# ------------------------------------------------------------------------------
+import itertools
+import threading
+import time
+import uuid
+
+import pytest
+from prometheus_client import REGISTRY
+
+from ingestion.errors.fatal import FatalError
+from ingestion.pipeline import DropOldestQueue, StageThread, raise_stage_errors
+
+
+def test_full_queue_drops_the_oldest_item():
+    stream = f"test-{uuid.uuid4().hex[:8]}"
+    queue = DropOldestQueue("capture", 2, stream)
+    assert queue.put(1) and queue.put(2)
+    assert not queue.put(3)
+    assert queue.drops == 1 and queue.depth() == 2
+    labels = {"stream": stream, "queue": "capture"}
+    assert REGISTRY.get_sample_value("ingestion_queue_drops_total", labels) == 1
+    assert [queue.get(0.01), queue.get(0.01), queue.get(0.01)] == [2, 3, None]
+    assert REGISTRY.get_sample_value("ingestion_queue_depth", labels) == 0
+
+
+def test_get_wakes_on_put():
+    queue = DropOldestQueue("publish", 4)
+    threading.Timer(0.05, queue.put, args=("frame",)).start()
+    started = time.perf_counter()
+    assert queue.get(5.0) == "frame"
+    assert time.perf_counter() - started < 2.0
+
+
+def test_stage_error_reaches_the_main_loop():
+    def _fail():
+        raise FatalError("Source EOF or Connection Lost")
+
+    healthy = StageThread("ingestion-publish", lambda: time.sleep(0.001), lambda: True)
+    failing = StageThread("ingestion-capture", _fail, lambda: True)
+    healthy.start()
+    failing.start()
+    failing.join(2.0)
+    try:
+        assert not failing.is_alive()
+        with pytest.raises(FatalError, match="Source EOF"):
+            raise_stage_errors(healthy, None, failing)
+    finally:
+        healthy.stop()
+    assert not healthy.is_alive()
+
+
+def test_stages_stop_with_the_runtime():
+    running = threading.Event()
+    running.set()
+    queue = DropOldestQueue("capture", 8)
+    counter = itertools.count()
+    received = []
+
+    def _publish():
+        item = queue.get(0.01)
+        if item is not None:
+            received.append(item)
+
+    stages = [
+        StageThread("ingestion-capture", lambda: queue.put(next(counter)) and time.sleep(0.001), running.is_set),
+        StageThread("ingestion-publish", _publish, running.is_set),
+    ]
+    for stage in stages:
+        stage.start()
+    time.sleep(0.05)
+    running.clear()
+    for stage in stages:
+        stage.join(2.0)
+    assert not any(stage.is_alive() for stage in stages)
+    assert received and received == sorted(received)
+    raise_stage_errors(*stages)
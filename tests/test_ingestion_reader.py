@@ -0,0 +1,100 @@
+# FILE: tests/test_ingestion_reader.py
+# ------------------------------------------------------------------------------
+import cv2
+import numpy as np
+
+from ingestion.capture.reader import Reader
+from ingestion.frame.selector import Selector
+
+
+class _FakeCapture:
+    """25 fps file-like capture that counts grabs, decodes and seeks."""
+
+    def __init__(self, frames=100, fps=25.0):
+        self.frames = frames
+        self.fps = fps
+        self.position = 0
+        self.grabs = 0
+        self.retrieves = 0
+        self.seeks = 0
+
+    def grab(self):
+        if self.position >= self.frames:
+            return False
+        self.position += 1
+        self.grabs += 1
+        return True
+
+    def retrieve(self):
+        self.retrieves += 1
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return (self.position - 1) * 1000.0 / self.fps + 1.0
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frames)
+        return 0.0
+
+    def set(self, prop, value):
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self.position = int(value)
+        self.seeks += 1
+        return True
+
+
+class _FakeClient:
+    def __init__(self, cap, is_file=True):
+        self.cap = cap
+        self.is_file = is_file
+
+    def get_raw_handle(self):
+        return self.cap
+
+
+def _drain(reader):
+    packets = []
+    while True:
+        packet = reader.next_packet()
+        if packet is None:
+            return packets
+        packets.append(packet)
+
+
+def test_reader_decodes_only_selected_frames():
+    cap = _FakeCapture()
+    reader = Reader(_FakeClient(cap), Selector(5, mode="pts"))
+    packets = _drain(reader)
+    assert len(packets) == 20
+    assert cap.grabs == 100 and cap.retrieves == 20
+    # Frames skipped right before the source ran dry are reported with the next packet.
+    cap.frames += 1
+    packets.append(reader.next_packet())
+    assert sum(p.skipped for p in packets[:-1]) == 76 and packets[-1].skipped == 4
+
+
+def test_reader_seeks_file_sources_in_pts_mode():
+    cap = _FakeCapture()
+    packets = _drain(Reader(_FakeClient(cap), Selector(1, mode="pts"), seek_min_frames=10))
+    assert len(packets) == 4
+    steps = [b.pts - a.pts for a, b in zip(packets, packets[1:])]
+    assert all(1000 <= step <= 1000 + 2 * 40 for step in steps)
+    assert cap.seeks >= 3 and cap.retrieves == 4
+    assert cap.grabs < 10
+
+
+def test_reader_without_selector_decodes_everything():
+    cap = _FakeCapture(frames=10)
+    packets = _drain(Reader(_FakeClient(cap)))
+    assert len(packets) == 10 and cap.retrieves == 10
+    assert all(p.skipped == 0 for p in packets)
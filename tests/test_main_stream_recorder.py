@@ -0,0 +1,42 @@
+# FILE: tests/test_main_stream_recorder.py
+# ------------------------------------------------------------------------------
+import cv2
+import numpy as np
+
+from ingestion.config import Config
+from ingestion.recording.buffer import RecordingBuffer
+from ingestion.recording.main_stream import MainStreamRecorder
+
+
+def _write_video(path, frames, size):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 25, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 10 % 255, dtype=np.uint8))
+    writer.release()
+
+
+def test_main_stream_recorder_fills_buffer_at_full_resolution(tmp_path):
+    main_path = tmp_path / "main.avi"
+    _write_video(main_path, 20, (320, 240))
+    conf = Config(
+        {
+            "RTSP_URL": "substream",
+            "RTSP_MAIN_URL": str(main_path),
+            "STREAM_ID": "cam",
+            "CAMERA_ID": "cam",
+            "TARGET_FPS": "5",
+            "FRAME_WIDTH": "64",
+            "FRAME_HEIGHT": "48",
+            "MEMORY_BACKEND": "shm",
+            "SELECTOR_MODE": "pts",
+        }
+    )
+    buffer = RecordingBuffer(0, 100)
+    recorder = MainStreamRecorder(conf, buffer, 5, lambda: True)
+    recorder.start()
+    recorder.join(10.0)
+    assert not recorder.is_alive()
+    # 20 frames at 25 fps sampled at 5 fps by media time; only the kept ones are decoded.
+    assert recorder.frames == buffer.size() == 4
+    clip = buffer.get_clip_frames(0, 2**62)
+    assert cv2.imdecode(np.frombuffer(clip[0], np.uint8), cv2.IMREAD_COLOR).shape == (240, 320, 3)
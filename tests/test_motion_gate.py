@@ -0,0 +1,48 @@
+# FILE: tests/test_motion_gate.py
+# ------------------------------------------------------------------------------
+import numpy as np
+
+from ingestion.frame.motion import MotionGate, hamming_distance
+
+
+def _frame(value=40, box=None):
+    frame = np.full((240, 320, 3), value, dtype=np.uint8)
+    if box is not None:
+        x, y, w, h = box
+        frame[y:y + h, x:x + w] = 255
+    return frame
+
+
+def test_static_scene_publishes_only_keepalive_frames():
+    gate = MotionGate("diff", keepalive_ms=1000.0)
+    kept = [gate.allow(_frame(), t) for t in range(0, 3000, 100)]
+    assert kept.count(True) == 3 and kept[0] and kept[10] and kept[20]
+    assert gate.skipped == 27
+
+
+def test_change_publishes_and_holds():
+    gate = MotionGate("diff", keepalive_ms=0.0, hold_ms=300.0)
+    assert gate.allow(_frame(), 0)
+    assert gate.allow(_frame(), 100)
+    assert not gate.allow(_frame(), 400)
+    assert gate.allow(_frame(box=(100, 100, 40, 40)), 500)
+    # Same frame again: no change, but still inside the hold window.
+    assert gate.allow(_frame(box=(100, 100, 40, 40)), 700)
+    assert not gate.allow(_frame(box=(100, 100, 40, 40)), 900)
+
+
+def test_changes_outside_the_roi_are_ignored():
+    roi = np.zeros((240, 320), dtype=np.uint8)
+    roi[:, :160] = 255
+    gate = MotionGate("diff", keepalive_ms=0.0, roi_mask=roi)
+    assert gate.allow(_frame(), 0)
+    assert not gate.allow(_frame(box=(240, 100, 40, 40)), 100)
+    assert gate.allow(_frame(box=(40, 100, 40, 40)), 200)
+
+
+def test_hash_mode_uses_fingerprint_distance():
+    assert hamming_distance("ff00", "0f00") == 4
+    gate = MotionGate("hash", keepalive_ms=0.0, hash_bits=4)
+    assert gate.allow(_frame(), 0)
+    assert not gate.allow(_frame(), 100)
+    assert gate.allow(_frame(box=(0, 0, 160, 240)), 200)
@@ -0,0 +1,110 @@
+# FILE: tests/test_pyav_capture.py
+# ------------------------------------------------------------------------------
+import numpy as np
+import pytest
+
+av = pytest.importorskip("av")
+
+from ingestion.capture.pyav_client import PyAVClient, PyAVReader  # noqa: E402
+from ingestion.frame.selector import Selector  # noqa: E402
+from ingestion.recording.video import PacketSegmentBuffer  # noqa: E402
+
+FRAMES = 40
+FPS = 10
+KEYINT = 5
+
+
+@pytest.fixture
+def video(tmp_path):
+    """40 frames at 10 fps (100 ms apart), a keyframe every 5 frames, no B-frames."""
+    path = tmp_path / "source.mp4"
+    with av.open(str(path), "w") as out:
+        stream = out.add_stream("libx264", rate=FPS)
+        stream.width, stream.height, stream.pix_fmt = 64, 48, "yuv420p"
+        stream.options = {"x264-params": f"keyint={KEYINT}:min-keyint={KEYINT}:scenecut=0:bframes=0"}
+        for i in range(FRAMES):
+            frame = av.VideoFrame.from_ndarray(np.full((48, 64, 3), i * 6, dtype=np.uint8), format="bgr24")
+            frame.pts = i
+            for packet in stream.encode(frame):
+                out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+    return str(path)
+
+
+def _drain(reader):
+    packets = []
+    while True:
+        packet = reader.next_packet()
+        if packet is None:
+            return packets
+        packets.append(packet)
+
+
+def _open(path, **kwargs):
+    client = PyAVClient(path, **kwargs)
+    client.connect()
+    return client
+
+
+def test_pyav_reader_decodes_every_frame(video):
+    client = _open(video)
+    packets = _drain(PyAVReader(client))
+    client.close()
+    assert len(packets) == FRAMES
+    assert all(p.skipped == 0 and p.payload.shape == (48, 64, 3) for p in packets)
+    # Stream PTS in ms; the first frame (pts 0) falls back to 1 ms like the OpenCV reader.
+    assert [round(p.pts) for p in packets] == [1] + [i * 100 for i in range(1, FRAMES)]
+
+
+def test_pyav_reader_keyframes_only(video):
+    client = _open(video, keyframes_only=True)
+    packets = _drain(PyAVReader(client, output_size=(32, 24)))
+    client.close()
+    assert [round(p.pts) for p in packets] == [1] + [i * 100 for i in range(KEYINT, FRAMES, KEYINT)]
+    assert all(p.payload.shape == (24, 32, 3) for p in packets)
+    # Non-key packets are skipped undecoded and reported with the next keyframe.
+    assert [p.skipped for p in packets] == [0] + [KEYINT - 1] * (FRAMES // KEYINT - 1)
+
+
+def test_pyav_reader_selector_counts_dropped_frames(video):
+    client = _open(video)
+    packets = _drain(PyAVReader(client, Selector(5, mode="pts")))
+    client.close()
+    # 10 fps source, 5 fps target: every other frame (200 ms after the first one at 1 ms)
+    assert len(packets) == FRAMES // 2
+    assert [round(p.pts) for p in packets[1:3]] == [300, 500]
+    assert sum(p.skipped for p in packets) + len(packets) == FRAMES
+
+
+def test_pyav_reader_fans_packets_out_to_the_recorder(video, tmp_path):
+    client = _open(video, keyframes_only=True)
+    buffer = PacketSegmentBuffer(str(tmp_path / "rec"), max_seconds=60, segment_seconds=1.0)
+    seen = []
+
+    def sink(packet, wall_clock_ms):
+        seen.append(packet.size)
+        # Stream time instead of the wall clock, so segment cuts are deterministic.
+        if packet.pts is not None:
+            buffer.add_packet(packet, int(packet.pts * packet.time_base * 1000))
+
+    packets = _drain(PyAVReader(client, packet_sink=sink))
+    client.close()
+    buffer.close()
+    # The recorder sees every packet, including the non-key ones the decoder skips.
+    assert len([size for size in seen if size]) == FRAMES
+    assert len(packets) == FRAMES // KEYINT
+    assert [e["frames"] for e in buffer.get_clip_segments(0, 2**62)] == [10, 10, 10, 10]
+
+
+def test_pyav_client_reconnect(video, tmp_path):
+    client = _open(video)
+    reader = PyAVReader(client)
+    assert len(_drain(reader)) == FRAMES
+    assert client.reconnect()
+    assert len(_drain(reader)) == FRAMES
+    client.close()
+
+    missing = PyAVClient(str(tmp_path / "missing.mp4"))
+    assert not missing.reconnect()
+    assert missing.last_error == "open_failed" and missing.container is None
@@ -0,0 +1,67 @@
+# FILE: tests/test_recording_buffer.py
+# ------------------------------------------------------------------------------
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from ingestion.recording.buffer import RecordingBuffer
+from ingestion.recording.spill import SegmentSpill
+
+
+def _frame(value):
+    return np.full((24, 32, 3), value, dtype=np.uint8)
+
+
+def _value(payload):
+    return int(cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR).mean())
+
+
+def test_workers_encode_off_the_caller_in_timestamp_order():
+    buffer = RecordingBuffer(0, 100, workers=3, queue_size=100)
+    for i in range(20):
+        frame = _frame(i * 10)
+        assert buffer.add_frame(frame, 1000 + i)
+        # The caller may reuse its buffer (a ring slot) straight away.
+        frame[:] = 0
+    buffer.flush()
+    clip = buffer.get_clip_frames(0, 2**62)
+    assert buffer.size() == 20 and buffer.encode_drops == 0
+    assert [_value(p) for p in clip] == [i * 10 for i in range(20)]
+    buffer.close()
+
+
+def test_full_encode_queue_drops_frames():
+    buffer = RecordingBuffer(0, 100, workers=1, queue_size=1)
+    gate = threading.Event()
+    original = buffer._encode
+    buffer._encode = lambda frame: gate.wait() and original(frame)
+    accepted = [buffer.add_frame(_frame(i), i) for i in range(5)]
+    assert accepted.count(False) == buffer.encode_drops >= 3
+    gate.set()
+    buffer.close()
+    assert buffer.size() == accepted.count(True)
+
+
+def test_spill_serves_frames_that_left_memory(tmp_path):
+    spill = SegmentSpill(str(tmp_path), max_seconds=10.0, segment_seconds=1.0)
+    buffer = RecordingBuffer(0.5, 100, spill=spill)
+    for i in range(30):
+        buffer.add_frame(_frame(i * 8), i * 100)
+    # 0.5 s in memory, the rest on disk in 1 s segments
+    assert buffer.size() == 6 and spill.frames == 24 and buffer.drops == 0
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".mjpg")]) == 3
+    clip = buffer.get_clip_frames(1500, 2600)
+    assert [_value(p) for p in clip] == [i * 8 for i in range(15, 27)]
+    buffer.close()
+
+
+def test_spill_expires_old_segments(tmp_path):
+    spill = SegmentSpill(str(tmp_path), max_seconds=2.0, segment_seconds=1.0)
+    for i in range(60):
+        spill.append(i * 100, b"x" * 10)
+    assert spill.oldest_ms() >= 5900 - 3000
+    assert len(os.listdir(tmp_path)) <= 4
+    assert list(spill.iter_frames(0, 2**62)) == [b"x" * 10] * spill.frames
+    spill.close()
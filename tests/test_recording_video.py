@@ -0,0 +1,93 @@
+# FILE: tests/test_recording_video.py
+# ------------------------------------------------------------------------------
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from ingestion.recording.video import INDEX_FILE, PacketSegmentBuffer, VideoSegmentBuffer
+
+
+def _frame(i):
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    frame[:, : (i % 8) * 8] = 200
+    return frame
+
+
+def _frame_count(path):
+    cap = cv2.VideoCapture(path)
+    count = 0
+    while cap.read()[0]:
+        count += 1
+    cap.release()
+    return count
+
+
+def test_mjpeg_segments_roll_and_are_indexed(tmp_path):
+    buffer = VideoSegmentBuffer("mjpeg", str(tmp_path), max_seconds=60, segment_seconds=1.0, fps=10, workers=1, queue_size=50)
+    for i in range(35):
+        assert buffer.add_frame(_frame(i), 1000 + i * 100)
+    buffer.close()
+    with open(tmp_path / INDEX_FILE, encoding="utf-8") as fh:
+        index = json.load(fh)
+    assert [e["frames"] for e in index] == [10, 10, 10, 5]
+    assert index[1]["start_ms"] == 2000 and index[1]["end_ms"] == 2900
+    assert _frame_count(str(tmp_path / index[0]["file"])) == 10
+    assert [e["start_ms"] for e in buffer.get_clip_segments(2500, 3100)] == [2000, 3000]
+    assert buffer.size() == 35
+
+
+def test_old_segments_expire(tmp_path):
+    buffer = VideoSegmentBuffer("mjpeg", str(tmp_path), max_seconds=2.0, segment_seconds=1.0, fps=10, workers=0)
+    for i in range(60):
+        buffer.add_frame(_frame(i), i * 100)
+    buffer.close()
+    files = sorted(n for n in os.listdir(tmp_path) if n.endswith(".avi"))
+    assert len(files) == 3 and buffer.index.entries[0]["start_ms"] == 3000
+
+
+def test_h264_segments_start_on_a_keyframe(tmp_path):
+    av = pytest.importorskip("av")
+    buffer = VideoSegmentBuffer("h264", str(tmp_path), max_seconds=60, segment_seconds=1.0, fps=10, workers=0)
+    for i in range(25):
+        buffer.add_frame(_frame(i), i * 100)
+    buffer.close()
+    entries = buffer.get_clip_segments(0, 2**62)
+    assert [e["frames"] for e in entries] == [10, 10, 5]
+    with av.open(entries[1]["path"]) as container:
+        frames = list(container.decode(video=0))
+    assert len(frames) == 10 and frames[0].key_frame
+
+
+def test_remux_cuts_segments_at_keyframes(tmp_path):
+    av = pytest.importorskip("av")
+    source = tmp_path / "source.mp4"
+    with av.open(str(source), "w") as out:
+        stream = out.add_stream("libx264", rate=10)
+        stream.width, stream.height, stream.pix_fmt = 64, 48, "yuv420p"
+        # A keyframe every 5 frames (500 ms), no B-frames
+        stream.options = {"x264-params": "keyint=5:min-keyint=5:scenecut=0:bframes=0"}
+        for i in range(40):
+            frame = av.VideoFrame.from_ndarray(_frame(i), format="bgr24")
+            frame.pts = i
+            for packet in stream.encode(frame):
+                out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+
+    recording = tmp_path / "rec"
+    buffer = PacketSegmentBuffer(str(recording), max_seconds=60, segment_seconds=1.0)
+    with av.open(str(source)) as container:
+        for packet in container.demux(video=0):
+            if packet.size and packet.pts is not None:
+                buffer.add_packet(packet, int(packet.pts * packet.time_base * 1000))
+    buffer.close()
+    entries = buffer.get_clip_segments(0, 2**62)
+    # Keyframes every 500 ms: cuts at the first keyframe 1 s or more into a segment.
+    assert [e["frames"] for e in entries] == [10, 10, 10, 10]
+    for entry in entries:
+        with av.open(entry["path"]) as container:
+            frames = list(container.decode(video=0))
+        assert len(frames) == 10 and frames[0].key_frame
@@ -0,0 +1,41 @@
+# FILE: tests/test_renditions.py
+# ------------------------------------------------------------------------------
+import numpy as np
+import pytest
+
+from ivis.common.renditions import (
+    LETTERBOX_FILL,
+    MODEL,
+    PREVIEW,
+    find_rendition,
+    render_renditions,
+    rendition_layout,
+    slot_nbytes,
+    to_source_box,
+)
+
+
+def test_layout_follows_primary_frame_aligned():
+    layout = rendition_layout(640, 480, "bgr", model_size=320, preview_width=160)
+    model, preview = layout
+    assert model["offset"] == 640 * 480 * 3
+    assert model["scale"] == pytest.approx(0.5)
+    assert model["pad"] == [0, 40]
+    assert preview["offset"] % 64 == 0 and preview["offset"] >= model["offset"] + model["size"]
+    assert (preview["width"], preview["height"]) == (160, 120)
+    assert slot_nbytes(640, 480, "bgr", 320, 160) == preview["offset"] + preview["size"]
+    assert slot_nbytes(640, 480, "nv12") == 640 * 480 * 3 // 2
+    assert find_rendition({"renditions": layout}, PREVIEW) is preview
+
+
+def test_render_letterboxes_and_maps_boxes_back():
+    pytest.importorskip("cv2")
+    frame = np.full((480, 640, 3), 200, dtype=np.uint8)
+    layout = rendition_layout(640, 480, "bgr", model_size=320, preview_width=160)
+    slot = np.zeros(slot_nbytes(640, 480, "bgr", 320, 160), dtype=np.uint8)
+    render_renditions(frame, slot, layout)
+    model = find_rendition({"renditions": layout}, MODEL)
+    img = slot[model["offset"]:model["offset"] + model["size"]].reshape(320, 320, 3)
+    assert (img[:40] == LETTERBOX_FILL).all() and (img[280:] == LETTERBOX_FILL).all()
+    assert (img[40:280] == 200).all()
+    assert to_source_box([10, 50, 110, 90], model) == pytest.approx([20, 20, 220, 100])
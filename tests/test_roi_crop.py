@@ -0,0 +1,66 @@
+# FILE: tests/test_roi_crop.py
+# ------------------------------------------------------------------------------
+import numpy as np
+import pytest
+
+from detection.postprocess.parse import parse_output
+from ingestion.config import Config
+from ingestion.errors.fatal import ConfigError
+from ingestion.frame.roi import crop_rect, crop_source
+
+ENV = {
+    "RTSP_URL": "unused",
+    "STREAM_ID": "cam01",
+    "CAMERA_ID": "cam01",
+    "TARGET_FPS": "5",
+    "FRAME_WIDTH": "640",
+    "FRAME_HEIGHT": "480",
+    "MEMORY_BACKEND": "shm",
+    "ROI_BOXES": "100,50,299,149",
+    "ROI_POLYGONS": "400,300;500,300;450,401",
+}
+
+
+def test_crop_rect_bounds_boxes_and_polygons_on_even_pixels():
+    assert crop_rect(640, 480, [(101, 51, 298, 148)], []) == (100, 50, 200, 100)
+    assert crop_rect(640, 480, [(100, 50, 299, 149)], [[(400, 300), (500, 300), (450, 401)]]) == (100, 50, 402, 352)
+    # Clamped to the frame
+    assert crop_rect(640, 480, [(-20, -20, 700, 500)], []) == (0, 0, 640, 480)
+    assert crop_rect(640, 480, [], []) is None
+
+
+def test_crop_source_maps_frame_coordinates_onto_the_source():
+    frame = np.arange(480 * 640, dtype=np.int32).reshape(480, 640)
+    view = crop_source(frame, (100, 50, 200, 100), (640, 480))
+    assert view.shape == (100, 200) and view[0, 0] == frame[50, 100]
+    # A full-resolution source: the same region at twice the coordinates
+    big = np.zeros((960, 1280), dtype=np.uint8)
+    assert crop_source(big, (100, 50, 200, 100), (640, 480)).shape == (200, 400)
+
+
+def test_crop_mode_sizes_the_ring_to_the_roi():
+    conf = Config(dict(ENV, ROI_MODE="crop"))
+    assert conf.roi_crop == (100, 50, 402, 352)
+    assert conf.output_resolution == (402, 352)
+    masked = Config(ENV)
+    assert masked.roi_crop is None and masked.output_resolution == (640, 480)
+    with pytest.raises(ConfigError):
+        Config(dict(ENV, ROI_MODE="zoom"))
+
+
+def test_detections_are_translated_back_to_full_frame():
+    contract = {
+        "frame_id": "f1",
+        "stream_id": "cam01",
+        "camera_id": "cam01",
+        "timestamp_ms": 1000,
+        "mono_ms": 2000,
+        "roi": {"boxes": [(100, 50, 299, 149)], "crop": {"x": 100, "y": 50, "width": 200, "height": 100}},
+    }
+    raw_results = {
+        "detections": [([10.0, 20.0, 50.0, 60.0], 0.9, 1)],
+        "tracks": [{"track_id": 7, "bbox_xyxy": [10.0, 20.0, 50.0, 60.0]}],
+    }
+    result = parse_output(contract, raw_results)
+    assert result["detections"][0]["bbox"] == [110.0, 70.0, 150.0, 110.0]
+    assert result["detections"][0]["track_id"] == 7
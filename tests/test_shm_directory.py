@@ -0,0 +1,35 @@
+# FILE: tests/test_shm_directory.py
+# ------------------------------------------------------------------------------
+import os
+import uuid
+
+from memory.shm_directory import ShmDirectory
+from memory.shm_ring import ShmRing
+
+
+def test_shm_directory_publish_lookup_and_attach():
+    suffix = uuid.uuid4().hex[:8]
+    directory = ShmDirectory(f"ivis_test_dir_{suffix}", create=True)
+    ring = ShmRing(f"ivis_test_shm_{suffix}", f"ivis_test_shm_{suffix}_meta", slot_size=12, slot_count=3, create=True)
+    try:
+        directory.publish("cam-1", ring.data_name, ring.meta_name, 2, 2, 3, ring.slot_size, ring.slot_count)
+        # a dead writer's entry is listed only on request
+        directory.publish("cam-2", "other_data", "other_meta", 4, 4, 3, 48, 2, pid=2 ** 31 - 1)
+
+        entry = directory.lookup("cam-1")
+        assert entry["width"] == 2 and entry["slot_count"] == 3 and entry["pid"] == os.getpid()
+        assert [e["stream_id"] for e in directory.entries()] == ["cam-1"]
+        assert len(directory.entries(include_dead=True)) == 2
+
+        slot, gen = ring.write(b"x" * 12)
+        consumer_dir = ShmDirectory(directory.name, create=False)
+        attached, _ = consumer_dir.open_ring("cam-1")
+        assert attached.read(slot, gen) == b"x" * 12
+        attached.close()
+        consumer_dir.close()
+
+        assert directory.remove("cam-1", pid=os.getpid())
+        assert directory.lookup("cam-1") is None
+    finally:
+        ring.close_unlink(True)
+        directory.unlink()
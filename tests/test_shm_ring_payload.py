@@ -1,8 +1,14 @@
 # FILE: tests/test_shm_ring_payload.py
 # ------------------------------------------------------------------------------
+import threading
+import time
 import uuid
 
-from memory.shm_ring import ShmRing
+import numpy as np
+import pytest
+
+from memory.errors.fatal import MemoryWriteError
+from memory.shm_ring import SLOT_BUSY, ShmRing, file_ring_names
 
 
 def test_shm_ring_payload_length_roundtrip():
@@ -20,3 +26,511 @@ def test_shm_ring_payload_length_roundtrip():
         assert latest == payload
     finally:
         ring.close_unlink(True)
+
+
+def test_shm_ring_seqlock_rejects_in_progress_slot():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=16, slot_count=2, create=True, recreate_on_mismatch=True)
+    try:
+        slot, gen = ring.write(b"frame-1")
+        ring._set_generation(slot, gen | SLOT_BUSY)
+        assert ring.read(slot, gen) is None
+        ring._set_generation(slot, gen)
+        assert ring.read(slot, gen) == b"frame-1"
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_mutex_mode_roundtrip():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=16, slot_count=2, create=True, recreate_on_mismatch=True, seqlock=False)
+    try:
+        slot, gen = ring.write(b"abc")
+        assert ring.read(slot, gen) == b"abc"
+        assert ring.read_latest() == (b"abc", slot, gen)
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_read_view_and_read_into():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=12, slot_count=1, create=True, recreate_on_mismatch=True)
+    try:
+        frame = np.arange(12, dtype=np.uint8).reshape((2, 2, 3))
+        slot, gen = ring.write(frame)
+        view = ring.read_view(slot, gen, shape=(2, 2, 3))
+        assert view is not None and not view.flags.writeable
+        assert np.array_equal(view, frame)
+        assert ring.is_valid(slot, gen)
+
+        out = np.zeros((2, 2, 3), dtype=np.uint8)
+        assert ring.read_into(slot, gen, out) == 12
+        assert np.array_equal(out, frame)
+
+        ring.write(bytes(12))  # single slot: laps the previous frame
+        assert not ring.is_valid(slot, gen)
+        assert ring.read_view(slot, gen) is None
+        assert ring.read_into(slot, gen, out) is None
+        copied, idx, _ = ring.read_latest_into(out)
+        assert copied == 12 and idx == 0 and not out.any()
+        del view
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_write_skips_leased_slot():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=4, slot_count=3, create=True, recreate_on_mismatch=True)
+    try:
+        consumer = ring.register_consumer("detection")
+        assert ring.register_consumer("detection") == consumer
+        slot, gen = ring.write(b"aaaa")
+        assert ring.pin(consumer, slot, gen)
+        for payload in (b"bbbb", b"cccc", b"dddd"):
+            written, _ = ring.write(payload)
+            assert written != slot
+        assert ring.read(slot, gen) == b"aaaa"
+
+        ring.unpin(consumer)
+        written = {ring.write(b"eeee")[0] for _ in range(3)}
+        assert slot in written
+        assert not ring.pin(consumer, slot, gen)
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_overwrites_when_all_slots_leased():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=4, slot_count=1, create=True, recreate_on_mismatch=True, lease_stall_ms=1)
+    try:
+        consumer = ring.register_consumer("ui")
+        slot, gen = ring.write(b"aaaa")
+        assert ring.pin(consumer, slot, gen)
+        new_slot, new_gen = ring.write(b"bbbb")
+        assert new_slot == slot and new_gen != gen
+        assert not ring.is_valid(slot, gen)
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_lease_stall_releases_the_mutex():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=4, slot_count=2, create=True, recreate_on_mismatch=True, lease_stall_ms=5000)
+    reader = ShmRing(name, meta, slot_size=4, slot_count=2, create=False)
+    try:
+        consumers = [reader.register_consumer("det"), reader.register_consumer("ui")]
+        frames = [ring.write(b"aaaa"), ring.write(b"bbbb")]
+        for consumer, (slot, gen) in zip(consumers, frames):
+            assert reader.pin(consumer, slot, gen)
+        result = []
+        writer = threading.Thread(target=lambda: result.append(ring.write(b"cccc")))
+        started = time.perf_counter()
+        writer.start()
+        time.sleep(0.05)
+        # The stalled writer neither holds the mutex nor marks leased slots busy.
+        with reader._mutex:
+            assert time.perf_counter() - started < 1.0
+        assert [reader._get_generation(slot) for slot, _ in frames] == [gen for _, gen in frames]
+        assert reader.read(*frames[1]) == b"bbbb"
+        reader.unpin(consumers[0])
+        writer.join(5.0)
+        assert result[0][0] == frames[0][0]
+        assert time.perf_counter() - started < 2.0
+    finally:
+        reader.close()
+        ring.close_unlink(True)
+
+
+def test_shm_ring_acquire_commit_in_place():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=12, slot_count=2, create=True, recreate_on_mismatch=True)
+    try:
+        view = ring.acquire_slot(shape=(2, 2, 3))
+        view[:] = 7
+        assert ring.read(0, 1) is None  # not published yet
+        # The mutex only covers the reservation: consumers attach while the frame renders.
+        reader = ShmRing(name, meta, slot_size=12, slot_count=2, create=False, seqlock=False)
+        reader.unregister_consumer(reader.register_consumer("det"))
+        assert reader.read(0, 1) is None
+        reader.close()
+        slot, gen = ring.commit()
+        assert (slot, gen) == (0, 1)
+        assert ring.read(slot, gen) == bytes([7] * 12)
+
+        view = ring.acquire_slot(shape=(2, 2, 3))
+        view[:] = 9
+        ring.abort()
+        data, idx, _ = ring.read_latest()
+        assert idx == slot and data == bytes([7] * 12)
+        del view
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_consumer_cursor_lag_accounting():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=4, slot_count=2, create=True, recreate_on_mismatch=True)
+    try:
+        consumer = ring.register_consumer("detection")
+        refs = [ring.write(b"abcd") for _ in range(5)]
+        stats = ring.consumer_stats()[0]
+        assert stats["consumer"] == "detection" and stats["lag_slots"] == 5
+
+        slot, gen = refs[-1]
+        assert ring.advance(consumer, slot, gen)
+        stats = ring.consumer_stats()[0]
+        # frames 1..3 left the 2-slot ring before the consumer got to them
+        assert stats["lag_slots"] == 0 and stats["lapped"] == 3
+
+        old_slot, old_gen = refs[0]
+        assert not ring.advance(consumer, old_slot, old_gen)
+        assert ring.consumer_stats()[0]["lapped"] == 4
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_blocking_policy_waits_for_lossless_consumer():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(
+        name, meta, slot_size=4, slot_count=2, create=True, recreate_on_mismatch=True,
+        write_policy="blocking", block_timeout_ms=5000,
+    )
+    try:
+        consumer = ring.register_consumer("detection", lossless=True)
+        ring.register_consumer("ui")
+        first = ring.write(b"aaaa")
+        ring.write(b"bbbb")
+
+        def _consume():
+            time.sleep(0.1)
+            ring.advance(consumer, *first)
+
+        worker = threading.Thread(target=_consume)
+        worker.start()
+        started = time.perf_counter()
+        ring.write(b"cccc")
+        waited = time.perf_counter() - started
+        worker.join()
+        assert waited >= 0.08
+        assert ring.read(*first) is None
+        assert ring.consumer_stats()[0]["lapped"] == 0
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_blocking_policy_times_out_and_overwrites():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(
+        name, meta, slot_size=4, slot_count=2, create=True, recreate_on_mismatch=True,
+        write_policy="blocking", block_timeout_ms=50,
+    )
+    try:
+        ring.register_consumer("detection", lossless=True)
+        first = ring.write(b"aaaa")
+        ring.write(b"bbbb")
+        started = time.perf_counter()
+        ring.write(b"cccc")
+        assert time.perf_counter() - started >= 0.04
+        assert ring.read(*first) is None
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_wait_for_frame_wakes_on_commit():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=4, slot_count=2, create=True, recreate_on_mismatch=True)
+    try:
+        assert ring.wait_for_frame(0, timeout=0.01) == 0
+        woke = []
+
+        def _wait():
+            started = time.perf_counter()
+            woke.append((ring.wait_for_frame(0, timeout=5.0), time.perf_counter() - started))
+
+        waiter = threading.Thread(target=_wait)
+        waiter.start()
+        time.sleep(0.05)
+        ring.write(b"abcd")
+        waiter.join()
+        seq, waited = woke[0]
+        assert seq == 1 and waited < 1.0
+        assert ring.wait_for_frame(0, timeout=5.0) == ring.write_seq() == 1
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_arena_mixed_sizes():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=128, slot_count=4, create=True, recreate_on_mismatch=True, arena=True)
+    reader = ShmRing(name, meta, slot_size=128, slot_count=4, create=False)
+    try:
+        assert reader.arena
+        big = ring.write(b"B" * 300)
+        small = ring.write(b"s" * 10)
+        assert reader.read(*big) == b"B" * 300
+        assert reader.read(*small) == b"s" * 10
+        # 512-byte arena: 320 + 64 used, so this record wraps to 0 and evicts `big`
+        wrapped = ring.write(b"w" * 200)
+        assert reader.read(*big) is None
+        assert reader.read(*small) == b"s" * 10
+        assert reader.read(*wrapped) == b"w" * 200
+
+        view = ring.acquire_slot(shape=(4, 4, 3))
+        view[:] = 7
+        slot, gen = ring.commit()
+        out = np.empty((4, 4, 3), dtype=np.uint8)
+        assert reader.read_into(slot, gen, out) == 48
+        assert int(out.sum()) == 7 * 48
+    finally:
+        reader.close()
+        ring.close_unlink(True)
+
+
+def test_shm_ring_multi_writer_arena_skips_records_in_flight():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    options = dict(slot_size=64, slot_count=4, create=True, arena=True, multi_writer=True)
+    first = ShmRing(name, meta, recreate_on_mismatch=True, **options)
+    second = ShmRing(name, meta, recreate_on_mismatch=False, **options)
+    try:
+        # 256-byte arena: the first writer is still copying into [0, 128).
+        first_view = first.acquire_slot(shape=(128,))
+        second.write(b"b" * 128)
+        # The arena wraps to 0 here; the record in flight is stepped over, not overwritten.
+        second_view = second.acquire_slot(shape=(64,))
+        second_view[:] = 2
+        written = second.commit()
+        with pytest.raises(MemoryWriteError):
+            second.acquire_slot(shape=(192,))
+        first_view[:] = 1
+        committed = first.commit()
+        assert second.read(*committed) == bytes([1]) * 128
+        assert second.read(*written) == bytes([2]) * 64
+        del first_view, second_view
+    finally:
+        second.close()
+        first.close_unlink(True)
+
+
+def test_shm_ring_prefault_and_hugepage_fallback():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(
+        name, meta, slot_size=8192, slot_count=2, create=True, recreate_on_mismatch=True,
+        prefault=True, hugepages=True,
+    )
+    reader = ShmRing(name, meta, slot_size=8192, slot_count=2, create=False, prefault=True)
+    try:
+        slot, gen = ring.write(b"p" * 8192)
+        assert reader.read(slot, gen) == b"p" * 8192
+    finally:
+        reader.close()
+        ring.close_unlink(True)
+
+
+def test_shm_ring_partial_reads_by_offset():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=32, slot_count=2, create=True, recreate_on_mismatch=True)
+    try:
+        slot, gen = ring.write(b"frame---" + b"rendition")
+        out = np.empty(9, dtype=np.uint8)
+        assert ring.read_into(slot, gen, out, offset=8, length=9) == 9
+        assert out.tobytes() == b"rendition"
+        assert ring.read_view(slot, gen, offset=0, length=8).tobytes() == b"frame---"
+        assert ring.read_view(slot, gen, offset=10, length=9) is None
+        copied, idx, _ = ring.read_latest_into(out, offset=8)
+        assert (copied, idx) == (9, slot)
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_find_by_time_across_wrap():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=8, slot_count=4, create=True, recreate_on_mismatch=True)
+    try:
+        assert ring.find_by_time(1000) is None
+        written = {}
+        for i in range(6):
+            written[1000 + i * 40] = ring.write(bytes([i]) * 8, timestamp_ms=1000 + i * 40, pts=i / 25.0)
+        # 1000 and 1040 were overwritten; the ring holds 1080..1200 across the wrap.
+        slot, gen, ts, pts = ring.find_by_time(1125)
+        assert ts == 1120 and (slot, gen) == written[1120] and pts == 3 / 25.0
+        assert ring.read(slot, gen) == bytes([3]) * 8
+        assert ring.find_by_time(1195)[2] == 1200
+        assert ring.find_by_time(1000)[2] == 1080
+        assert ring.find_by_time(1000, tolerance_ms=50) is None
+        view = ring.acquire_slot(shape=(8,))
+        view[:] = 9
+        ring.commit(timestamp_ms=1240, pts=0.24)
+        assert ring.find_by_time(1250, tolerance_ms=20)[2:] == (1240, 0.24)
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_find_by_time_skips_holes_and_disorder():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=8, slot_count=6, create=True, recreate_on_mismatch=True)
+    try:
+        written = [ring.write(bytes([i]) * 8, timestamp_ms=1000 + i * 50) for i in range(6)]
+        # A dropped write in the middle of the ring (the 1150 ms frame)
+        ring._set_payload_length(written[3][0], 0)
+        assert ring.find_by_time(1110)[2] == 1100
+        assert ring.find_by_time(1160)[2] == 1200
+        # ... and one being rewritten
+        ring._set_generation(written[2][0], written[2][1] | SLOT_BUSY)
+        assert ring.find_by_time(1110)[2] == 1050
+        assert ring.find_by_time(1110, tolerance_ms=40) is None
+
+        # A clock step: capture times no longer follow commit order.
+        for i, ts in enumerate((1000, 1050, 1300, 1150, 1200, 1250)):
+            ring.write(bytes([i]) * 8, timestamp_ms=ts)
+        assert ring.find_by_time(1110)[2] == 1150
+    finally:
+        ring.close_unlink(True)
+
+
+def test_shm_ring_handover_advertises_successor():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=16, slot_count=2, create=True, recreate_on_mismatch=True)
+    reader = ShmRing(name, meta, slot_size=16, slot_count=2, create=False)
+    successor = None
+    try:
+        consumer = reader.register_consumer("det")
+        old = ring.write(b"old-frame")
+        assert reader.successor() is None
+        successor = ring.handover(f"{name}_h1", f"{meta}_h1", 16, 8)
+        info = reader.successor()
+        assert info == {"data_name": f"{name}_h1", "meta_name": f"{meta}_h1", "slot_size": 16, "slot_count": 8}
+        new = successor.write(b"new-frame")
+        # The old ring keeps serving frames already handed out.
+        assert reader.read(*old) == b"old-frame"
+        assert ring.live_consumers() == 1
+        follower = ShmRing(info["data_name"], info["meta_name"], info["slot_size"], info["slot_count"], create=False)
+        assert follower.read(*new) == b"new-frame"
+        follower.close()
+        reader.unregister_consumer(consumer)
+        assert ring.live_consumers() == 0
+    finally:
+        reader.close()
+        ring.close_unlink(True)
+        if successor is not None:
+            successor.close_unlink(True)
+
+
+def test_shm_ring_handover_replaces_stale_segments_and_checks_names():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    ring = ShmRing(name, meta, slot_size=8, slot_count=2, create=True, recreate_on_mismatch=True)
+    # Left behind by a crashed run under the name the next resize will use
+    stale = ShmRing(f"{name}_h1", f"{meta}_h1", 8, 4, create=True, recreate_on_mismatch=True)
+    stale.write(b"stale-01")
+    stale.close()
+    successor = None
+    try:
+        long_name = "x" * 65
+        with pytest.raises(ValueError):
+            ring.handover(long_name, f"{meta}_h2", 8, 4)
+        assert not ShmRing.exists(long_name, f"{meta}_h2")
+        assert ring.successor() is None
+
+        successor = ring.handover(f"{name}_h1", f"{meta}_h1", 8, 4)
+        assert successor.write_seq() == 0 and successor.read_latest()[0] != b"stale-01"
+        assert ring.successor()["data_name"] == f"{name}_h1"
+        ring.withdraw_successor()
+        assert ring.successor() is None
+    finally:
+        ring.close_unlink(True)
+        if successor is not None:
+            successor.close_unlink(True)
+    ShmRing.remove(f"{name}_h1", f"{meta}_h1")
+    assert not ShmRing.exists(f"{name}_h1", f"{meta}_h1")
+
+
+def test_shm_ring_multi_writer_reserves_distinct_slots():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    first = ShmRing(name, meta, slot_size=8, slot_count=3, create=True, recreate_on_mismatch=True, multi_writer=True)
+    second = ShmRing(name, meta, slot_size=8, slot_count=3, create=True, recreate_on_mismatch=False, multi_writer=True)
+    try:
+        assert first._owner and not second._owner
+        # An in-flight copy no longer holds the ring mutex: the peer writes past it.
+        view = first.acquire_slot(shape=(8,))
+        written = [second.write(b"peer-%03d" % i) for i in range(3)]
+        pending_slot = first._pending[0]
+        assert all(slot != pending_slot for slot, _ in written)
+        assert second.read(*written[0]) is None  # lapped by the third write, not by the reservation
+        assert second.read(*written[2]) == b"peer-002"
+        view[:] = 7
+        slot, gen = first.commit()
+        assert slot == pending_slot
+        assert second.read(slot, gen) == bytes([7]) * 8
+        assert second.write_seq() == 4
+        del view
+    finally:
+        second.close()
+        first.close_unlink(True)
+
+
+def test_shm_ring_multi_writer_latest_is_the_newest_commit():
+    name = f"ivis_test_shm_{uuid.uuid4().hex[:8]}"
+    meta = f"{name}_meta"
+    first = ShmRing(name, meta, slot_size=8, slot_count=2, create=True, recreate_on_mismatch=True, multi_writer=True)
+    second = ShmRing(name, meta, slot_size=8, slot_count=2, create=True, recreate_on_mismatch=False, multi_writer=True)
+    third = ShmRing(name, meta, slot_size=8, slot_count=2, create=True, recreate_on_mismatch=False, multi_writer=True)
+    try:
+        first_view = first.acquire_slot(shape=(8,))
+        second_view = second.acquire_slot(shape=(8,))
+        # Both slots are mid-copy: a third writer gives up instead of spinning under the lock.
+        with pytest.raises(MemoryWriteError):
+            third.write(b"third-01")
+        first_view[:] = 1
+        committed = first.commit()
+        # The write index points past the slot the second writer is still filling.
+        data, slot, gen = third.read_latest()
+        assert data == bytes([1]) * 8 and (slot, gen) == committed
+        second_view[:] = 2
+        second.commit()
+        assert third.read_latest()[0] == bytes([2]) * 8
+        assert third.read(*third.write(b"third-02")) == b"third-02"
+        del first_view, second_view
+    finally:
+        third.close()
+        second.close()
+        first.close_unlink(True)
+
+
+def test_shm_ring_file_backed_survives_writer_close(tmp_path):
+    data_name, meta_name = file_ring_names(str(tmp_path / "ring"), "data", "meta")
+    ring = ShmRing(data_name, meta_name, slot_size=8, slot_count=3, create=True, recreate_on_mismatch=True)
+    assert ring.file_backed
+    for i in range(4):
+        ring.write(bytes([i]) * 8, timestamp_ms=1000 + i)
+    # No unlink: the files stay behind like after a writer crash.
+    ring.close()
+    assert ShmRing.exists(data_name, meta_name)
+    assert ShmRing.stored_layout(meta_name) == (8, 3)
+    replay = ShmRing(data_name, meta_name, 8, 3, create=False)
+    try:
+        frames = replay.frames()
+        assert [(seq, ts) for _, _, seq, ts, _ in frames] == [(2, 1001), (3, 1002), (4, 1003)]
+        slot, gen = frames[-1][:2]
+        assert replay.read(slot, gen) == bytes([3]) * 8
+    finally:
+        replay.close_unlink(True)
+    assert not ShmRing.exists(data_name, meta_name)
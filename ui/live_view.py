@@ -7,11 +7,14 @@ import time
 
 import cv2
 import numpy as np
-from flask import Flask, Response, render_template_string
+from flask import Flask, Response, render_template_string, request
 
 from ivis.common.config.base import redact_config
 from ivis_logging import setup_logging
-from memory.shm_ring import ShmRing
+from ivis.common.pixel_format import frame_shape, to_bgr
+from ivis.common.renditions import PREVIEW, find_rendition, slot_nbytes
+from memory.shm_directory import ShmDirectory
+from memory.shm_ring import ShmRing, file_ring_names
 from ivis.common.contracts.validators import validate_frame_contract_v1, ContractValidationError
 from ivis.common.contracts.result_contract import validate_result_contract_v1
 from detection.metrics.counters import metrics as detection_metrics
@@ -25,15 +28,26 @@ ZMQ_RESULTS_SUB_ENDPOINT = os.getenv("ZMQ_RESULTS_SUB_ENDPOINT", "tcp://localhos
 
 SHM_NAME = os.getenv("SHM_NAME", "ivis_shm_data")
 SHM_META_NAME = os.getenv("SHM_META_NAME", "ivis_shm_meta")
+# MEMORY_BACKEND=mmap: the ring files live in MMAP_DIR
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "shm").lower()
+MMAP_DIR = os.getenv("MMAP_DIR", "/dev/shm/ivis")
 SHM_BUFFER_BYTES = int(os.getenv("SHM_BUFFER_BYTES", "50000000"))
 SHM_CACHE_SECONDS = float(os.getenv("SHM_CACHE_SECONDS", "0"))
 SHM_CACHE_FPS = float(os.getenv("SHM_CACHE_FPS", "0"))
+SHM_DIRECTORY = os.getenv("SHM_DIRECTORY", "ivis_shm_directory")
+STREAM_ID = os.getenv("STREAM_ID")
 
 FRAME_WIDTH = int(os.getenv("FRAME_WIDTH", "640"))
 FRAME_HEIGHT = int(os.getenv("FRAME_HEIGHT", "480"))
 # FRAME_COLOR_SPACE is fixed to 'bgr' for v1 contract; downstream code
 # should assume frames are in this colorspace and avoid conversions.
 FRAME_COLOR_SPACE = os.getenv("FRAME_COLOR_SPACE", "bgr").lower()
+# Layout of the frames in the SHM ring (bgr, or compact nv12/i420 converted here for display)
+SHM_PIXEL_FORMAT = os.getenv("SHM_PIXEL_FORMAT", "bgr").lower()
+SHM_RENDITION_MODEL_SIZE = int(os.getenv("SHM_RENDITION_MODEL_SIZE", "0"))
+SHM_RENDITION_PREVIEW_WIDTH = int(os.getenv("SHM_RENDITION_PREVIEW_WIDTH", "0"))
+# Draw on ingestion's low-res "preview" rendition when the contract advertises one
+UI_USE_PREVIEW = os.getenv("UI_USE_PREVIEW", "1").lower() in ("1", "true", "yes")
 
 app = Flask(__name__)
 logger = setup_logging("ui")
@@ -74,6 +88,9 @@ latest_meta = {}
 results_cache = ResultsCache(max_entries=RESULTS_CACHE_MAX, ttl_seconds=RESULTS_CACHE_TTL_SEC)
 results_cache_lock = threading.Lock()
 shm_ring = None
+shm_consumer = None
+# (width, height, pixel format) of the attached ring's frames
+shm_geometry = (FRAME_WIDTH, FRAME_HEIGHT, SHM_PIXEL_FORMAT)
 last_shm_error = None
 active_shm_name = None
 last_frame_ts = 0.0
@@ -83,6 +100,7 @@ last_result = {}
 last_shm_ts = 0.0
 _threads_started = False
 _threads_lock = threading.Lock()
+_handover_lock = threading.Lock()
 
 def _update_cache_metric():
     _safe_metric("metrics_ui_cache_size_failed", lambda: ivis_metrics.ui_results_cache_size.set(len(results_cache)))
@@ -113,16 +131,49 @@ def _start_background_threads():
         logger.info("Background threads started.")
 
 
+def _ring_from_directory():
+    """Attaches by STREAM_ID through the SHM directory; None if not published."""
+    global shm_geometry
+    if not (SHM_DIRECTORY and STREAM_ID):
+        return None
+    try:
+        directory = ShmDirectory(SHM_DIRECTORY, create=False)
+    except Exception as exc:
+        logger.debug("SHM directory unavailable: %s", exc)
+        return None
+    try:
+        ring, entry = directory.open_ring(STREAM_ID)
+    except Exception as exc:
+        logger.debug("SHM directory lookup failed for stream_id=%s: %s", STREAM_ID, exc)
+        return None
+    finally:
+        directory.close()
+    shm_geometry = (entry["width"], entry["height"], entry["pixel_format"])
+    return ring, entry["data_name"]
+
+
 def _get_ring():
-    global shm_ring, last_shm_error, active_shm_name
-    if shm_ring is None:
-        slot_size = FRAME_WIDTH * FRAME_HEIGHT * 3
+    global shm_ring, shm_consumer, last_shm_error, active_shm_name
+    if shm_ring is not None:
+        return shm_ring
+    found = _ring_from_directory()
+    if found is not None:
+        shm_ring, active_shm_name = found
+        last_shm_error = None
+    else:
+        slot_size = slot_nbytes(
+            FRAME_WIDTH,
+            FRAME_HEIGHT,
+            SHM_PIXEL_FORMAT,
+            SHM_RENDITION_MODEL_SIZE,
+            SHM_RENDITION_PREVIEW_WIDTH,
+        )
         if SHM_CACHE_SECONDS > 0 and SHM_CACHE_FPS > 0:
             slot_count = max(1, int(SHM_CACHE_SECONDS * SHM_CACHE_FPS))
         else:
             slot_count = max(1, SHM_BUFFER_BYTES // slot_size)
         candidates = [
-            (SHM_NAME, SHM_META_NAME),
+            file_ring_names(MMAP_DIR, SHM_NAME, SHM_META_NAME) if MEMORY_BACKEND == "mmap" else (SHM_NAME, SHM_META_NAME),
             (f"ivis_shm_data_{slot_size}_{slot_count}", f"ivis_shm_meta_{slot_size}_{slot_count}"),
             ("ivis_shm_data", "ivis_shm_meta"),
         ]
@@ -138,9 +189,70 @@ def _get_ring():
                 shm_ring = None
         if shm_ring is None and last_error is not None:
             last_shm_error = str(last_error)
+    if shm_ring is not None:
+        try:
+            shm_consumer = shm_ring.register_consumer(os.getenv("UI_SHM_CONSUMER_NAME", "ui"))
+        except Exception as exc:
+            _record_issue("ui_shm_consumer_register_failed", "SHM consumer registration failed", exc)
+            shm_consumer = None
     return shm_ring
 
 
+def _follow_successor(segment: str = None) -> bool:
+    """Online resize: moves to `segment` (None: the newest ring) along our ring's successor chain. True if moved."""
+    global shm_ring, shm_consumer, active_shm_name
+    with _handover_lock:
+        ring = shm_ring
+        if ring is None:
+            return False
+        if ring.data_name == segment:
+            # Another thread already moved.
+            return True
+        found = ring.follow_successors(segment)
+        if found is None:
+            if segment is not None:
+                _record_issue("ui_shm_handover_failed", f"SHM ring {segment} not reachable from {ring.data_name}", None)
+            return False
+        new_ring, successor = found
+        try:
+            if shm_consumer is not None:
+                ring.unregister_consumer(shm_consumer)
+            ring.close()
+        except Exception as exc:
+            logger.debug("Error leaving superseded SHM ring: %s", exc)
+        shm_ring, active_shm_name = new_ring, successor["data_name"]
+        try:
+            shm_consumer = new_ring.register_consumer(os.getenv("UI_SHM_CONSUMER_NAME", "ui"))
+        except Exception as exc:
+            _record_issue("ui_shm_consumer_register_failed", "SHM consumer registration failed", exc)
+            shm_consumer = None
+        logger.info("Followed SHM ring handover to %s", active_shm_name)
+        return True
+
+
+def _scale_result(result: dict, scale: float, offset=(0.0, 0.0)) -> dict:
+    """Copy of `result` with detection boxes moved by -`offset` (ROI crop) and scaled from full-frame to rendition pixels."""
+    ox, oy = offset
+    if (scale == 1.0 and not ox and not oy) or not isinstance(result.get("detections"), list):
+        return result
+    scaled = dict(result)
+    scaled["detections"] = [
+        dict(det, bbox=[(float(v) - o) * scale for v, o in zip(det["bbox"], (ox, oy, ox, oy))])
+        if isinstance(det, dict) and isinstance(det.get("bbox"), list) and len(det["bbox"]) == 4 else det
+        for det in result["detections"]
+    ]
+    return scaled
+
+
+def _crop_offset(contract: dict):
+    """(x, y) of the ring frame inside the camera frame: non-zero with ingestion ROI_MODE=crop."""
+    roi = contract.get("roi")
+    crop = roi.get("crop") if isinstance(roi, dict) else None
+    if not isinstance(crop, dict):
+        return (0.0, 0.0)
+    return (float(crop.get("x", 0)), float(crop.get("y", 0)))
+
+
 def _overlay(frame_bgr: np.ndarray, result: dict, fps_value: float) -> np.ndarray:
     if not result.get("detections") and not result.get("tracks"):
          pass # logger.debug("Overlay: No detections/tracks in result for overlay")
@@ -304,30 +416,46 @@ def _handle_contract(contract: dict):
         return
     try:
         ring = _get_ring()
+        segment = mem.get("segment")
+        if segment and segment != active_shm_name and _follow_successor(segment):
+            ring = shm_ring
         # measure SHM read latency
         rr_start = time.time()
+        # Copy straight into a fresh writable frame (overlay draws on it and it
+        # becomes latest_frame); no intermediate bytes object.
+        preview = find_rendition(mem, PREVIEW) if UI_USE_PREVIEW else None
+        if preview is not None:
+            # Small BGR copy made by ingestion: read only its bytes.
+            width, height, color = preview["width"], preview["height"], "bgr"
+            offset, length = preview["offset"], preview["size"]
+        else:
+            width = contract["frame_width"]
+            height = contract["frame_height"]
+            color = contract["frame_color_space"].lower()
+            offset, length = 0, mem["size"]
+        frame_buf = np.empty(frame_shape(width, height, color), dtype=np.uint8)
         # trace SHM read in UI
         try:
             with ivis_tracing.start_span("ui.shm_read", {"frame_id": contract.get("frame_id"), "stream_id": contract.get("stream_id")}):
-                data = ring.read(slot, gen)
+                copied = ring.read_into(slot, gen, frame_buf, offset=offset, length=length)
         except Exception as exc:
             _record_issue("tracing_span_shm_read_failed", "Tracing span failed (ui shm_read)", exc)
-            data = ring.read(slot, gen)
+            copied = ring.read_into(slot, gen, frame_buf, offset=offset, length=length)
         rr_ms = (time.time() - rr_start) * 1000.0
         _safe_metric("metrics_shm_read_latency_failed", lambda: ivis_metrics.shm_read_latency_ms.observe(rr_ms))
-        if not data:
+        if shm_consumer is not None:
+            ring.advance(shm_consumer, slot, gen)
+        if not copied:
             return
     except Exception:
         logger.exception("Error reading from SHM ring for slot=%s gen=%s", slot, gen)
         return
-    logger.debug("SHM read returned %s bytes for slot=%s gen=%s", None if data is None else len(data), slot, gen)
-    arr = np.frombuffer(data, dtype=np.uint8)
-    arr = arr.reshape((FRAME_HEIGHT, FRAME_WIDTH, 3))
-    # Make a writable copy - buffers from shared memory are readonly in NumPy
-    # Ingestion ensures the frame is in FRAME_COLOR_SPACE (bgr v1); no downstream conversion.
-    frame_bgr = arr.copy()
-    # ensure contiguous writable image for OpenCV
-    frame_bgr = np.ascontiguousarray(frame_bgr, dtype=np.uint8)
+    logger.debug("SHM read returned %s bytes for slot=%s gen=%s", copied, slot, gen)
+    if copied != frame_buf.nbytes:
+        _record_issue("ui_shm_size_mismatch", "SHM payload size does not match FRAME_WIDTH/FRAME_HEIGHT", None)
+        return
+    # bgr frames are used as-is; nv12/i420 are converted for overlay/JPEG only here.
+    frame_bgr = to_bgr(frame_buf, width, height, color)
     frame_id = contract.get("frame_id")
     # Prefer the exact ResultContractV1 for this frame_id; fall back to last_result only
     # if it's recent to avoid drawing stale tracks for long periods.
@@ -359,13 +487,15 @@ def _handle_contract(contract: dict):
         fps_ema = fps if fps_ema == 0.0 else (0.9 * fps_ema + 0.1 * fps)
     last_frame_ts = now
     _safe_metric("metrics_fps_out_failed", lambda: ivis_metrics.fps_out.set(fps_ema))
+    # Results are in full-frame pixels; the ring may hold an ROI crop and/or a scaled preview.
+    overlay_result = _scale_result(result, float(preview["scale"]) if preview is not None else 1.0, _crop_offset(contract))
     # overlay span (drawing + composite)
     try:
         with ivis_tracing.start_span("ui.overlay", {"frame_id": frame_id, "stream_id": contract.get("stream_id")}):
-            frame_bgr = _overlay(frame_bgr, result, fps_ema)
+            frame_bgr = _overlay(frame_bgr, overlay_result, fps_ema)
     except Exception as exc:
         _record_issue("tracing_span_overlay_failed", "Tracing span failed (ui overlay)", exc)
-        frame_bgr = _overlay(frame_bgr, result, fps_ema)
+        frame_bgr = _overlay(frame_bgr, overlay_result, fps_ema)
     with latest_lock:
         global latest_frame, latest_meta
         latest_frame = frame_bgr
@@ -375,6 +505,7 @@ def _handle_contract(contract: dict):
 
 
 def _shm_fallback_loop():
+    last_seq = 0
     while True:
         try:
             now = time.perf_counter()
@@ -387,17 +518,19 @@ def _shm_fallback_loop():
             if ring is None:
                 time.sleep(0.1)
                 continue
-            data, _, _ = ring.read_latest()
-            if not data:
-                time.sleep(0.1)
+            if _follow_successor():
+                last_seq = 0
+                continue
+            # Sleep until ingestion commits a new frame (futex on the ring's write sequence)
+            seq = ring.wait_for_frame(last_seq, timeout=0.1)
+            if seq == last_seq:
+                continue
+            last_seq = seq
+            frame_buf = np.empty(frame_shape(*shm_geometry), dtype=np.uint8)
+            copied, _, _ = ring.read_latest_into(frame_buf, length=frame_buf.nbytes)
+            if copied != frame_buf.nbytes:
                 continue
-            # logger.debug("SHM fallback read %s bytes", len(data))
-            arr = np.frombuffer(data, dtype=np.uint8)
-            arr = arr.reshape((FRAME_HEIGHT, FRAME_WIDTH, 3))
-            # Make writable copy for OpenCV drawing
-            frame_bgr = arr.copy()
-            # Ingestion guarantees FRAME_COLOR_SPACE == bgr; no color conversion required.
-            frame_bgr = np.ascontiguousarray(frame_bgr, dtype=np.uint8)
+            frame_bgr = to_bgr(frame_buf, *shm_geometry)
             # (globals declared above)
             now = time.perf_counter()
             if last_frame_ts > 0:
@@ -450,25 +583,30 @@ def index():
 def stream():
     _start_background_threads()
     def gen():
+        last_seq = 0
         while True:
             with latest_lock:
                 frame = None if latest_frame is None else latest_frame.copy()
             if frame is None:
                 try:
                     ring = _get_ring()
-                    data, _, _ = ring.read_latest()
-                    if data:
-                        arr = np.frombuffer(data, dtype=np.uint8)
-                        arr = arr.reshape((FRAME_HEIGHT, FRAME_WIDTH, 3))
-                        frame_bgr = arr.copy()
-                        frame_bgr = np.ascontiguousarray(frame_bgr, dtype=np.uint8)
-                        frame = _overlay(frame_bgr, last_result, fps_ema)
+                    if ring is None:
+                        time.sleep(0.05)
+                        continue
+                    seq = ring.wait_for_frame(last_seq, timeout=0.05)
+                    if seq == last_seq:
+                        continue
+                    last_seq = seq
+                    frame_buf = np.empty(frame_shape(*shm_geometry), dtype=np.uint8)
+                    copied, _, _ = ring.read_latest_into(frame_buf, length=frame_buf.nbytes)
+                    if copied == frame_buf.nbytes:
+                        frame = _overlay(to_bgr(frame_buf, *shm_geometry), last_result, fps_ema)
                         # logger.debug("Stream generated frame from SHM latest")
                 except Exception:
                     logger.exception("Error generating frame from SHM in stream()")
                     frame = None
+                    time.sleep(0.05)
             if frame is None:
-                time.sleep(0.05)
                 continue
             ok, jpeg = cv2.imencode(".jpg", frame)
             if not ok:
@@ -478,6 +616,30 @@ def stream():
     return Response(gen(), mimetype="multipart/x-mixed-replace; boundary=frame")
 
 
+@app.route("/frame_at/<int:timestamp_ms>")
+def frame_at(timestamp_ms: int):
+    """JPEG of the ring frame captured closest to `timestamp_ms` (clips, late alerts)."""
+    tolerance_ms = request.args.get("tolerance_ms", default=200, type=int)
+    ring = _get_ring()
+    if ring is None:
+        return {"error": "shm_unavailable"}, 503
+    found = ring.find_by_time(timestamp_ms, tolerance_ms)
+    if found is None:
+        return {"error": "not_in_ring", "timestamp_ms": timestamp_ms}, 404
+    slot, gen, frame_ts, pts = found
+    frame_buf = np.empty(frame_shape(*shm_geometry), dtype=np.uint8)
+    if ring.read_into(slot, gen, frame_buf, length=frame_buf.nbytes) != frame_buf.nbytes:
+        return {"error": "overwritten", "timestamp_ms": timestamp_ms}, 404
+    ok, jpeg = cv2.imencode(".jpg", to_bgr(frame_buf, *shm_geometry))
+    if not ok:
+        return {"error": "encode_failed"}, 500
+    return Response(
+        jpeg.tobytes(),
+        mimetype="image/jpeg",
+        headers={"X-Frame-Timestamp-Ms": str(frame_ts), "X-Frame-Pts": str(pts)},
+    )
+
+
 @app.route("/health")
 def health():
     _start_background_threads()